@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Versioned JSON API for Blood Bank Management System
+Machine access for hospital laboratory systems and other integrations.
+Donors, donations, requests and inventory are listed under /api/v1 with:
+
+- sparse fieldsets: ?fields=id,status selects only those columns in SQL
+- equality filters on indexed columns: ?status=Pending
+- cursor pagination: ?after=<next_after of the previous page>, in key order
+
+POST /api/v1/batch answers several of these reads over one database
+connection in one round trip. Responses are encoded with orjson when it is
+installed (pip install orjson), and otherwise with json. Both write
+DECIMAL columns as numbers and dates as ISO 8601 strings.
+
+Usage:
+    python api.py donations --fields id,date,quantity --filter status=Approved --limit 5
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import db
+from db import Error
+from config import Config
+
+PREFIX = '/api/v1'
+
+# source: table or view; item: key of a single row in a response; key: the
+# field pages are ordered and continued by; fields: field -> column;
+# filters: fields usable as ?field=value; owners: role -> column holding
+# the user's own ID (None: every row), roles not listed get 403; where:
+# condition every row must meet
+Resource = namedtuple('Resource', ['source', 'item', 'key', 'fields', 'filters', 'owners', 'where'])
+
+RESOURCES = {
+    'donors': Resource('Donor', 'donor', 'id', {
+        'id': 'Donor_ID',
+        'name': 'Name',
+        'age': 'Age',
+        'gender': 'Gender',
+        'blood_group': 'Blood_Group',
+        'contact': 'Contact',
+        'address': 'Address',
+        'registration_date': 'Registration_Date',
+        'total_donations': 'Total_Donations',
+        'total_blood_donated': 'Total_Blood_Donated',
+        'last_donation_date': 'Last_Donation_Date',
+    # The unary plus keeps SQLite from reading every active donor through
+    # idx_donor_is_active_name and sorting them, instead of walking Donor_ID
+    }, ('blood_group',), {'admin': None, 'donor': 'Donor_ID'}, '+Is_Active = TRUE'),
+    'donations': Resource('Donation', 'donation', 'id', {
+        'id': 'Donation_ID',
+        'donor_id': 'Donor_ID',
+        'blood_group': 'Blood_Group',
+        'quantity': 'Quantity',
+        'date': 'Date',
+        'status': 'Status',
+        'admin_notes': 'Admin_Notes',
+        'created_at': 'Created_At',
+    }, ('donor_id', 'status'), {'admin': None, 'donor': 'Donor_ID'}, None),
+    'requests': Resource('Request', 'request', 'id', {
+        'id': 'Request_ID',
+        'hospital_id': 'Hospital_ID',
+        'blood_group': 'Blood_Group',
+        'quantity': 'Quantity',
+        'date': 'Date',
+        'status': 'Status',
+        'admin_notes': 'Admin_Notes',
+        'created_at': 'Created_At',
+    }, ('hospital_id', 'status'), {'admin': None, 'hospital': 'Hospital_ID'}, None),
+    'inventory': Resource('blood_availability', 'inventory', 'blood_group', {
+        'blood_group': 'Blood_Group',
+        'quantity': 'Available_Quantity',
+        'status': 'Status',
+        'days_of_supply': 'Days_Of_Supply',
+        'daily_rate': 'Daily_Rate',
+    }, ('status',), {'admin': None, 'donor': None, 'hospital': None}, None),
+}
+
+class ApiError(Exception):
+    """A request the API refuses, answered with status and message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(body):
+    """body as JSON bytes, the same with or without orjson"""
+    if orjson is not None:
+        return orjson.dumps(body, default=_default)
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+def _resource(name, role):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise ApiError(404, f"Unknown resource '{name}'; expected one of {', '.join(RESOURCES)}")
+    if role not in resource.owners:
+        raise ApiError(403, 'Access denied')
+    return resource
+
+def _fields(resource, text):
+    """Fields to return for a comma-separated fields parameter; the key is always included"""
+    if not text:
+        return list(resource.fields)
+    names = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(400, f"Unknown fields {', '.join(unknown)}; expected some of {', '.join(resource.fields)}")
+    return list(dict.fromkeys([resource.key] + names))
+
+def _query_value(field, value):
+    # An unescaped '+' in a query string arrives as a space
+    return value.replace(' ', '+') if field == 'blood_group' else value
+
+def _key_value(resource, value):
+    if resource.key != 'id':
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"'{value}' is not an id")
+
+def _scope(resource, role, user_id):
+    """Conditions and params that restrict resource to what role may read"""
+    conditions, params = [resource.where] if resource.where else [], []
+    owner = resource.owners[role]
+    if owner:
+        conditions.append(f"{owner} = %s")
+        params.append(user_id)
+    return conditions, params
+
+def list_items(cursor, name, args, role, user_id, settings=Config):
+    """One page of a resource as a response body
+
+    args is a mapping of query parameters: fields, the resource's filters,
+    limit and after (the next_after of the previous page).
+    """
+    resource = _resource(name, role)
+    allowed = {'fields', 'limit', 'after'} | set(resource.filters)
+    unknown = sorted(set(args) - allowed)
+    if unknown:
+        raise ApiError(400, f"Unknown parameters {', '.join(unknown)}; expected some of {', '.join(sorted(allowed))}")
+    fields = _fields(resource, args.get('fields'))
+    try:
+        limit = int(args.get('limit') or db._setting(settings, 'API_PAGE_SIZE', 100))
+    except ValueError:
+        raise ApiError(400, 'limit must be a number')
+    max_page = int(db._setting(settings, 'API_MAX_PAGE_SIZE', 500))
+    if not 1 <= limit <= max_page:
+        raise ApiError(400, f"limit must be between 1 and {max_page}")
+
+    conditions, params = _scope(resource, role, user_id)
+    for field in resource.filters:
+        if field in args:
+            conditions.append(f"{resource.fields[field]} = %s")
+            params.append(_query_value(field, args[field]))
+    key_column = resource.fields[resource.key]
+    if resource.key != 'id':
+        # MySQL sorts an ENUM such as Blood_Group by its position in the list
+        # but compares it with > as a string; the cast makes both string order
+        key_column = f"CAST({key_column} AS CHAR)"
+    if args.get('after'):
+        conditions.append(f"{key_column} > %s")
+        params.append(_key_value(resource, _query_value(resource.key, args['after'])))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # One row more than the page tells whether there is a next page
+    cursor.execute(f"""
+        SELECT {', '.join(resource.fields[field] for field in fields)}
+        FROM {resource.source} {where}
+        ORDER BY {key_column}
+        LIMIT %s
+    """, params + [limit + 1])
+    rows = cursor.fetchall()
+    items = [dict(zip(fields, row)) for row in rows[:limit]]
+    return {
+        'success': True,
+        name: items,
+        'next_after': items[-1][resource.key] if len(rows) > limit else None,
+    }
+
+def get_item(cursor, name, key, args, role, user_id):
+    """One row of a resource by its key as a response body; args may hold fields"""
+    resource = _resource(name, role)
+    unknown = sorted(set(args) - {'fields'})
+    if unknown:
+        raise ApiError(400, f"Unknown parameters {', '.join(unknown)}; expected fields")
+    fields = _fields(resource, args.get('fields'))
+    conditions, params = _scope(resource, role, user_id)
+    conditions.append(f"{resource.fields[resource.key]} = %s")
+    cursor.execute(f"""
+        SELECT {', '.join(resource.fields[field] for field in fields)}
+        FROM {resource.source}
+        WHERE {' AND '.join(conditions)}
+    """, params + [_key_value(resource, key)])
+    row = cursor.fetchone()
+    if row is None:
+        raise ApiError(404, f"No {resource.item} {key}")
+    return {'success': True, resource.item: dict(zip(fields, row))}
+
+def read(cursor, path, args, role, user_id, settings=Config):
+    """(status, body) for a GET of path under PREFIX"""
+    parts = path[len(PREFIX):].strip('/').split('/') if path.startswith(PREFIX + '/') else []
+    try:
+        if len(parts) == 1:
+            return 200, list_items(cursor, parts[0], args, role, user_id, settings)
+        if len(parts) == 2:
+            return 200, get_item(cursor, parts[0], parts[1], args, role, user_id)
+        raise ApiError(404, f"No such resource: {path}")
+    except ApiError as e:
+        return e.status, {'success': False, 'message': str(e)}
+
+def batch(cursor, requests, role, user_id, settings=Config):
+    """(status, body) for a list of sub-requests, all read with cursor
+
+    Each sub-request is {"id": ..., "path": "/api/v1/...?query"}, and may
+    give "method", which must be GET. Every sub-request gets its own status;
+    a failed one does not stop the others.
+    """
+    max_requests = int(db._setting(settings, 'API_BATCH_MAX_REQUESTS', 20))
+    if not isinstance(requests, list) or not requests:
+        return 400, {'success': False, 'message': 'requests must be a non-empty list'}
+    if len(requests) > max_requests:
+        return 400, {'success': False, 'message': f"At most {max_requests} requests per batch"}
+
+    responses = []
+    for sub in requests:
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str):
+            status, body = 400, {'success': False, 'message': 'Each request needs a path'}
+        elif sub.get('method', 'GET').upper() != 'GET':
+            status, body = 405, {'success': False, 'message': 'A batch can only read (GET)'}
+        else:
+            url = urlsplit(sub['path'])
+            args = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+            status, body = read(cursor, url.path, args, role, user_id, settings)
+        responses.append({'id': sub.get('id') if isinstance(sub, dict) else None,
+                          'status': status, 'body': body})
+    return 200, {'success': True, 'responses': responses}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read a versioned API resource as an admin')
+    parser.add_argument('resource', choices=list(RESOURCES))
+    parser.add_argument('key', nargs='?', help='a single row by its id (blood group for inventory)')
+    parser.add_argument('--fields', help='comma-separated fields to return')
+    parser.add_argument('--filter', action='append', default=[], metavar='FIELD=VALUE')
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--after', help='next_after of the previous page')
+    args = parser.parse_args(argv)
+
+    query = dict(item.partition('=')[::2] for item in args.filter)
+    for name in ('fields', 'limit', 'after'):
+        if getattr(args, name) is not None:
+            query[name] = str(getattr(args, name))
+    path = f"{PREFIX}/{args.resource}" + (f"/{args.key}" if args.key else '')
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+    try:
+        cursor = connection.cursor()
+        status, body = read(cursor, path, query, 'admin', None)
+        cursor.close()
+    except Error as e:
+        print(f"Database error: {e}")
+        return 1
+    finally:
+        connection.close()
+    print(json.dumps(json.loads(dumps(body)), indent=2))
+    return 0 if status == 200 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,51 +3,129 @@ Blood Bank Management System - Main Flask Application
 A comprehensive system for managing blood donations, requests, and inventory
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-import mysql.connector
-from mysql.connector import Error
-import bcrypt
-from datetime import datetime, date
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify,
+                   Response, stream_with_context, g, make_response, current_app,
+                   has_request_context)
+from flask.sessions import SecureCookieSessionInterface
+from datetime import datetime, date, timedelta
+import gc
+import hashlib
 import os
+import time
 from config import config
+import db
+from db import Error
+import api
+import assets
+import audit
+import donor_totals
+import fragment_cache
+import geocoding
+import idempotency
+import inventory_history
+import notifications
+import ratelimit
+import replicas
+import sharding
+import shortage
 
-# Initialize Flask app
-# Get the directory where this file is located
+# Templates and static files live next to this module
 base_dir = os.path.dirname(os.path.abspath(__file__))
 template_dir = os.path.join(base_dir, 'templates')
 static_dir = os.path.join(base_dir, 'static')
 
-app = Flask(__name__, 
-            template_folder=template_dir,
-            static_folder=static_dir)
+class Routes:
+    """Views and request hooks declared in this module
+    
+    They are recorded here and attached by create_app(), so the application
+    can be built by a factory - once per process, or once in a master that
+    preloads it and forks workers - rather than at import time.
+    """
+    
+    def __init__(self):
+        self.deferred = []
+    
+    def _record(self, method, f, *args, **options):
+        self.deferred.append((method, args, options, f))
+        return f
+    
+    def route(self, rule, **options):
+        return lambda f: self._record('route', f, rule, **options)
+    
+    def errorhandler(self, code):
+        return lambda f: self._record('errorhandler', f, code)
+    
+    def before_request(self, f):
+        return self._record('before_request', f)
+    
+    def after_request(self, f):
+        return self._record('after_request', f)
+    
+    def teardown_request(self, f):
+        return self._record('teardown_request', f)
+    
+    def url_defaults(self, f):
+        return self._record('url_defaults', f)
+    
+    def context_processor(self, f):
+        return self._record('context_processor', f)
+    
+    def init_app(self, app):
+        for method, args, options, f in self.deferred:
+            register = getattr(app, method)
+            # route() and errorhandler() take arguments, the hooks only f
+            (register(*args, **options) if args else register)(f)
+
+site = Routes()
 
-# Use production config for Vercel, development for local
-config_name = os.environ.get('FLASK_ENV', 'development')
-if config_name == 'production':
-    app.config.from_object(config['production'])
-else:
-    app.config.from_object(config['development'])
+# Per-process resources, created by init_process(): pooled connections,
+# rate limiter buckets, admission slots, donor grids and contact indexes
+# are never shared across a fork
+db_pool = None
+read_router = None
+shard_map = None
+rate_limiter = None
+admission = None
+donor_indexes = None
+contact_indexes = None
 
 # Database connection helper
 def get_db_connection():
-    """Create and return database connection"""
+    """Return a database connection, reusing an idle one when possible
+    
+    In multi-site mode this is the database of the request's site. Otherwise
+    read-only routes get a replica unless the session wrote recently; any
+    other request that takes a connection counts as a write.
+    """
+    pool = db_pool
+    if has_request_context():
+        if 'site_id' in g:
+            pool = shard_map.pools[g.site_id]
+        elif g.get('read_only') and not wrote_recently():
+            conn = read_router.connection()
+            if conn:
+                return conn
+        else:
+            g.used_primary = True
     try:
-        connection = mysql.connector.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DATABASE'],
-            port=app.config['MYSQL_PORT'],
-            autocommit=False,
-            connect_timeout=10
-        )
-        return connection
+        return pool.get()
     except Error as e:
+        if pool is not db_pool:
+            print(f"Error connecting to the database of site {g.site_id}: {e}")
+            print(f"   Address: {shard_map.sites[g.site_id]}")
+            return None
+        # The pool's own settings, since test_connection.py calls this
+        # outside an application context
+        settings = pool.settings
+        if settings['DB_BACKEND'] == 'sqlite':
+            print(f"Error opening SQLite database: {e}")
+            print(f"   Path: {settings['SQLITE_PATH']}")
+            return None
         print(f"Error connecting to MySQL: {e}")
-        print(f"   Host: {app.config['MYSQL_HOST']}")
-        print(f"   User: {app.config['MYSQL_USER']}")
-        print(f"   Database: {app.config['MYSQL_DATABASE']}")
-        print(f"   Port: {app.config['MYSQL_PORT']}")
+        print(f"   Host: {settings['MYSQL_HOST']}")
+        print(f"   User: {settings['MYSQL_USER']}")
+        print(f"   Database: {settings['MYSQL_DATABASE']}")
+        print(f"   Port: {settings['MYSQL_PORT']}")
         return None
     except Exception as e:
         print(f"Unexpected error connecting to database: {e}")
@@ -76,16 +154,287 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Read/write splitting
+def read_only(f):
+    """Decorator for routes that only read; their connections may come from a replica"""
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_only = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+def wrote_recently():
+    """True while this session's last write may not have reached the replicas"""
+    return time.time() - session.get('wrote_at', 0) < current_app.config['DB_READ_YOUR_WRITES_SECONDS']
+
+@site.after_request
+def remember_write(response):
+    # Only worth a cookie update when there are replicas to stay away from
+    if g.get('used_primary') and read_router.replicas:
+        session['wrote_at'] = time.time()
+    return response
+
+# Multi-site mode
+@site.before_request
+def resolve_site():
+    """Pick the request's site: the one the session signed in to, else the default
+    
+    Until someone signs in, the site chosen on the login or registration
+    form is kept in the session, so the form is checked against its database.
+    """
+    if not shard_map.sites:
+        return None
+    chosen = request.form.get('site_id')
+    if chosen in shard_map.sites and 'user_id' not in session:
+        session['site_id'] = chosen
+    site_id = session.get('site_id')
+    g.site_id = site_id if site_id in shard_map.sites else shard_map.default
+    return None
+
+@site.context_processor
+def inject_sites():
+    return {'sites': list(shard_map.sites), 'current_site': g.get('site_id')}
+
+# Audit trail
+def audit_event(action, entity, entity_id, before=None, after=None):
+    """Buffer an audit event by the current user until flush_audit()"""
+    g.setdefault('audit_events', []).append(audit.event(
+        session.get('role', 'anonymous'), session.get('user_id'), action, entity, entity_id,
+        before, after, request.remote_addr))
+
+def flush_audit(cursor):
+    """Write the buffered events in the caller's transaction, just before it commits"""
+    events = g.pop('audit_events', None)
+    if events:
+        audit.record(cursor, events)
+
+# Idempotency keys
+idempotency_store = idempotency.IdempotencyStore()
+
+def replay_response(stored):
+    """Return a stored response again, marked as a replay"""
+    response = jsonify(stored.body)
+    response.status_code = stored.status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def lookup_idempotency_key(scope, key):
+    conn = get_db_connection()
+    if not conn:
+        raise Error('Database connection error')
+    try:
+        return idempotency_store.lookup(conn, scope, key)
+    finally:
+        conn.close()
+
+def idempotent(f):
+    """Decorator to run a JSON POST once per Idempotency-Key header
+    
+    Retries with the same key get the first response back without running
+    the view; a key reused with a different form is rejected with 422. The
+    view calls claim_idempotency_key() before its first write (or any check
+    a retry would fail), remember_response() before committing, and
+    commit_response() to commit.
+    """
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(idempotency.HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'message': 'Idempotency-Key is too long'}), 400
+        scope = f"{session.get('role', 'anonymous')}:{session.get('user_id')}:{request.endpoint}"
+        if 'site_id' in g:
+            scope = f"{g.site_id}:{scope}"
+        request_fingerprint = idempotency.fingerprint(request.method, request.path, request.form)
+        
+        try:
+            stored = idempotency_store.cache.get((scope, key))
+            for attempt in range(2):
+                if stored is not None:
+                    if stored.fingerprint != request_fingerprint:
+                        return jsonify({'success': False,
+                                        'message': 'Idempotency-Key was already used for a different request'}), 422
+                    return replay_response(stored)
+                g.idempotency = (scope, key, request_fingerprint)
+                try:
+                    return f(*args, **kwargs)
+                except idempotency.Conflict:
+                    # Used before (or concurrently) - answer with the stored
+                    # response; an expired key is freed and the view runs again
+                    stored = lookup_idempotency_key(scope, key)
+            return jsonify({'success': False, 'message': 'Request is already being processed'}), 409
+        except Error as e:
+            print(f"Database error: {e}")
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    return decorated_function
+
+def claim_idempotency_key(cursor):
+    """Reserve the request's Idempotency-Key; call before the view's first write"""
+    if 'idempotency' in g:
+        g.idempotency_expires = idempotency_store.claim(cursor, *g.idempotency)
+
+def remember_response(cursor, body, status_code=200):
+    """Store the response for the claimed key in the caller's transaction"""
+    if 'idempotency' in g:
+        scope, key, request_fingerprint = g.idempotency
+        g.idempotency_response = idempotency_store.save(
+            cursor, scope, key, request_fingerprint, status_code, body, g.idempotency_expires)
+    return body
+
+def commit_response(conn):
+    """Commit the view's transaction, then cache what remember_response() stored"""
+    conn.commit()
+    stored = g.pop('idempotency_response', None)
+    if stored is not None:
+        scope, key, _ = g.idempotency
+        idempotency_store.remember(scope, key, stored)
+
+# Rate limiting and admission control
+def busy_response(status_code, message, wait):
+    """429/503 with Retry-After, as JSON for fetch() callers and a page otherwise"""
+    if request.accept_mimetypes.best_match(['application/json', 'text/html']) == 'application/json':
+        response = jsonify({'success': False, 'message': message})
+    else:
+        response = current_app.make_response(render_template('busy.html', status_code=status_code, message=message))
+    response.status_code = status_code
+    response.headers['Retry-After'] = ratelimit.retry_after(wait)
+    return response
+
+@site.before_request
+def admit_request():
+    """Apply the per-user rate limit, then wait for a database slot"""
+    if request.endpoint in (None, 'static'):
+        return None
+    role = session.get('role', 'anonymous')
+    identity = f"{role}:{session['user_id']}" if 'user_id' in session else f"ip:{request.remote_addr}"
+    if 'site_id' in g and 'user_id' in session:
+        identity = f"{g.site_id}:{identity}"
+    wait = rate_limiter.check(request.endpoint, role, identity)
+    if wait:
+        return busy_response(429, 'Too many requests. Please slow down.', wait)
+    
+    if not admission.capacity:
+        return None
+    if request.endpoint in current_app.config['ADMISSION_CRITICAL_ENDPOINTS']:
+        priority, timeout = ratelimit.CRITICAL, current_app.config['ADMISSION_WRITE_TIMEOUT']
+    # A batch is a POST only to carry its list of reads
+    elif request.method in ('GET', 'HEAD') or request.endpoint == 'api_batch':
+        priority, timeout = ratelimit.READ, current_app.config['ADMISSION_READ_TIMEOUT']
+    else:
+        priority, timeout = ratelimit.WRITE, current_app.config['ADMISSION_WRITE_TIMEOUT']
+    if not admission.admit(priority, timeout):
+        return busy_response(503, 'The server is busy. Please try again shortly.', 1)
+    g.admitted = True
+    return None
+
+@site.teardown_request
+def release_request(error=None):
+    if g.pop('admitted', False):
+        admission.release()
+
+# Conditional GET
+def _assets_version():
+    """Newest template or static file; a deploy changes every page ETag"""
+    return max((os.path.getmtime(os.path.join(root, name))
+                for folder in (template_dir, static_dir)
+                for root, _, files in os.walk(folder) for name in files), default=0)
+
+ASSETS_VERSION = _assets_version()
+
+def page_etag(*versions):
+    """ETag for a page of the current user from the versions of the data it shows"""
+    key = repr((ASSETS_VERSION, session.get('site_id'), session.get('role'), session.get('user_id'),
+                session.get('username')) + versions)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def not_modified(etag):
+    """Return a 304 if the client already has this version of the page, else None
+    
+    Pages with flashed messages pending are always rendered, since the
+    messages are not part of the ETag.
+    """
+    if '_flashes' in session or not request.if_none_match.contains_weak(etag):
+        return None
+    return revalidate(current_app.response_class(status=304), etag)
+
+def revalidate(response, etag):
+    """Private, revalidate-every-time caching keyed by etag"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+# Static assets and compression
+static_assets = assets.StaticAssets(static_dir)
+
+@site.url_defaults
+def static_version(endpoint, values):
+    """Add the content hash to static URLs so they can be cached as immutable"""
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = static_assets.version(values['filename'])
+        if version:
+            values['v'] = version
+
+def static_file(filename):
+    """Serve a static file precompressed; cached for a year when the URL has its hash"""
+    asset = static_assets.get(filename)
+    if asset is None:
+        return current_app.send_static_file(filename)
+    encoding = request.accept_encodings.best_match([name for name in asset.variants if name])
+    response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if len(asset.variants) > 1:
+        response.vary.add('Accept-Encoding')
+    response.set_etag(f"{asset.version}-{encoding or 'identity'}")
+    response.headers['Cache-Control'] = (assets.IMMUTABLE if request.args.get('v') == asset.version
+                                         else 'no-cache')
+    return response.make_conditional(request)
+
+class StaticAwareSessionInterface(SecureCookieSessionInterface):
+    """Don't refresh the session cookie on static files
+
+    Setting it adds Vary: Cookie, which would stop browsers reusing the
+    cached copy once the cookie changes.
+    """
+    def should_set_cookie(self, app, session):
+        return request.endpoint != 'static' and super().should_set_cookie(app, session)
+
+@site.after_request
+def compress_response(response):
+    if request.endpoint != 'static':
+        assets.compress_response(response, request.accept_encodings, current_app.config['COMPRESS_MIN_SIZE'])
+    return response
+
 # Blood inventory management
-def update_blood_inventory(blood_group, quantity_change, operation='add'):
-    """Update blood inventory when donations are approved or requests are fulfilled"""
+def update_blood_inventory(blood_group, quantity_change, operation='add', conn=None,
+                           reason='adjustment', reference_id=None):
+    """Update blood inventory when donations are approved or requests are fulfilled
+    
+    When conn is given the update joins the caller's transaction and the
+    caller is responsible for committing it. Every change is also appended
+    to Inventory_Ledger with the resulting balance.
+    """
+    owns_connection = conn is None
     try:
-        conn = get_db_connection()
-        if not conn:
-            return False
+        if owns_connection:
+            conn = get_db_connection()
+            if not conn:
+                return False
         
         cursor = conn.cursor()
         
+        # Current level, locked until commit so the ledger balance is exact
+        cursor.execute("""
+            SELECT Available_Quantity FROM Blood_Inventory
+            WHERE Blood_Group = %s FOR UPDATE
+        """, (blood_group,))
+        row = cursor.fetchone()
+        balance = row[0] if row else 0
+        
         if operation == 'add':
             # Add blood to inventory (donation approved)
             query = """
@@ -104,23 +453,44 @@ def update_blood_inventory(blood_group, quantity_change, operation='add'):
             """
             cursor.execute(query, (quantity_change, blood_group))
         
-        conn.commit()
-        if 'cursor' in locals() and cursor:
-            cursor.close()
-        if 'conn' in locals() and conn:
+        if operation == 'add':
+            new_balance = balance + quantity_change
+        else:
+            new_balance = max(0, balance - quantity_change)
+        cursor.execute("""
+            INSERT INTO Inventory_Ledger (Blood_Group, Change_Quantity, Balance, Reason, Reference_ID)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (blood_group, new_balance - balance, new_balance, reason, reference_id))
+        
+        # Re-classify the group by days of supply and raise/resolve alerts
+        consumed = balance - new_balance if reason == 'request' else 0
+        shortage.evaluate(cursor, blood_group, new_balance, consumed)
+        
+        audit_event(reason, 'Blood_Inventory', blood_group,
+                    {'Available_Quantity': balance}, {'Available_Quantity': new_balance})
+        if owns_connection:
+            flush_audit(cursor)
+        cursor.close()
+        if owns_connection:
+            conn.commit()
             conn.close()
         return True
     except Error as e:
         print(f"Error updating blood inventory: {e}")
         return False
 
+# Bootstrap colour for each stock status in the templates
+@site.context_processor
+def inject_status_styles():
+    return {'status_styles': {'Critical': 'danger', 'Low': 'warning', 'Moderate': 'info', 'Good': 'success'}}
+
 # Routes
-@app.route('/')
+@site.route('/')
 def index():
     """Home page"""
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@site.route('/login', methods=['GET', 'POST'])
 def login():
     """Login page for admin, donor, and hospital"""
     if request.method == 'POST':
@@ -141,6 +511,8 @@ def login():
                 cursor.execute("SELECT Admin_ID, Username, Password FROM Admin WHERE Username = %s", (username,))
                 user = cursor.fetchone()
                 
+                # Imported here so a cold start that never sees an admin login skips it
+                import bcrypt
                 if user and bcrypt.checkpw(password.encode('utf-8'), user[2].encode('utf-8')):
                     session['user_id'] = user[0]
                     session['username'] = user[1]
@@ -188,7 +560,7 @@ def login():
     
     return render_template('login.html')
 
-@app.route('/register_donor', methods=['GET', 'POST'])
+@site.route('/register_donor', methods=['GET', 'POST'])
 def register_donor():
     """Donor registration page"""
     if request.method == 'POST':
@@ -200,8 +572,8 @@ def register_donor():
         address = request.form['address']
         
         # Validate age
-        if age < app.config['MIN_DONOR_AGE'] or age > app.config['MAX_DONOR_AGE']:
-            flash(f'Age must be between {app.config["MIN_DONOR_AGE"]} and {app.config["MAX_DONOR_AGE"]}', 'error')
+        if age < current_app.config['MIN_DONOR_AGE'] or age > current_app.config['MAX_DONOR_AGE']:
+            flash(f'Age must be between {current_app.config["MIN_DONOR_AGE"]} and {current_app.config["MAX_DONOR_AGE"]}', 'error')
             return render_template('register_donor.html')
         
         try:
@@ -218,11 +590,16 @@ def register_donor():
                 flash('Contact number already registered', 'error')
                 return render_template('register_donor.html')
             
-            # Insert new donor
+            # Insert new donor, placed on the map when the address names a known place
+            latitude, longitude = geocoding.geocode(cursor, address)
             cursor.execute("""
-                INSERT INTO Donor (Name, Age, Gender, Blood_Group, Contact, Address) 
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (name, age, gender, blood_group, contact, address))
+                INSERT INTO Donor (Name, Age, Gender, Blood_Group, Contact, Address, Latitude, Longitude) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, (name, age, gender, blood_group, contact, address, latitude, longitude))
+            audit_event('create', 'Donor', cursor.lastrowid, after={
+                'Name': name, 'Age': age, 'Gender': gender, 'Blood_Group': blood_group,
+                'Contact': contact, 'Address': address})
+            flush_audit(cursor)
             
             conn.commit()
             flash('Registration successful! You can now login.', 'success')
@@ -239,14 +616,15 @@ def register_donor():
     
     return render_template('register_donor.html')
 
-@app.route('/logout')
+@site.route('/logout')
 def logout():
     """Logout and clear session"""
     session.clear()
     flash('You have been logged out', 'info')
     return redirect(url_for('index'))
 
-@app.route('/dashboard_admin')
+@site.route('/dashboard_admin')
+@read_only
 @admin_required
 def dashboard_admin():
     """Admin dashboard with statistics and management options"""
@@ -271,10 +649,35 @@ def dashboard_admin():
         cursor.execute("SELECT COUNT(*) FROM Donation WHERE Status = 'Pending'")
         pending_donations = cursor.fetchone()[0]
         
-        # Get blood inventory
-        cursor.execute("SELECT Blood_Group, Available_Quantity FROM Blood_Inventory ORDER BY Blood_Group")
+        # Get blood inventory with consumption-based status
+        cursor.execute("""
+            SELECT Blood_Group, Available_Quantity, Status, Days_Of_Supply
+            FROM blood_availability ORDER BY Blood_Group
+        """)
         blood_inventory = cursor.fetchall()
         
+        # Get open shortage alerts
+        cursor.execute("""
+            SELECT Blood_Group, Status, Days_Of_Supply, Projected_Stockout, Raised_At, Alert_ID
+            FROM Shortage_Alert WHERE Resolved_At IS NULL
+            ORDER BY Projected_Stockout
+        """)
+        shortage_alerts = cursor.fetchall()
+        
+        # Hospital locations to target recall campaigns at
+        cursor.execute("SELECT DISTINCT Location FROM Hospital WHERE Is_Active = TRUE ORDER BY Location")
+        locations = [row[0] for row in cursor.fetchall()]
+        
+        # Get demand forecasts for all hospitals (refreshed by forecasting.py)
+        cursor.execute("""
+            SELECT i.Blood_Group, i.Available_Quantity, f.Next_7_Days, f.Next_30_Days,
+                   f.Daily_Level, f.Generated_At
+            FROM Blood_Inventory i
+            JOIN Demand_Forecast f ON f.Blood_Group = i.Blood_Group AND f.Hospital_ID = 0
+            ORDER BY i.Blood_Group
+        """)
+        demand_forecast = cursor.fetchall()
+        
         # Get recent requests
         cursor.execute("""
             SELECT r.Request_ID, h.Name, r.Blood_Group, r.Quantity, r.Date, r.Status
@@ -306,6 +709,9 @@ def dashboard_admin():
                              pending_requests=pending_requests,
                              pending_donations=pending_donations,
                              blood_inventory=blood_inventory,
+                             shortage_alerts=shortage_alerts,
+                             locations=locations,
+                             demand_forecast=demand_forecast,
                              recent_requests=recent_requests,
                              recent_donations=recent_donations)
     
@@ -314,7 +720,8 @@ def dashboard_admin():
         print(f"Database error: {e}")
         return redirect(url_for('login'))
 
-@app.route('/dashboard_donor')
+@site.route('/dashboard_donor')
+@read_only
 @login_required
 def dashboard_donor():
     """Donor dashboard showing donation history"""
@@ -330,28 +737,23 @@ def dashboard_donor():
         
         cursor = conn.cursor()
         
-        # Get donor information
+        # Get donor information and running donation totals
         cursor.execute("""
-            SELECT Name, Blood_Group, Contact, Address, Registration_Date
+            SELECT Name, Blood_Group, Contact, Address, Registration_Date,
+                   Total_Donations, Total_Blood_Donated
             FROM Donor WHERE Donor_ID = %s
         """, (session['user_id'],))
         donor_info = cursor.fetchone()
+        stats = donor_info[5:] if donor_info else (0, 0)
         
-        # Get donation history
+        # Get donation history (hot and archived)
         cursor.execute("""
             SELECT Donation_ID, Blood_Group, Quantity, Date, Status, Admin_Notes
-            FROM Donation WHERE Donor_ID = %s
+            FROM Donation_All WHERE Donor_ID = %s
             ORDER BY Date DESC
         """, (session['user_id'],))
         donation_history = cursor.fetchall()
         
-        # Get total donations
-        cursor.execute("""
-            SELECT COUNT(*) as total_donations, COALESCE(SUM(Quantity), 0) as total_blood
-            FROM Donation WHERE Donor_ID = %s AND Status = 'Approved'
-        """, (session['user_id'],))
-        stats = cursor.fetchone()
-        
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
@@ -367,7 +769,8 @@ def dashboard_donor():
         print(f"Database error: {e}")
         return redirect(url_for('login'))
 
-@app.route('/dashboard_hospital')
+@site.route('/dashboard_hospital')
+@read_only
 @login_required
 def dashboard_hospital():
     """Hospital dashboard for managing blood requests"""
@@ -383,42 +786,54 @@ def dashboard_hospital():
         
         cursor = conn.cursor()
         
-        # Get hospital information
+        # Get hospital information (Requests_Version changes with any of its requests)
         cursor.execute("""
-            SELECT Name, Location, Contact, Registration_Date
+            SELECT Name, Location, Contact, Registration_Date, Requests_Version
             FROM Hospital WHERE Hospital_ID = %s
         """, (session['user_id'],))
         hospital_info = cursor.fetchone()
         
-        # Get request history
+        # Get blood availability
+        cursor.execute("""
+            SELECT Blood_Group, Available_Quantity, Status, Days_Of_Supply
+            FROM blood_availability ORDER BY Blood_Group
+        """)
+        blood_availability = cursor.fetchall()
+        
+        # Unchanged since the client's copy: skip the history and rendering
+        etag = page_etag(hospital_info, blood_availability)
+        response = not_modified(etag)
+        if response:
+            cursor.close()
+            conn.close()
+            return response
+        
+        # Get request history (hot and archived)
         cursor.execute("""
             SELECT Request_ID, Blood_Group, Quantity, Date, Status, Admin_Notes
-            FROM Request WHERE Hospital_ID = %s
+            FROM Request_All WHERE Hospital_ID = %s
             ORDER BY Date DESC
         """, (session['user_id'],))
         request_history = cursor.fetchall()
         
-        # Get blood availability
-        cursor.execute("SELECT Blood_Group, Available_Quantity FROM Blood_Inventory ORDER BY Blood_Group")
-        blood_availability = cursor.fetchall()
-        
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
             conn.close()
         
-        return render_template('dashboard_hospital.html',
-                             hospital_info=hospital_info,
-                             request_history=request_history,
-                             blood_availability=blood_availability)
+        return revalidate(make_response(render_template('dashboard_hospital.html',
+                                                        hospital_info=hospital_info,
+                                                        request_history=request_history,
+                                                        blood_availability=blood_availability)), etag)
     
     except Error as e:
         flash('Error loading dashboard', 'error')
         print(f"Database error: {e}")
         return redirect(url_for('login'))
 
-@app.route('/add_donor', methods=['POST'])
+@site.route('/add_donor', methods=['POST'])
 @admin_required
+@idempotent
 def add_donor():
     """Add new donor (admin function)"""
     name = request.form['name']
@@ -434,32 +849,48 @@ def add_donor():
             return jsonify({'success': False, 'message': 'Database connection error'})
         
         cursor = conn.cursor()
+        # Before the contact check, so a replayed add is not reported as a duplicate
+        claim_idempotency_key(cursor)
         
         # Check if contact already exists
         cursor.execute("SELECT Donor_ID FROM Donor WHERE Contact = %s", (contact,))
         if cursor.fetchone():
+            conn.rollback()
             return jsonify({'success': False, 'message': 'Contact number already registered'})
         
-        # Insert new donor
+        # Insert new donor, placed on the map when the address names a known place
+        latitude, longitude = geocoding.geocode(cursor, address)
         cursor.execute("""
-            INSERT INTO Donor (Name, Age, Gender, Blood_Group, Contact, Address) 
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (name, age, gender, blood_group, contact, address))
-        
-        conn.commit()
+            INSERT INTO Donor (Name, Age, Gender, Blood_Group, Contact, Address, Latitude, Longitude) 
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """, (name, age, gender, blood_group, contact, address, latitude, longitude))
+        donor_id = cursor.lastrowid
+        audit_event('create', 'Donor', donor_id, after={
+            'Name': name, 'Age': age, 'Gender': gender, 'Blood_Group': blood_group,
+            'Contact': contact, 'Address': address})
+        flush_audit(cursor)
+        body = remember_response(cursor, {'success': True, 'message': 'Donor added successfully',
+                                          'donor_id': donor_id})
+        
+        commit_response(conn)
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
             conn.close()
         
-        return jsonify({'success': True, 'message': 'Donor added successfully'})
+        return jsonify(body)
     
+    except idempotency.Conflict:
+        conn.rollback()
+        conn.close()
+        raise
     except Error as e:
         print(f"Database error: {e}")
         return jsonify({'success': False, 'message': 'Failed to add donor'})
 
-@app.route('/add_request', methods=['POST'])
+@site.route('/add_request', methods=['POST'])
 @login_required
+@idempotent
 def add_request():
     """Add new blood request (hospital function)"""
     if session.get('role') != 'hospital':
@@ -477,24 +908,36 @@ def add_request():
         cursor = conn.cursor()
         
         # Insert new request
+        claim_idempotency_key(cursor)
         cursor.execute("""
             INSERT INTO Request (Hospital_ID, Blood_Group, Quantity, Date) 
             VALUES (%s, %s, %s, %s)
         """, (session['user_id'], blood_group, quantity, request_date))
-        
-        conn.commit()
+        request_id = cursor.lastrowid
+        audit_event('create', 'Request', request_id, after={
+            'Hospital_ID': session['user_id'], 'Blood_Group': blood_group,
+            'Quantity': quantity, 'Date': request_date, 'Status': 'Pending'})
+        flush_audit(cursor)
+        body = remember_response(cursor, {'success': True, 'message': 'Blood request submitted successfully',
+                                          'request_id': request_id})
+        
+        commit_response(conn)
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
             conn.close()
         
-        return jsonify({'success': True, 'message': 'Blood request submitted successfully'})
+        return jsonify(body)
     
+    except idempotency.Conflict:
+        conn.rollback()
+        conn.close()
+        raise
     except Error as e:
         print(f"Database error: {e}")
         return jsonify({'success': False, 'message': 'Failed to submit request'})
 
-@app.route('/approve_request/<int:request_id>')
+@site.route('/approve_request/<int:request_id>')
 @admin_required
 def approve_request(request_id):
     """Approve blood request and update inventory"""
@@ -508,16 +951,18 @@ def approve_request(request_id):
         
         # Get request details
         cursor.execute("""
-            SELECT Blood_Group, Quantity FROM Request 
+            SELECT Blood_Group, Quantity, Hospital_ID FROM Request 
             WHERE Request_ID = %s AND Status = 'Pending'
         """, (request_id,))
         request_data = cursor.fetchone()
         
         if not request_data:
+            cursor.close()
+            conn.close()
             flash('Request not found or already processed', 'error')
             return redirect(url_for('dashboard_admin'))
         
-        blood_group, quantity = request_data
+        blood_group, quantity, hospital_id = request_data
         
         # Check if enough blood is available
         cursor.execute("""
@@ -527,21 +972,38 @@ def approve_request(request_id):
         available = cursor.fetchone()
         
         if not available or available[0] < quantity:
+            cursor.close()
+            conn.close()
             flash('Insufficient blood available', 'error')
             return redirect(url_for('dashboard_admin'))
         
-        # Update request status
+        # Update request status (guarded so a retry cannot debit inventory twice)
         cursor.execute("""
             UPDATE Request SET Status = 'Approved' 
-            WHERE Request_ID = %s
+            WHERE Request_ID = %s AND Status = 'Pending'
         """, (request_id,))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            cursor.close()
+            conn.close()
+            flash('Request not found or already processed', 'error')
+            return redirect(url_for('dashboard_admin'))
+        
+        audit_event('approve', 'Request', request_id, {'Status': 'Pending'}, {'Status': 'Approved'})
         
         # Update blood inventory
-        if update_blood_inventory(blood_group, quantity, 'subtract'):
+        if update_blood_inventory(blood_group, quantity, 'subtract', conn, 'request', request_id):
+            # Queued in the same transaction; notifications.py delivers it
+            notifications.notify_hospital(
+                cursor, hospital_id, 'Blood request approved',
+                f'Your request #{request_id} for {quantity} ml of {blood_group} blood has been '
+                f'approved and is ready for collection.', 'request_approved', request_id)
+            flush_audit(cursor)
             conn.commit()
             flash('Request approved and inventory updated', 'success')
         else:
-            flash('Request approved but inventory update failed', 'warning')
+            conn.rollback()
+            flash('Inventory update failed; the request is still pending', 'error')
         
         if 'cursor' in locals() and cursor:
             cursor.close()
@@ -551,10 +1013,13 @@ def approve_request(request_id):
     except Error as e:
         flash('Error processing request', 'error')
         print(f"Database error: {e}")
+        # Returning the connection to the pool rolls back the half-done approval
+        if 'conn' in locals() and conn:
+            conn.close()
     
     return redirect(url_for('dashboard_admin'))
 
-@app.route('/approve_donation/<int:donation_id>')
+@site.route('/approve_donation/<int:donation_id>')
 @admin_required
 def approve_donation(donation_id):
     """Approve blood donation and update inventory"""
@@ -568,7 +1033,7 @@ def approve_donation(donation_id):
         
         # Get donation details
         cursor.execute("""
-            SELECT Blood_Group, Quantity FROM Donation 
+            SELECT Donor_ID, Blood_Group, Quantity, Date FROM Donation 
             WHERE Donation_ID = %s AND Status = 'Pending'
         """, (donation_id,))
         donation_data = cursor.fetchone()
@@ -577,16 +1042,24 @@ def approve_donation(donation_id):
             flash('Donation not found or already processed', 'error')
             return redirect(url_for('dashboard_admin'))
         
-        blood_group, quantity = donation_data
+        donor_id, blood_group, quantity, donation_date = donation_data
         
-        # Update donation status
+        # Update donation status (guarded so a double click cannot count it twice)
         cursor.execute("""
             UPDATE Donation SET Status = 'Approved' 
-            WHERE Donation_ID = %s
+            WHERE Donation_ID = %s AND Status = 'Pending'
         """, (donation_id,))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            flash('Donation not found or already processed', 'error')
+            return redirect(url_for('dashboard_admin'))
         
-        # Update blood inventory
-        if update_blood_inventory(blood_group, quantity, 'add'):
+        audit_event('approve', 'Donation', donation_id, {'Status': 'Pending'}, {'Status': 'Approved'})
+        
+        # Update the donor's running totals and blood inventory
+        donor_totals.add_donation(cursor, donor_id, quantity, donation_date)
+        if update_blood_inventory(blood_group, quantity, 'add', conn, 'donation', donation_id):
+            flush_audit(cursor)
             conn.commit()
             flash('Donation approved and inventory updated', 'success')
         else:
@@ -603,10 +1076,72 @@ def approve_donation(donation_id):
     
     return redirect(url_for('dashboard_admin'))
 
-@app.route('/donor_list')
+@site.route('/reject_donation/<int:donation_id>')
+@admin_required
+def reject_donation(donation_id):
+    """Reject a pending donation, or reverse an approved one"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            flash('Database connection error', 'error')
+            return redirect(url_for('dashboard_admin'))
+        
+        cursor = conn.cursor()
+        
+        # Get donation details
+        cursor.execute("""
+            SELECT Donor_ID, Blood_Group, Quantity, Status FROM Donation 
+            WHERE Donation_ID = %s AND Status IN ('Pending', 'Approved')
+        """, (donation_id,))
+        donation_data = cursor.fetchone()
+        
+        if not donation_data:
+            flash('Donation not found or already rejected', 'error')
+            return redirect(url_for('dashboard_admin'))
+        
+        donor_id, blood_group, quantity, status = donation_data
+        
+        cursor.execute("""
+            UPDATE Donation SET Status = 'Rejected' 
+            WHERE Donation_ID = %s AND Status = %s
+        """, (donation_id, status))
+        if cursor.rowcount != 1:
+            conn.rollback()
+            flash('Donation was changed by someone else, please retry', 'error')
+            return redirect(url_for('dashboard_admin'))
+        audit_event('reverse' if status == 'Approved' else 'reject', 'Donation', donation_id,
+                    {'Status': status}, {'Status': 'Rejected'})
+        
+        if status == 'Approved':
+            # Reversal: take the blood back out and uncount it for the donor
+            donor_totals.remove_donation(cursor, donor_id, quantity)
+            if not update_blood_inventory(blood_group, quantity, 'subtract', conn, 'reversal', donation_id):
+                conn.rollback()
+                flash('Donation reversal failed', 'error')
+                return redirect(url_for('dashboard_admin'))
+            flash('Donation approval reversed and inventory updated', 'success')
+        else:
+            flash('Donation rejected', 'success')
+        flush_audit(cursor)
+        conn.commit()
+        
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn:
+            conn.close()
+        
+    except Error as e:
+        flash('Error processing donation', 'error')
+        print(f"Database error: {e}")
+    
+    return redirect(url_for('dashboard_admin'))
+
+@site.route('/donor_list')
+@read_only
 @admin_required
 def donor_list():
-    """Display list of all donors"""
+    """Display the first donors by name; the search box finds the others"""
+    limit = current_app.config['DONOR_SEARCH_LIMIT']
     try:
         conn = get_db_connection()
         if not conn:
@@ -615,34 +1150,47 @@ def donor_list():
         
         cursor = conn.cursor()
         
-        # Get all donors with donation summary
+        # The first page of donors with their running donation totals; the
+        # same list /api/donors/search gives once the filters are cleared
         cursor.execute("""
-            SELECT d.Donor_ID, d.Name, d.Age, d.Gender, d.Blood_Group, 
-                   d.Contact, d.Address, d.Registration_Date,
-                   COUNT(dn.Donation_ID) as Total_Donations,
-                   COALESCE(SUM(dn.Quantity), 0) as Total_Blood_Donated
-            FROM Donor d
-            LEFT JOIN Donation dn ON d.Donor_ID = dn.Donor_ID AND dn.Status = 'Approved'
-            WHERE d.Is_Active = TRUE
-            GROUP BY d.Donor_ID
-            ORDER BY d.Name
-        """)
+            SELECT Donor_ID, Name, Age, Gender, Blood_Group, 
+                   Contact, Address, Registration_Date,
+                   Total_Donations, Total_Blood_Donated
+            FROM Donor
+            WHERE Is_Active = TRUE
+            ORDER BY Name
+            LIMIT %s
+        """, (limit,))
         donors = cursor.fetchall()
         
+        # Header figures over every active donor. Scanning the table is
+        # faster than visiting nearly every row through the Is_Active index,
+        # which the unary plus keeps SQLite from using
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(CASE WHEN Total_Donations > 0 THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(CASE WHEN Total_Donations >= 10 THEN 1 ELSE 0 END), 0),
+                   COALESCE(SUM(Total_Blood_Donated), 0)
+            FROM Donor
+            WHERE +Is_Active = TRUE
+        """)
+        stats = dict(zip(('donors', 'donating', 'gold', 'blood'), cursor.fetchone()))
+        
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
             conn.close()
         
-        return render_template('donor_list.html', donors=donors)
+        return render_template('donor_list.html', donors=donors, stats=stats, limit=limit)
     
     except Error as e:
         flash('Error loading donor list', 'error')
         print(f"Database error: {e}")
         return redirect(url_for('dashboard_admin'))
 
-@app.route('/add_donation', methods=['POST'])
+@site.route('/add_donation', methods=['POST'])
 @login_required
+@idempotent
 def add_donation():
     """Add new blood donation (donor function)"""
     if session.get('role') != 'donor':
@@ -661,24 +1209,37 @@ def add_donation():
         cursor = conn.cursor()
         
         # Insert new donation
+        claim_idempotency_key(cursor)
         cursor.execute("""
             INSERT INTO Donation (Donor_ID, Blood_Group, Quantity, Date, Admin_Notes) 
             VALUES (%s, %s, %s, %s, %s)
         """, (session['user_id'], blood_group, quantity, donation_date, notes))
-        
-        conn.commit()
+        donation_id = cursor.lastrowid
+        audit_event('create', 'Donation', donation_id, after={
+            'Donor_ID': session['user_id'], 'Blood_Group': blood_group, 'Quantity': quantity,
+            'Date': donation_date, 'Status': 'Pending'})
+        flush_audit(cursor)
+        body = remember_response(cursor, {'success': True, 'message': 'Donation scheduled successfully',
+                                          'donation_id': donation_id})
+        
+        commit_response(conn)
         if 'cursor' in locals() and cursor:
             cursor.close()
         if 'conn' in locals() and conn:
             conn.close()
         
-        return jsonify({'success': True, 'message': 'Donation scheduled successfully'})
+        return jsonify(body)
     
+    except idempotency.Conflict:
+        conn.rollback()
+        conn.close()
+        raise
     except Error as e:
         print(f"Database error: {e}")
         return jsonify({'success': False, 'message': 'Failed to schedule donation'})
 
-@app.route('/request_blood')
+@site.route('/request_blood')
+@read_only
 @login_required
 def request_blood():
     """Blood request page for hospitals"""
@@ -695,7 +1256,10 @@ def request_blood():
         cursor = conn.cursor()
         
         # Get blood availability
-        cursor.execute("SELECT Blood_Group, Available_Quantity FROM Blood_Inventory ORDER BY Blood_Group")
+        cursor.execute("""
+            SELECT Blood_Group, Available_Quantity, Status, Days_Of_Supply
+            FROM blood_availability ORDER BY Blood_Group
+        """)
         blood_availability = cursor.fetchall()
         
         if 'cursor' in locals() and cursor:
@@ -703,21 +1267,649 @@ def request_blood():
         if 'conn' in locals() and conn:
             conn.close()
         
-        return render_template('request_blood.html', blood_availability=blood_availability)
+        etag = page_etag(blood_availability)
+        return not_modified(etag) or revalidate(
+            make_response(render_template('request_blood.html', blood_availability=blood_availability)), etag)
     
     except Error as e:
         flash('Error loading page', 'error')
         print(f"Database error: {e}")
         return redirect(url_for('dashboard_hospital'))
 
+# JSON API
+@site.route('/api/inventory')
+@read_only
+@login_required
+def inventory_status():
+    """Current stock per blood group for polling pages; answers 304 when unchanged"""
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+        
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT Blood_Group, Available_Quantity, Status, Days_Of_Supply
+            FROM blood_availability ORDER BY Blood_Group
+        """)
+        blood_availability = cursor.fetchall()
+        # Latest change to the stock or its status, for If-Modified-Since
+        cursor.execute("SELECT Last_Updated FROM Blood_Inventory ORDER BY Last_Updated DESC LIMIT 1")
+        changed = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT Updated_At FROM Blood_Group_Status ORDER BY Updated_At DESC LIMIT 1")
+        changed += [row[0] for row in cursor.fetchall()]
+        
+        cursor.close()
+        conn.close()
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load inventory'}), 500
+    
+    response = jsonify({'success': True, 'inventory': [{
+        'blood_group': blood_group,
+        'quantity': float(quantity),
+        'status': status,
+        'days_of_supply': float(days_of_supply) if days_of_supply is not None else None,
+    } for blood_group, quantity, status, days_of_supply in blood_availability]})
+    revalidate(response, hashlib.sha1(repr(blood_availability).encode('utf-8')).hexdigest())
+    changed = [value for value in changed if value]
+    if changed:
+        response.last_modified = max(changed)
+    return response.make_conditional(request)
+
+def site_summary(cursor):
+    """Stock and pending work of one site, for the cross-site view"""
+    cursor.execute("""
+        SELECT Blood_Group, Available_Quantity, Status, Days_Of_Supply
+        FROM blood_availability ORDER BY Blood_Group
+    """)
+    inventory = [{
+        'blood_group': blood_group,
+        'quantity': float(quantity),
+        'status': status,
+        'days_of_supply': float(days_of_supply) if days_of_supply is not None else None,
+    } for blood_group, quantity, status, days_of_supply in cursor.fetchall()]
+    cursor.execute("SELECT COUNT(*) FROM Request WHERE Status = 'Pending'")
+    pending_requests = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM Donation WHERE Status = 'Pending'")
+    pending_donations = cursor.fetchone()[0]
+    return {'inventory': inventory, 'pending_requests': pending_requests,
+            'pending_donations': pending_donations}
+
+@site.route('/api/sites')
+@admin_required
+def network_status():
+    """Stock of every site and network-wide totals, gathered from all sites at once"""
+    if not shard_map.sites:
+        return jsonify({'success': False, 'message': 'Multi-site mode is not enabled'}), 404
+    
+    summaries, errors = shard_map.fan_out(site_summary)
+    totals = {}
+    for summary in summaries.values():
+        for row in summary['inventory']:
+            totals[row['blood_group']] = totals.get(row['blood_group'], 0) + row['quantity']
+    for site_id, error in errors.items():
+        print(f"Site {site_id} left out of the network view: {error}")
+    
+    return jsonify({'success': True,
+                    'sites': {site_id: summaries[site_id] for site_id in shard_map.sites if site_id in summaries},
+                    'totals': dict(sorted(totals.items())),
+                    'unavailable': errors})
+
+@site.route('/api/transfers')
+@admin_required
+def transfer_plan():
+    """Cheapest transfers that bring every site up to its cover of forecast demand
+    
+    Query parameters: cover_days and unit_ml (default TRANSFER_COVER_DAYS
+    and TRANSFER_UNIT_ML).
+    """
+    if not shard_map.sites:
+        return jsonify({'success': False, 'message': 'Multi-site mode is not enabled'}), 404
+    cover_days = request.args.get('cover_days', type=float)
+    unit_ml = request.args.get('unit_ml', type=int)
+    if (cover_days is not None and cover_days <= 0) or (unit_ml is not None and unit_ml <= 0):
+        return jsonify({'success': False, 'message': 'cover_days and unit_ml must be positive'}), 400
+    
+    import transfers
+    plan, errors = transfers.network_plan(shard_map, current_app.config, cover_days, unit_ml)
+    for site_id, error in errors.items():
+        print(f"Site {site_id} left out of the transfer plan: {error}")
+    
+    return jsonify({'success': True,
+                    'transfers': [t._asdict() for t in plan.transfers],
+                    'shortfalls': [{'site': site_id, 'blood_group': blood_group, 'units': units}
+                                   for (site_id, blood_group), units in sorted(plan.shortfalls.items())],
+                    'total_minutes': plan.total_minutes,
+                    'unavailable': errors})
+
+@site.route('/api/fragment_cache')
+@admin_required
+def fragment_cache_stats():
+    """Template fragment cache size and hit/miss counters"""
+    return jsonify({'success': True, **current_app.jinja_env.fragment_cache.stats()})
+
+@site.route('/api/inventory/trend')
+@read_only
+@login_required
+def inventory_trend():
+    """Stock level series per blood group, read from the inventory rollups
+    
+    Query parameters: start and end (ISO date or datetime; default the last
+    7 days), resolution (minute, hour or day; picked from the range when
+    omitted) and blood_group (repeatable; all groups when omitted).
+    """
+    resolution = request.args.get('resolution')
+    if resolution and resolution not in inventory_history.RESOLUTIONS:
+        return jsonify({'success': False, 'message': 'resolution must be minute, hour or day'}), 400
+    # An unescaped '+' in a query string arrives as a space
+    blood_groups = [group.replace(' ', '+') for group in request.args.getlist('blood_group')]
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+        
+        cursor = conn.cursor()
+        try:
+            end = (datetime.fromisoformat(request.args['end']) if 'end' in request.args
+                   else inventory_history.database_now(cursor))
+            start = (datetime.fromisoformat(request.args['start']) if 'start' in request.args
+                     else end - timedelta(days=7))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'start and end must be ISO dates'}), 400
+        if start >= end:
+            return jsonify({'success': False, 'message': 'start must be before end'}), 400
+        resolution = resolution or inventory_history.pick_resolution(start, end)
+        if (end - start) / inventory_history.STEPS[resolution] > inventory_history.MAX_POINTS:
+            return jsonify({'success': False, 'message': 'Range too long for this resolution'}), 400
+        
+        resolution, series = inventory_history.trend(cursor, start, end, resolution, blood_groups)
+        rolled_up_to = inventory_history.get_watermark(cursor, resolution)
+        
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn:
+            conn.close()
+        
+        summary = {group: {
+            'hours_critical': round(sum(point['seconds_critical'] for point in points) / 3600, 2),
+            'hours_low': round(sum(point['seconds_low'] for point in points) / 3600, 2),
+        } for group, points in series.items()}
+        return jsonify({
+            'success': True,
+            'resolution': resolution,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'rolled_up_to': rolled_up_to.isoformat() if rolled_up_to else None,
+            'series': series,
+            'summary': summary,
+        })
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load inventory trend'}), 500
+
+@site.route('/api/hospitals/<int:hospital_id>/nearest_donors')
+@read_only
+@login_required
+def nearest_donors(hospital_id):
+    """Nearest donors who can give to a patient's blood group and may donate today
+    
+    Query parameters: blood_group (the patient's), k (default 10, at most
+    GEO_MAX_DONORS) and max_km. Admins may search for any hospital,
+    hospitals only for themselves.
+    """
+    role = session.get('role')
+    if role != 'admin' and not (role == 'hospital' and session['user_id'] == hospital_id):
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    # An unescaped '+' in a query string arrives as a space
+    blood_group = request.args.get('blood_group', '').replace(' ', '+')
+    if blood_group not in current_app.config['BLOOD_GROUP_COMPATIBILITY']:
+        return jsonify({'success': False, 'message': 'blood_group is required'}), 400
+    k = request.args.get('k', 10, type=int)
+    max_km = request.args.get('max_km', type=float)
+    if not 1 <= k <= current_app.config['GEO_MAX_DONORS'] or (max_km is not None and max_km <= 0):
+        return jsonify({'success': False, 'message': f"k must be between 1 and {current_app.config['GEO_MAX_DONORS']} "
+                                                     "and max_km positive"}), 400
+    
+    import geo
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    
+        cursor = conn.cursor()
+        point = geo.hospital_point(cursor, hospital_id)
+        if point is None:
+            return jsonify({'success': False, 'message': 'Hospital not found'}), 404
+        if point[0] is None:
+            return jsonify({'success': False, 'message': 'Hospital location matches no known place'}), 422
+    
+        index = donor_indexes.get(g.get('site_id'))
+        if index is None:
+            index = donor_indexes.setdefault(g.get('site_id'), geo.DonorIndex(current_app.config))
+        index.refresh(cursor)
+        donors = geo.nearest_eligible_donors(cursor, index, point[0], point[1], blood_group, k,
+                                             max_km, current_app.config)
+        return jsonify({
+            'success': True,
+            'hospital_id': hospital_id,
+            'blood_group': blood_group,
+            'donor_groups': current_app.config['BLOOD_GROUP_COMPATIBILITY'][blood_group],
+            'donors': [{'donor_id': donor_id, 'name': name, 'blood_group': group,
+                        'contact': contact, 'distance_km': distance}
+                       for donor_id, name, group, contact, distance in donors],
+        })
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to search donors'}), 500
+    finally:
+        if 'conn' in locals() and conn:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            conn.close()
+
+def contact_index(cursor):
+    """This process's search.ContactIndex for the current site, brought up to date"""
+    import search
+    index = contact_indexes.get(g.get('site_id'))
+    if index is None:
+        index = contact_indexes.setdefault(g.get('site_id'), search.ContactIndex(current_app.config))
+    index.refresh(cursor)
+    return index
+
+@site.route('/api/donors/search')
+@read_only
+@admin_required
+def search_donors():
+    """Active donors matching a search, for the donor list
+    
+    Query parameters: q (words of the name or address, or the start of a
+    contact number), blood_group, min_donations, max_donations and limit
+    (at most DONOR_SEARCH_LIMIT).
+    """
+    blood_group = request.args.get('blood_group', '').replace(' ', '+') or None
+    if blood_group is not None and blood_group not in current_app.config['BLOOD_GROUP_COMPATIBILITY']:
+        return jsonify({'success': False, 'message': 'Unknown blood_group'}), 400
+    text = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', current_app.config['DONOR_SEARCH_LIMIT'], type=int),
+                       current_app.config['DONOR_SEARCH_LIMIT']))
+    
+    import search
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    
+        cursor = conn.cursor()
+        index = contact_index(cursor) if search.is_contact(text) else None
+        donors = search.search_donors(cursor, index, text, blood_group,
+                                      request.args.get('min_donations', type=int),
+                                      request.args.get('max_donations', type=int), limit)
+        return jsonify({'success': True, 'donors': donors})
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to search donors'}), 500
+    finally:
+        if 'conn' in locals() and conn:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            conn.close()
+
+@site.route('/api/donors/autocomplete')
+@read_only
+@admin_required
+def autocomplete_contacts():
+    """Donors whose contact number starts with q, in contact order
+    
+    Query parameters: q and k (default 10, at most DONOR_SEARCH_LIMIT).
+    """
+    prefix = request.args.get('q', '').strip()
+    k = max(1, min(request.args.get('k', 10, type=int), current_app.config['DONOR_SEARCH_LIMIT']))
+    if not prefix:
+        return jsonify({'success': True, 'suggestions': []})
+    
+    import search
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    
+        cursor = conn.cursor()
+        suggestions = search.autocomplete(cursor, contact_index(cursor), prefix, k)
+        return jsonify({'success': True, 'suggestions': suggestions})
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to complete contact'}), 500
+    finally:
+        if 'conn' in locals() and conn:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            conn.close()
+
+@site.route('/api/forecast')
+@read_only
+@login_required
+def demand_forecast():
+    """7/30-day demand forecasts per blood group
+    
+    Admins get all hospitals combined (with the day-by-day series) or one
+    hospital via ?hospital_id=; hospitals always get their own forecast.
+    """
+    role = session.get('role')
+    if role == 'hospital':
+        hospital_id = session['user_id']
+    elif role == 'admin':
+        hospital_id = request.args.get('hospital_id', 0, type=int)
+    else:
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+        
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT Blood_Group, Daily_Level, Daily_Std, Next_7_Days, Next_30_Days, Generated_At
+            FROM Demand_Forecast WHERE Hospital_ID = %s
+            ORDER BY Blood_Group
+        """, (hospital_id,))
+        forecasts = {row[0]: {
+            'daily_level': float(row[1]),
+            'daily_std': float(row[2]),
+            'next_7_days': float(row[3]),
+            'next_30_days': float(row[4]),
+            'generated_at': row[5].isoformat() if row[5] else None,
+        } for row in cursor.fetchall()}
+        
+        if hospital_id == 0:
+            cursor.execute("""
+                SELECT Blood_Group, Forecast_Date, Quantity FROM Demand_Forecast_Daily
+                ORDER BY Blood_Group, Forecast_Date
+            """)
+            for blood_group, forecast_date, quantity in cursor.fetchall():
+                if blood_group in forecasts:
+                    forecasts[blood_group].setdefault('daily', []).append(
+                        {'date': forecast_date.isoformat(), 'quantity': float(quantity)})
+        
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn:
+            conn.close()
+        
+        return jsonify({'success': True, 'hospital_id': hospital_id, 'forecasts': forecasts})
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load forecast'}), 500
+
+@site.route('/recall_campaign', methods=['POST'])
+@admin_required
+def create_recall_campaign():
+    """Build a ranked donor call list for a short blood group and download it"""
+    blood_group = request.form.get('blood_group')
+    if blood_group not in current_app.config['BLOOD_GROUP_COMPATIBILITY']:
+        flash('Invalid blood group', 'error')
+        return redirect(url_for('dashboard_admin'))
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            flash('Database connection error', 'error')
+            return redirect(url_for('dashboard_admin'))
+        
+        import recall
+        campaign_id = recall.build_campaign(conn, blood_group,
+                                            request.form.get('location') or None,
+                                            request.form.get('alert_id', type=int),
+                                            notify=bool(request.form.get('notify')))
+        
+        # The campaign is committed by build_campaign; its audit row follows
+        cursor = conn.cursor()
+        audit_event('create', 'Recall_Campaign', campaign_id, after={
+            'Blood_Group': blood_group, 'Location': request.form.get('location') or None,
+            'Alert_ID': request.form.get('alert_id', type=int), 'Notify': bool(request.form.get('notify'))})
+        flush_audit(cursor)
+        conn.commit()
+        
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn:
+            conn.close()
+        
+        return redirect(url_for('recall_campaign_csv', campaign_id=campaign_id))
+    
+    except Error as e:
+        flash('Error building recall campaign', 'error')
+        print(f"Database error: {e}")
+        return redirect(url_for('dashboard_admin'))
+
+@site.route('/recall_campaign/<int:campaign_id>.csv')
+@read_only
+@admin_required
+def recall_campaign_csv(campaign_id):
+    """Stream a campaign's call list as CSV without loading it into memory"""
+    conn = get_db_connection()
+    if not conn:
+        return 'Database connection error', 503
+    
+    import recall
+    
+    def generate():
+        cursor = conn.cursor()
+        try:
+            yield from recall.csv_chunks(recall.call_list(cursor, campaign_id))
+        finally:
+            cursor.close()
+            conn.close()
+    
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename=recall_campaign_{campaign_id}.csv'})
+
+@site.route('/api/audit')
+@read_only
+@admin_required
+def audit_trail():
+    """Audit events newest first
+    
+    Query parameters: entity and entity_id (e.g. Donation / 42), start and
+    end (ISO date or datetime), actor_type and actor_id, limit (max 500) and
+    before_id (the next_before_id of the previous page).
+    """
+    actor_type = request.args.get('actor_type')
+    if actor_type and actor_type not in audit.ACTOR_TYPES:
+        return jsonify({'success': False, 'message': 'Unknown actor_type'}), 400
+    try:
+        start = datetime.fromisoformat(request.args['start']) if 'start' in request.args else None
+        end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'start and end must be ISO dates'}), 400
+    limit = max(1, min(request.args.get('limit', 100, type=int), audit.MAX_PAGE))
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'success': False, 'message': 'Database connection error'}), 503
+        
+        cursor = conn.cursor()
+        events = audit.query(cursor, request.args.get('entity'), request.args.get('entity_id'),
+                             start, end, actor_type, request.args.get('actor_id', type=int),
+                             request.args.get('before_id', type=int), limit)
+        
+        if 'cursor' in locals() and cursor:
+            cursor.close()
+        if 'conn' in locals() and conn:
+            conn.close()
+        
+        return jsonify({
+            'success': True,
+            'events': events,
+            'next_before_id': events[-1]['id'] if len(events) == limit else None,
+        })
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load audit trail'}), 500
+
+# Versioned JSON API (api.py), for hospital laboratory systems and other clients
+def api_response(status, body):
+    """body encoded by api.dumps, which writes DECIMAL columns as numbers and dates as ISO 8601"""
+    return Response(api.dumps(body), status=status, mimetype='application/json')
+
+@site.route('/api/v1/<path:path>')
+@read_only
+def api_v1(path):
+    """A page of donors, donations, requests or inventory, or one of them by key
+    
+    Query parameters: fields (comma-separated), equality filters, limit and
+    after (the next_after of the previous page); see api.RESOURCES. Donors
+    and hospitals only see their own rows.
+    """
+    if 'user_id' not in session:
+        return api_response(401, {'success': False, 'message': 'Login required'})
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return api_response(503, {'success': False, 'message': 'Database connection error'})
+        
+        cursor = conn.cursor()
+        status, body = api.read(cursor, request.path, request.args, session['role'],
+                                session['user_id'], current_app.config)
+        return api_response(status, body)
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return api_response(500, {'success': False, 'message': 'Failed to read from the database'})
+    finally:
+        if 'conn' in locals() and conn:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            conn.close()
+
+@site.route('/api/v1/batch', methods=['POST'])
+@read_only
+def api_batch():
+    """Several /api/v1 reads in one round trip, over one database connection
+    
+    The JSON body is {"requests": [{"id": ..., "path": "/api/v1/..."}, ...]};
+    the answer lists {"id", "status", "body"} for each, in the same order.
+    """
+    if 'user_id' not in session:
+        return api_response(401, {'success': False, 'message': 'Login required'})
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return api_response(400, {'success': False, 'message': 'Expected a JSON object with requests'})
+    
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return api_response(503, {'success': False, 'message': 'Database connection error'})
+        
+        cursor = conn.cursor()
+        status, body = api.batch(cursor, payload.get('requests'), session['role'],
+                                 session['user_id'], current_app.config)
+        return api_response(status, body)
+    
+    except Error as e:
+        print(f"Database error: {e}")
+        return api_response(500, {'success': False, 'message': 'Failed to read from the database'})
+    finally:
+        if 'conn' in locals() and conn:
+            if 'cursor' in locals() and cursor:
+                cursor.close()
+            conn.close()
+
 # Error handlers
-@app.errorhandler(404)
+@site.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
 
-@app.errorhandler(500)
+@site.errorhandler(500)
 def internal_error(error):
     return render_template('500.html'), 500
 
+# Application factory
+def init_process(app):
+    """Create the resources each process needs its own of
+    
+    Called by create_app(), and again in every worker forked from a master
+    that preloaded the app (see gunicorn.conf.py).
+    """
+    global db_pool, read_router, shard_map, rate_limiter, admission, donor_indexes, contact_indexes
+    db_pool = db.ConnectionPool(app.config)
+    read_router = replicas.ReadRouter(app.config)
+    shard_map = sharding.ShardMap(app.config)
+    rate_limiter = ratelimit.RateLimiter(ratelimit.parse_limits(app.config['RATE_LIMITS']),
+                                         ratelimit.load_backend(app.config['RATE_LIMIT_BACKEND']))
+    admission = ratelimit.AdmissionController(app.config['DB_MAX_CONCURRENCY'],
+                                              app.config['ADMISSION_RESERVED_SLOTS'])
+    # geo.DonorIndex and search.ContactIndex per site (None outside multi-site
+    # mode), built on first use
+    donor_indexes = {}
+    contact_indexes = {}
+
+def create_app(config_name=None):
+    """Build the Flask application
+    
+    config_name is a key of config.config; by default 'production' when
+    FLASK_ENV is production (as on Vercel) and 'development' otherwise.
+    Per-process resources are module-wide, so a process serves one app.
+    """
+    if config_name is None:
+        config_name = 'production' if os.environ.get('FLASK_ENV') == 'production' else 'development'
+    app = Flask(__name__,
+                template_folder=template_dir,
+                static_folder=static_dir)
+    app.config.from_object(config[config_name])
+    
+    # Rendered template fragments, see {% cache %} in the templates
+    app.jinja_env.add_extension(fragment_cache.FragmentCacheExtension)
+    app.jinja_env.fragment_cache = fragment_cache.FragmentCache(
+        0 if app.debug else app.config['FRAGMENT_CACHE_MAX_BYTES'])
+    
+    app.session_interface = StaticAwareSessionInterface()
+    site.init_app(app)
+    app.view_functions['static'] = static_file
+    init_process(app)
+    return app
+
+def preload(app):
+    """Do the start-up work once, in a master process about to fork workers
+    
+    Compiles every template, hashes and compresses the static files and
+    imports the modules otherwise loaded on first use, so the workers share
+    all of it copy-on-write instead of each building its own. The garbage
+    collector is then frozen: collections in the workers would otherwise
+    write to every shared object's header and copy the pages anyway.
+    """
+    import bcrypt  # noqa: F401
+    # The views import these on first use: they pull in numpy, most of the
+    # import time of a cold start
+    import recall  # noqa: F401
+    import transfers  # noqa: F401
+    import geo  # noqa: F401
+    import search  # noqa: F401
+    if app.config['DB_BACKEND'] != 'sqlite':
+        import mysql.connector  # noqa: F401
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    for filename in static_assets.files():
+        static_assets.get(filename)
+    # A worker must not inherit its parent's sockets
+    db_pool.clear()
+    read_router.clear()
+    shard_map.clear()
+    gc.collect()
+    gc.freeze()
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
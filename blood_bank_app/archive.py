@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Archival job for Blood Bank Management System
+Moves closed donations and requests older than ARCHIVE_AFTER_DAYS from the
+hot Donation/Request tables into Donation_Archive/Request_Archive in small
+batches, so the tables the dashboards read stay small
+
+Usage:
+    python archive.py                    # archive with the configured cutoff
+    python archive.py --days 730         # only rows older than two years
+    python archive.py --dry-run          # count what would be moved
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+import db
+import sharding
+from db import Error
+from config import Config
+
+ArchiveSpec = namedtuple('ArchiveSpec', ['table', 'archive', 'key', 'closed', 'columns'])
+
+# Only rows that can no longer change are archived
+ARCHIVE_SPECS = [
+    ArchiveSpec('Donation', 'Donation_Archive', 'Donation_ID', ('Approved', 'Rejected'),
+                ('Donation_ID', 'Donor_ID', 'Blood_Group', 'Quantity', 'Date', 'Status',
+                 'Admin_Notes', 'Created_At')),
+    ArchiveSpec('Request', 'Request_Archive', 'Request_ID', ('Approved', 'Rejected', 'Fulfilled'),
+                ('Request_ID', 'Hospital_ID', 'Blood_Group', 'Quantity', 'Date', 'Status',
+                 'Admin_Notes', 'Created_At')),
+]
+
+def _in_list(values):
+    return ', '.join(['%s'] * len(values))
+
+def count_archivable(connection, spec, cutoff):
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT COUNT(*) FROM {spec.table}
+        WHERE Date < %s AND Status IN ({_in_list(spec.closed)})
+    """, (cutoff,) + spec.closed)
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+def archive_table(connection, spec, cutoff, batch_size, throttle=None, verbose=True):
+    """Move closed rows dated before cutoff into the archive; return rows moved
+
+    Each batch is selected by primary key, locked, copied and deleted in one
+    short transaction, so a failure leaves every row in exactly one table.
+    """
+    columns = ', '.join(spec.columns)
+    moved = 0
+    last_key = 0
+    cursor = connection.cursor()
+    while True:
+        if throttle:
+            throttle.wait()
+        try:
+            cursor.execute(f"""
+                SELECT {spec.key} FROM {spec.table}
+                WHERE {spec.key} > %s AND Date < %s AND Status IN ({_in_list(spec.closed)})
+                ORDER BY {spec.key}
+                LIMIT %s
+                FOR UPDATE
+            """, (last_key, cutoff) + spec.closed + (batch_size,))
+            keys = [row[0] for row in cursor.fetchall()]
+            if not keys:
+                connection.commit()
+                break
+            # The status check is repeated because SQLite cannot lock the
+            # selected rows; a row reopened in between simply stays hot
+            batch = f"{spec.key} IN ({_in_list(keys)}) AND Status IN ({_in_list(spec.closed)})"
+            params = tuple(keys) + spec.closed
+            cursor.execute(f"""
+                INSERT INTO {spec.archive} ({columns})
+                SELECT {columns} FROM {spec.table} WHERE {batch}
+            """, params)
+            cursor.execute(f"DELETE FROM {spec.table} WHERE {batch}", params)
+            connection.commit()
+        except Error:
+            connection.rollback()
+            raise
+        moved += cursor.rowcount
+        last_key = keys[-1]
+        if verbose:
+            print(f"   {spec.table}: {moved:,} rows archived", end='\r')
+    cursor.close()
+    if verbose:
+        print(f"   {spec.table}: {moved:,} rows archived")
+    return moved
+
+def archive(connection, settings=Config, days=None, batch_size=None, dry_run=False, verbose=True):
+    """Archive every table in ARCHIVE_SPECS; return {table: rows}"""
+    days = days if days is not None else settings.ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = date.today() - timedelta(days=days)
+    if verbose:
+        print(f"Archiving closed rows dated before {cutoff}")
+
+    if dry_run:
+        return {spec.table: count_archivable(connection, spec, cutoff) for spec in ARCHIVE_SPECS}
+
+    throttle = None
+    if connection.backend == 'mysql':
+        # Deletes replicate like any other write; reuse the online schema throttle
+        import online_schema
+        throttle = online_schema.Throttle(connection, settings)
+    try:
+        return {spec.table: archive_table(connection, spec, cutoff, batch_size, throttle, verbose)
+                for spec in ARCHIVE_SPECS}
+    finally:
+        if throttle:
+            throttle.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Move closed donations and requests to the archive tables')
+    parser.add_argument('--days', type=int, help='archive rows older than this many days')
+    parser.add_argument('--batch-size', type=int, help='rows moved per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='only count the rows that would move')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def archive_site(connection, settings):
+        counts = archive(connection, settings, days=args.days, batch_size=args.batch_size, dry_run=args.dry_run)
+        if args.dry_run:
+            for table, count in counts.items():
+                print(f"   {table}: {count:,} rows would be archived")
+
+    started = time.perf_counter()
+    status = sharding.run_on_sites(sites, archive_site, 'Archival failed')
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
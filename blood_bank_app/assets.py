@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Static assets and response compression for Blood Bank Management System
+Static URLs carry a content hash (url_for('static', ...) adds ?v=<hash>) so
+browsers can keep them for a year; compressible static files are
+compressed once, at maximum level, and pages and JSON per response.
+Brotli is used when the brotli package is installed, gzip otherwise.
+
+Usage:
+    python assets.py                 # static files with raw and compressed sizes
+    python assets.py --write         # also write .gz/.br files for a front proxy
+"""
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+import threading
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from config import BASE_DIR
+
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+COMPRESSIBLE_TYPES = {'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+                      'application/javascript', 'application/json', 'image/svg+xml'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Levels for responses compressed per request; static files use the maximum
+DYNAMIC_LEVELS = {'br': 5, 'gzip': 6}
+
+Asset = namedtuple('Asset', ['filename', 'mtime', 'version', 'mimetype', 'variants'])
+
+def encodings():
+    """Content codings this process can produce, preferred first"""
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+def compress(data, encoding, level=None):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    # mtime=0 keeps the output, and so static ETags, identical across restarts
+    return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+
+def compressible(mimetype):
+    return mimetype in COMPRESSIBLE_TYPES
+
+class StaticAssets:
+    """Content hashes and precompressed variants of the files in a static folder
+
+    Files are loaded on first use and reloaded when their mtime changes, so
+    editing a file in development is picked up without a restart.
+    """
+
+    def __init__(self, folder=STATIC_DIR):
+        self.folder = folder
+        self.assets = {}
+        self.lock = threading.Lock()
+
+    def get(self, filename):
+        """Return the Asset for a path under the folder, or None if there is no such file"""
+        path = os.path.join(self.folder, filename)
+        if os.path.commonpath([os.path.abspath(path), os.path.abspath(self.folder)]) != os.path.abspath(self.folder):
+            return None
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        asset = self.assets.get(filename)
+        if asset is None or asset.mtime != mtime:
+            with self.lock:
+                asset = self._load(filename, path, mtime)
+                self.assets[filename] = asset
+        return asset
+
+    def _load(self, filename, path, mtime):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        variants = {None: data}
+        if compressible(mimetype):
+            for encoding in encodings():
+                compressed = compress(data, encoding)
+                if len(compressed) < len(data):
+                    variants[encoding] = compressed
+        return Asset(filename, mtime, hashlib.sha256(data).hexdigest()[:12], mimetype, variants)
+
+    def version(self, filename):
+        asset = self.get(filename)
+        return asset.version if asset else None
+
+    def files(self):
+        for root, _, names in os.walk(self.folder):
+            for name in sorted(names):
+                if not name.endswith(('.gz', '.br')):
+                    yield os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/')
+
+def compress_response(response, accept_encodings, min_size):
+    """Compress a buffered response in place if the client accepts it and it is worth it
+
+    A strong ETag is made weak, since the compressed body differs byte for
+    byte but is semantically the same representation.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or not compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = accept_encodings.best_match(encodings())
+    if encoding is None or len(data) < min_size:
+        return response
+    response.set_data(compress(data, encoding, DYNAMIC_LEVELS[encoding]))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Static asset sizes and precompressed files')
+    parser.add_argument('--write', action='store_true', help='write .gz/.br files next to the originals')
+    args = parser.parse_args(argv)
+
+    assets = StaticAssets()
+    print(f"{'File':<28} {'Version':<13} {'Raw':>9} " + ' '.join(f"{encoding:>9}" for encoding in encodings()))
+    for filename in assets.files():
+        asset = assets.get(filename)
+        sizes = ' '.join(f"{len(asset.variants[encoding]):>9,}" if encoding in asset.variants else f"{'-':>9}"
+                         for encoding in encodings())
+        print(f"{filename:<28} {asset.version:<13} {len(asset.variants[None]):>9,} {sizes}")
+        if args.write:
+            for encoding, data in asset.variants.items():
+                if encoding:
+                    suffix = '.br' if encoding == 'br' else '.gz'
+                    with open(os.path.join(assets.folder, filename + suffix), 'wb') as f:
+                        f.write(data)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
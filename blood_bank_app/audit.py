@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Audit trail for Blood Bank Management System
+Every change made through the application is recorded in Audit_Log - who,
+what, when, and the changed fields before and after. Routes buffer their
+events and write them with one multi-row insert in the transaction that
+makes the change, so the trail can neither miss a committed change nor
+record a rolled-back one. Audit_Log rejects updates and deletes.
+
+Usage:
+    python audit.py Donation 42          # history of one record
+    python audit.py --since 2026-10-01   # everything since a date
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+import db
+from db import Error
+from config import Config
+
+ACTOR_TYPES = ['admin', 'donor', 'hospital', 'anonymous', 'system']
+MAX_PAGE = 500
+
+Event = namedtuple('Event', ['actor_type', 'actor_id', 'action', 'entity', 'entity_id',
+                             'before', 'after', 'remote_addr'])
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def _encode(values):
+    return json.dumps(values, separators=(',', ':'), default=_json_value) if values else None
+
+def event(actor_type, actor_id, action, entity, entity_id, before=None, after=None, remote_addr=None):
+    """Build an event; for updates only the fields whose value changed are kept"""
+    if before and after:
+        changed = [key for key in after if before.get(key) != after[key]]
+        before = {key: before.get(key) for key in changed}
+        after = {key: after[key] for key in changed}
+    return Event(actor_type, actor_id, action, entity, str(entity_id), before, after, remote_addr)
+
+def record(cursor, events):
+    """Write events in one multi-row insert (caller commits)"""
+    cursor.executemany("""
+        INSERT INTO Audit_Log (Actor_Type, Actor_ID, Action, Entity, Entity_ID,
+                               Before_Values, After_Values, Remote_Addr)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(item.actor_type, item.actor_id, item.action, item.entity, item.entity_id,
+           _encode(item.before), _encode(item.after), item.remote_addr) for item in events])
+
+def query(cursor, entity=None, entity_id=None, start=None, end=None, actor_type=None,
+          actor_id=None, before_id=None, limit=100):
+    """Return events newest first as dicts, at most limit, with Audit_ID < before_id
+
+    entity (with entity_id) uses the entity index and a time range uses the
+    Occurred_At index; page with before_id set to the last Audit_ID seen.
+    """
+    conditions, params = [], []
+    for column, value in (('Entity', entity), ('Entity_ID', entity_id),
+                          ('Actor_Type', actor_type), ('Actor_ID', actor_id)):
+        if value is not None:
+            conditions.append(f"{column} = %s")
+            params.append(str(value) if column == 'Entity_ID' else value)
+    if start is not None:
+        conditions.append("Occurred_At >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("Occurred_At < %s")
+        params.append(end)
+    if before_id is not None:
+        conditions.append("Audit_ID < %s")
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    cursor.execute(f"""
+        SELECT Audit_ID, Occurred_At, Actor_Type, Actor_ID, Action, Entity, Entity_ID,
+               Before_Values, After_Values, Remote_Addr
+        FROM Audit_Log {where}
+        ORDER BY Audit_ID DESC
+        LIMIT %s
+    """, params + [min(limit, MAX_PAGE)])
+    return [{
+        'id': row[0],
+        'occurred_at': row[1].isoformat() if row[1] else None,
+        'actor': {'type': row[2], 'id': row[3]},
+        'action': row[4],
+        'entity': row[5],
+        'entity_id': row[6],
+        'before': json.loads(row[7]) if row[7] else None,
+        'after': json.loads(row[8]) if row[8] else None,
+        'remote_addr': row[9],
+    } for row in cursor.fetchall()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the audit trail')
+    parser.add_argument('entity', nargs='?', help='table name, e.g. Donation')
+    parser.add_argument('entity_id', nargs='?', help='primary key (blood group for Blood_Inventory)')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='ISO date or datetime')
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        cursor = connection.cursor()
+        events = query(cursor, args.entity, args.entity_id, start=args.since, limit=args.limit)
+        cursor.close()
+    except Error as e:
+        print(f"Audit query failed: {e}")
+        return 1
+    finally:
+        connection.close()
+    for item in reversed(events):
+        actor = item['actor']['type'] + (f" {item['actor']['id']}" if item['actor']['id'] else '')
+        change = item['after'] if item['before'] is None else {
+            key: f"{item['before'].get(key)} -> {value}" for key, value in (item['after'] or {}).items()}
+        print(f"   {item['occurred_at']}  {actor:<12} {item['action']:<10} "
+              f"{item['entity']} {item['entity_id']}  {change}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: versioned JSON API reads
+Seeds a throwaway SQLite database and times /api/v1 through the app: pages
+of donations with every field and with a sparse fieldset, pages of donors
+deep into the table, four reads as separate requests and as one batch, and
+encoding a page with orjson and with the json fallback.
+
+Usage:
+    python benchmarks/api_reads.py --donors 1000000 --rounds 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timed(samples, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--donors', type=int, default=1000000)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(workdir, 'bench.db'))
+
+    import api
+    import db
+    import migrations
+    import seed_data
+    from app import app, rate_limiter
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    started = time.perf_counter()
+    seed_data.seed(connection, donors=args.donors, hospitals=50,
+                   donations_per_donor=1, requests_per_hospital=200)
+    print(f"Seeded {args.donors:,} donors in {time.perf_counter() - started:.0f}s")
+    top = seed_data._max_id(connection, 'Donation', 'Donation_ID')
+    connection.close()
+
+    rate_limiter.limits.clear()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['role'] = 'admin'
+    def get(path):
+        response = client.get(path)
+        assert response.status_code == 200, response.data
+        return response
+    def post(path, body):
+        response = client.post(path, json=body)
+        assert response.status_code == 200, response.data
+        return response
+
+    rng = random.Random(7)
+    timings = {name: [] for name in ('full', 'sparse', 'donors', 'separate', 'batch', 'orjson', 'json')}
+    sizes = {}
+    reads = ['/api/v1/inventory', '/api/v1/requests?status=Pending&limit=50',
+             '/api/v1/donations?donor_id={donor}', '/api/v1/donors/{donor}']
+    for _ in range(args.rounds):
+        after = rng.randrange(top - 500)
+        donor = rng.randrange(1, args.donors)
+        full = timed(timings['full'], get, f'/api/v1/donations?limit=500&after={after}')
+        sparse = timed(timings['sparse'], get, f'/api/v1/donations?limit=500&after={after}&fields=date,quantity')
+        sizes['full'], sizes['sparse'] = len(full.data), len(sparse.data)
+        timed(timings['donors'], get, f'/api/v1/donors?limit=500&after={donor}')
+        paths = [path.format(donor=donor) for path in reads]
+        timed(timings['separate'], lambda: [get(path) for path in paths])
+        timed(timings['batch'], post, '/api/v1/batch', {'requests': [{'path': path} for path in paths]})
+
+    # Encoding alone, of a page as the API reads it
+    connection = db.connect(Config)
+    cursor = connection.cursor()
+    page = api.list_items(cursor, 'donations', {'limit': '500'}, 'admin', None)
+    connection.close()
+    orjson = api.orjson
+    for _ in range(args.rounds):
+        timed(timings['orjson'], api.dumps, page)
+        api.orjson = None
+        timed(timings['json'], api.dumps, page)
+        api.orjson = orjson
+
+    print(f"{args.rounds} rounds; a donations page is {sizes['full']:,} bytes with every field "
+          f"and {sizes['sparse']:,} with date and quantity\n")
+    print("| Read | Median (ms) | p95 (ms) |")
+    print("|---|---:|---:|")
+    for name, label in (('full', '500 donations, every field'),
+                        ('sparse', '500 donations, fields=date,quantity'),
+                        ('donors', '500 donors after a random id'),
+                        ('separate', 'Four reads as separate requests'),
+                        ('batch', 'Four reads as one batch'),
+                        ('orjson', 'Encoding 500 donations, orjson'),
+                        ('json', 'Encoding 500 donations, json fallback')):
+        print(f"| {label} | {statistics.median(timings[name]) * 1000:.2f} "
+              f"| {percentile(timings[name], 0.95) * 1000:.2f} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the audit trail on the request approval path
+Approves pending requests through the app with audit writes on and off
+(alternating, against an Audit_Log already holding --audit-rows events)
+and times the audit insert itself
+
+Usage:
+    python benchmarks/audit_overhead.py --requests 2000 --audit-rows 1000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--audit-rows', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.db')
+
+    import audit
+    import db
+    import migrations
+    import seed_data
+    from app import app
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    seed_data.seed(connection, donors=1000, hospitals=20, requests_per_hospital=10)
+    cursor = connection.cursor()
+    cursor.execute("UPDATE Blood_Inventory SET Available_Quantity = 1000000")
+    first_request = seed_data._max_id(connection, 'Request', 'Request_ID') + 1
+    cursor.executemany("""
+        INSERT INTO Request (Hospital_ID, Blood_Group, Quantity, Date) VALUES (1, %s, 1, CURRENT_DATE)
+    """, [(seed_data.BLOOD_GROUPS[i % 8],) for i in range(args.requests)])
+    for start in range(0, args.audit_rows, 50000):
+        audit.record(cursor, [audit.event('admin', 1, 'approve', 'Request', start + i,
+                                          {'Status': 'Pending'}, {'Status': 'Approved'}, '127.0.0.1')
+                              for i in range(min(50000, args.audit_rows - start))])
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+    record = audit.record
+    insert_ms = []
+    def timed_record(cursor, events):
+        started = time.perf_counter()
+        record(cursor, events)
+        insert_ms.append((time.perf_counter() - started) * 1000)
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['role'] = 'admin'
+    samples = {True: [], False: []}
+    for offset in range(args.requests):
+        enabled = offset % 2 == 0
+        audit.record = timed_record if enabled else (lambda cursor, events: None)
+        started = time.perf_counter()
+        client.get(f'/approve_request/{first_request + offset}')
+        samples[enabled].append((time.perf_counter() - started) * 1000)
+    audit.record = record
+
+    print(f"SQLite {db.sqlite3.sqlite_version}, {args.audit_rows:,} existing audit rows, "
+          f"{args.requests:,} approvals\n")
+    print("| Approval path | Median (ms) | p99 (ms) |")
+    print("|---|---:|---:|")
+    for enabled, label in ((False, 'Audit off'), (True, 'Audit on')):
+        print(f"| {label} | {statistics.median(samples[enabled]):.3f} | "
+              f"{percentile(samples[enabled], 0.99):.3f} |")
+    print(f"| Audit insert alone (2 events) | {statistics.median(insert_ms):.3f} | "
+          f"{percentile(insert_ms, 0.99):.3f} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
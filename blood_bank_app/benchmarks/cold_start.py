@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the serverless entry point (api/index.py)
+Starts a fresh interpreter per run with -X importtime, imports the entry
+point and serves a first and a second request (a dashboard, so both reach
+the database); reports medians and the slowest imports of the last run.
+
+Usage:
+    python benchmarks/cold_start.py --runs 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(os.path.dirname(BASE_DIR), 'api')
+sys.path.insert(0, BASE_DIR)
+
+CHILD = """
+import json, time
+started = time.perf_counter()
+import index
+imported = time.perf_counter()
+client = index.app.test_client()
+with client.session_transaction() as session:
+    session.update({'user_id': 1, 'username': 'hospital', 'role': 'hospital'})
+client.get('/dashboard_hospital')
+first = time.perf_counter()
+client.get('/dashboard_hospital')
+second = time.perf_counter()
+print(json.dumps({'import': imported - started, 'first': first - imported, 'second': second - first}))
+"""
+
+def parse_importtime(stderr):
+    """Return [(cumulative us, module)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        rows.append((int(cumulative), module.strip()))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    env = dict(os.environ, DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(workdir, 'bench.db'),
+               FLASK_ENV='production')
+    os.environ.update(env)
+
+    import db
+    import migrations
+    import seed_data
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    seed_data.seed(connection, donors=1000, hospitals=20, requests_per_hospital=20)
+    connection.close()
+
+    samples = {'import': [], 'first': [], 'second': []}
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=API_DIR, env=env,
+                                capture_output=True, text=True, check=True)
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        for key in samples:
+            samples[key].append(timings[key] * 1000)
+    rows = parse_importtime(result.stderr)
+
+    print(f"Python {sys.version.split()[0]}, SQLite, median of {args.runs} fresh interpreters\n")
+    print("| Step | Median (ms) |")
+    print("|---|---:|")
+    for key, label in (('import', 'Import api/index.py'), ('first', 'First request'),
+                       ('second', 'Second request')):
+        print(f"| {label} | {statistics.median(samples[key]):.1f} |")
+    print(f"\nSlowest imports in the last run (cumulative, top {args.top}, nested ones skipped):\n")
+    print("| Module | Cumulative (ms) |")
+    print("|---|---:|")
+    shown = []
+    for cumulative, module in sorted(rows, reverse=True):
+        if module == 'index' or any(module.startswith(parent + '.') for parent in shown):
+            continue
+        shown.append(module)
+        print(f"| {module} | {cumulative / 1000:.1f} |")
+        if len(shown) == args.top:
+            break
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
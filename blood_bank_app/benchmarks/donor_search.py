@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: donor search and contact autocomplete
+Seeds a throwaway SQLite database, then times search.search_donors() for
+word searches as they are typed (name and address prefixes, with and
+without a blood group filter), search.autocomplete() for contact prefixes,
+and, for comparison, a LIKE '%...%' scan for a donor's full name.
+
+Usage:
+    python benchmarks/donor_search.py --donors 1000000 --searches 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def timed(samples, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--donors', type=int, default=1000000)
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--scans', type=int, default=20, help='LIKE scans of a full name to time')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(workdir, 'bench.db'))
+
+    import db
+    import migrations
+    import search
+    import seed_data
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    started = time.perf_counter()
+    seed_data.seed(connection, donors=args.donors, hospitals=10,
+                   donations_per_donor=0.5, requests_per_hospital=5)
+    print(f"Seeded {args.donors:,} donors in {time.perf_counter() - started:.0f}s")
+
+    cursor = connection.cursor()
+    index = search.ContactIndex(Config)
+    started = time.perf_counter()
+    index.refresh(cursor)
+    build = time.perf_counter() - started
+    cursor.execute("SELECT Name, Address, Contact FROM Donor ORDER BY Donor_ID LIMIT 100000")
+    donors = cursor.fetchall()
+
+    rng = random.Random(7)
+    timings = {name: [] for name in ('prefix', 'words', 'group', 'contact', 'scan')}
+    for _ in range(args.searches):
+        name, address, contact = rng.choice(donors)
+        first, last = name.split()[:2]
+        city = address.split(', ')[-1].split()[0]
+        # What the search box holds a few keystrokes into each word
+        typed = f"{first[:rng.randint(2, len(first))]} {last[:rng.randint(2, len(last))]}"
+        timed(timings['prefix'], search.search_donors, cursor, index, first[:3], None, None, None, 50)
+        timed(timings['words'], search.search_donors, cursor, index, f"{typed} {city}", None, None, None, 50)
+        timed(timings['group'], search.search_donors, cursor, index, typed, 'AB-', None, None, 50)
+        timed(timings['contact'], search.autocomplete, cursor, index, contact[:rng.randint(5, 9)], 10)
+    for _ in range(args.scans):
+        term = f"%{rng.choice(donors)[0].lower()}%"
+        timed(timings['scan'], lambda: (cursor.execute("""
+            SELECT Donor_ID, Name, Contact FROM Donor
+            WHERE Is_Active = TRUE AND (LOWER(Name) LIKE %s OR Contact LIKE %s)
+            ORDER BY Name
+            LIMIT 50
+        """, (term, term)), cursor.fetchall()))
+    cursor.close()
+    connection.close()
+
+    memory = sum(array.nbytes for array in index.merged + index.pending) / 2 ** 20
+    print(f"Contact index of {len(index):,} donors ({memory:.0f} MB) built in {build:.2f}s; "
+          f"{args.searches} searches of each kind, {args.scans} scans\n")
+    print("| Search | Median (ms) | p95 (ms) |")
+    print("|---|---:|---:|")
+    for name, label in (('scan', "Full name, LIKE '%...%' scan"),
+                        ('prefix', 'First three letters of a name'),
+                        ('words', 'Name prefixes and a town'),
+                        ('group', 'Name prefixes, AB- donors only'),
+                        ('contact', 'Contact autocomplete, k = 10')):
+        print(f"| {label} | {statistics.median(timings[name]) * 1000:.2f} "
+              f"| {percentile(timings[name], 0.95) * 1000:.2f} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
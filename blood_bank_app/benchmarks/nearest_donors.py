@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nearest eligible donors for every hospital
+Seeds a throwaway SQLite database, scatters donors and hospitals over a
+region the size of a large country (denser near a few city centres), then
+times the grid build and geo.nearest_eligible_donors() for each hospital
+and blood group. Each search is checked against a brute-force scan of all
+donor coordinates with NumPy, which is also timed.
+
+Usage:
+    python benchmarks/nearest_donors.py --donors 1000000 --hospitals 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+def scatter(connection, table, id_column, seed):
+    """Give every row of table random coordinates, half of them around 20 city centres"""
+    rng = np.random.default_rng(seed)
+    cities = np.column_stack([rng.uniform(36, 48, 20), rng.uniform(-10, 12, 20)])
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT {id_column} FROM {table}")
+    ids = [row[0] for row in cursor.fetchall()]
+    spread = rng.uniform([36, -10], [48, 12], (len(ids), 2))
+    urban = cities[rng.integers(0, len(cities), len(ids))] + rng.normal(0, 0.15, (len(ids), 2))
+    points = np.where(rng.random((len(ids), 1)) < 0.5, urban, spread)
+    cursor.executemany(f"UPDATE {table} SET Latitude = %s, Longitude = %s WHERE {id_column} = %s",
+                       [(round(float(lat), 6), round(float(lon), 6), row_id)
+                        for row_id, (lat, lon) in zip(ids, points)])
+    connection.commit()
+    cursor.close()
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--donors', type=int, default=1000000)
+    parser.add_argument('--hospitals', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ.update(DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(workdir, 'bench.db'))
+
+    import db
+    import geo
+    import migrations
+    import seed_data
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    started = time.perf_counter()
+    seed_data.seed(connection, donors=args.donors, hospitals=args.hospitals,
+                   donations_per_donor=0.5, requests_per_hospital=5)
+    scatter(connection, 'Donor', 'Donor_ID', 1)
+    scatter(connection, 'Hospital', 'Hospital_ID', 2)
+    print(f"Seeded {args.donors:,} donors and {args.hospitals} hospitals in {time.perf_counter() - started:.0f}s")
+
+    cursor = connection.cursor()
+    index = geo.DonorIndex(Config)
+    started = time.perf_counter()
+    index.refresh(cursor)
+    build = time.perf_counter() - started
+    cursor.execute("SELECT Donor_ID, Latitude, Longitude, Blood_Group FROM Donor")
+    columns = list(zip(*cursor.fetchall()))
+    all_ids = np.array(columns[0])
+    all_points = np.array(columns[1], dtype=float), np.array(columns[2], dtype=float)
+    all_groups = np.array([geo.BLOOD_GROUP_CODES[group] for group in columns[3]], dtype=np.int8)
+    cursor.execute("SELECT Hospital_ID, Latitude, Longitude FROM Hospital")
+    hospitals = [(row[0], float(row[1]), float(row[2])) for row in cursor.fetchall()]
+
+    searches = {'index': [], 'sql': [], 'brute': []}
+    for blood_group in ('O-', 'AB+'):
+        groups = Config.BLOOD_GROUP_COMPATIBILITY[blood_group]
+        codes = [geo.BLOOD_GROUP_CODES[group] for group in groups]
+        for hospital_id, latitude, longitude in hospitals:
+            started = time.perf_counter()
+            ids, _ = index.nearest(latitude, longitude, groups, args.k)
+            searches['index'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            donors = geo.nearest_eligible_donors(cursor, index, latitude, longitude, blood_group, args.k)
+            searches['sql'].append(time.perf_counter() - started)
+            started = time.perf_counter()
+            mask = np.isin(all_groups, codes)
+            distances = geo.haversine_km(latitude, longitude, all_points[0][mask], all_points[1][mask])
+            nearest = all_ids[mask][np.lexsort((all_ids[mask], distances))[:args.k]]
+            searches['brute'].append(time.perf_counter() - started)
+            assert list(ids) == list(nearest), (hospital_id, blood_group)
+            assert len(donors) == args.k
+    cursor.close()
+    connection.close()
+
+    print(f"Grid of {len(index):,} donors built in {build:.2f}s; "
+          f"{len(searches['index'])} searches (O- and AB+ patients), k = {args.k}\n")
+    print("| Search | Median (ms) | p95 (ms) |")
+    print("|---|---:|---:|")
+    for name, label in (('brute', 'Brute force, NumPy over all donors'),
+                        ('index', 'Grid, k nearest compatible donors'),
+                        ('sql', 'Grid + eligibility check in SQL')):
+        print(f"| {label} | {statistics.median(searches[name]) * 1000:.2f} "
+              f"| {percentile(searches[name], 0.95) * 1000:.2f} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
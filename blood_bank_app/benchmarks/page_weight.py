@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes transferred per page against a byte budget
+Fetches every page through the app as its role, with and without
+compression, plus the local static files it references; first visits
+download both, repeat visits only the HTML (static URLs are fingerprinted
+and cached as immutable). CDN assets are listed but not counted.
+
+Usage:
+    python benchmarks/page_weight.py --donors 200 --budget-kb 60
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+PAGES = [
+    (None, 'index', '/'),
+    (None, 'login', '/login'),
+    (None, 'register_donor', '/register_donor'),
+    ('admin', 'dashboard_admin', '/dashboard_admin'),
+    ('admin', 'donor_list', '/donor_list'),
+    ('donor', 'dashboard_donor', '/dashboard_donor'),
+    ('hospital', 'dashboard_hospital', '/dashboard_hospital'),
+    ('hospital', 'request_blood', '/request_blood'),
+]
+
+ASSET_PATTERN = re.compile(r'(?:href|src)="([^"]+\.(?:css|js)[^"]*)"')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--donors', type=int, default=200)
+    parser.add_argument('--budget-kb', type=float, default=60, help='first-visit budget, compressed')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.db')
+    os.environ['RATE_LIMITS'] = '*=1000000/second'
+
+    import assets
+    import db
+    import migrations
+    import seed_data
+    from app import app
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    seed_data.seed(connection, donors=args.donors, hospitals=20, requests_per_hospital=20)
+    connection.close()
+
+    encoding = assets.encodings()[0]
+    client = app.test_client()
+    budget = args.budget_kb * 1024
+    external = set()
+    print(f"{args.donors:,} donors, compression: {encoding}, budget {args.budget_kb:g} KB first visit\n")
+    print(f"| Page | HTML raw | HTML {encoding} | Static raw | Static {encoding} | First visit | Repeat visit | Budget |")
+    print("|---|---:|---:|---:|---:|---:|---:|---|")
+    for role, name, path in PAGES:
+        with client.session_transaction() as session:
+            session.clear()
+            if role:
+                session.update({'user_id': 1, 'username': role, 'role': role})
+        raw = client.get(path, headers={'Accept-Encoding': 'identity'})
+        compressed = client.get(path, headers={'Accept-Encoding': encoding})
+        static_raw = static_compressed = 0
+        for url in ASSET_PATTERN.findall(raw.get_data(as_text=True)):
+            if not url.startswith('/static/'):
+                external.add(url)
+                continue
+            static_raw += len(client.get(url, headers={'Accept-Encoding': 'identity'}).data)
+            static_compressed += len(client.get(url, headers={'Accept-Encoding': encoding}).data)
+        first = len(compressed.data) + static_compressed
+        print(f"| {name} | {len(raw.data):,} | {len(compressed.data):,} | {static_raw:,} | "
+              f"{static_compressed:,} | {first:,} | {len(compressed.data):,} | "
+              f"{'ok' if first <= budget else 'OVER'} |")
+    if external:
+        print("\nNot counted (CDN):\n" + '\n'.join(f"- {url}" for url in sorted(external)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and start-up of forked workers, with and without preload
+Runs a master that forks --workers workers the way gunicorn does. Without
+preload every worker imports and builds the app itself; with preload the
+master builds it once (create_app() and preload()) and the workers only
+call init_process(). Each worker serves every page once, then the master
+reads the workers' RSS, PSS and private memory from /proc (Linux only).
+
+Usage:
+    python benchmarks/preload_fork.py --workers 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+PAGES = [
+    (None, '/'),
+    (None, '/login'),
+    ('admin', '/dashboard_admin'),
+    ('admin', '/donor_list'),
+    ('donor', '/dashboard_donor'),
+    ('hospital', '/dashboard_hospital'),
+    ('hospital', '/request_blood'),
+]
+
+def memory(pid):
+    """RSS, PSS and private (USS) memory of a process in KB"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if value.strip().endswith('kB'):
+                fields[name] = int(value.split()[0])
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+
+def worker(mode, forked, results, go):
+    import app
+    if mode == 'preload':
+        app.init_process(app.app)
+    client = app.app.test_client()
+    client.get('/login')
+    startup = time.perf_counter() - forked
+    for role, path in PAGES:
+        with client.session_transaction() as session:
+            session.clear()
+            if role:
+                session.update({'user_id': 1, 'username': role, 'role': role})
+        client.get(path)
+    os.write(results, (json.dumps({'pid': os.getpid(), 'startup': startup}) + '\n').encode())
+    # Stay alive until the master has measured every worker
+    os.read(go, 1)
+
+def master(mode, workers):
+    if mode == 'preload':
+        import app
+        app.preload(app.app)
+    results_r, results_w = os.pipe()
+    go_r, go_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(go_w)
+            worker(mode, forked, results_w, go_r)
+            os._exit(0)
+        pids.append(pid)
+    os.close(results_w)
+    with os.fdopen(results_r) as results:
+        reports = [json.loads(results.readline()) for _ in pids]
+    for report in reports:
+        report.update(memory(report['pid']))
+    print(json.dumps({'master': memory(os.getpid()), 'workers': reports}))
+    os.close(go_w)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--master', choices=['import', 'preload'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.master:
+        master(args.master, args.workers)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    env = dict(os.environ, DB_BACKEND='sqlite', SQLITE_PATH=os.path.join(workdir, 'bench.db'),
+               FLASK_ENV='production', RATE_LIMITS='*=1000000/second')
+    os.environ.update(env)
+
+    import db
+    import migrations
+    import seed_data
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    seed_data.seed(connection, donors=1000, hospitals=20, requests_per_hospital=20)
+    connection.close()
+
+    print(f"Python {sys.version.split()[0]}, SQLite, {args.workers} workers, memory in MB\n")
+    print("| Mode | Worker start-up (ms) | RSS per worker | PSS per worker | Private per worker "
+          "| Master PSS | Total PSS |")
+    print("|---|---:|---:|---:|---:|---:|---:|")
+    for mode in ('import', 'preload'):
+        result = subprocess.run([sys.executable, __file__, '--master', mode, '--workers', str(args.workers)],
+                                cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+        report = json.loads(result.stdout.strip().splitlines()[-1])
+        workers = report['workers']
+        mean = {key: statistics.mean(w[key] for w in workers) / 1024 for key in ('rss', 'pss', 'uss')}
+        total = (report['master']['pss'] + sum(w['pss'] for w in workers)) / 1024
+        print(f"| {'per worker import' if mode == 'import' else 'preload + fork'} "
+              f"| {statistics.median(w['startup'] for w in workers) * 1000:.1f} "
+              f"| {mean['rss']:.1f} | {mean['pss']:.1f} | {mean['uss']:.1f} "
+              f"| {report['master']['pss'] / 1024:.1f} | {total:.1f} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
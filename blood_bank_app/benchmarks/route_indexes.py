@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dashboard queries with and without the route indexes (0002)
+Builds a seeded SQLite database, captures the statements the read routes
+execute, and times each one with the 0002 indexes dropped and then restored
+
+Usage:
+    python benchmarks/route_indexes.py --donors 50000 --hospitals 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+ROUTE_INDEX_MIGRATION = os.path.join(BASE_DIR, 'database', 'migrations', '0002_route_indexes.sql')
+
+def time_statement(connection, sql, params, repeat):
+    cursor = connection.cursor()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    cursor.close()
+    return statistics.median(samples)
+
+def time_all(connection, statements, repeat):
+    return [time_statement(connection, statement.sql, statement.params, repeat)
+            for statement in statements]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--donors', type=int, default=50000)
+    parser.add_argument('--hospitals', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='blood_bank_bench_')
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, 'bench.db')
+
+    import db
+    import index_advisor
+    import migrations
+    import seed_data
+    from app import app
+    from config import Config
+
+    connection = db.connect(Config)
+    migrations.migrate(connection, verbose=False)
+    seed_data.seed(connection, donors=args.donors, hospitals=args.hospitals)
+
+    with open(ROUTE_INDEX_MIGRATION, encoding='utf-8') as file:
+        create_statements = migrations.split_statements(file.read())
+    index_names = [statement.split()[2] for statement in create_statements]
+
+    statements = [statement for statement in index_advisor.capture_route_statements(app, connection)
+                  if statement.sql.upper().startswith('SELECT')]
+
+    cursor = connection.cursor()
+    for name in index_names:
+        cursor.execute(f"DROP INDEX {name}")
+    cursor.execute("ANALYZE")
+    connection.commit()
+    before = time_all(connection, statements, args.repeat)
+
+    for statement in create_statements:
+        cursor.execute(statement)
+    cursor.execute("ANALYZE")
+    connection.commit()
+    cursor.close()
+    after = time_all(connection, statements, args.repeat)
+    connection.close()
+
+    print(f"SQLite {db.sqlite3.sqlite_version}, {args.donors:,} donors, {args.hospitals} hospitals, "
+          f"median of {args.repeat} runs\n")
+    print("| Query | Before (ms) | After (ms) | Speedup |")
+    print("|---|---:|---:|---:|")
+    for statement, old, new in zip(statements, before, after):
+        label = statement.sql if len(statement.sql) <= 70 else statement.sql[:67] + '...'
+        print(f"| `{label}` | {old:.2f} | {new:.2f} | {old / new if new else 0:.1f}x |")
+    print(f"| **Total** | {sum(before):.2f} | {sum(after):.2f} | {sum(before) / sum(after):.1f}x |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
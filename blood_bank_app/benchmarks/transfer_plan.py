@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inter-site transfer plans for networks of synthetic sites
+Places the sites at random on a 600 x 600 km region with travel minutes
+growing with distance, gives every blood group at every site a random
+daily demand and between 2 and 14 days of stock, and times
+transfers.plan_transfers() for every blood group. The plan's travel is
+compared with the least-cost starting solution the simplex improves on.
+
+Usage:
+    python benchmarks/transfer_plan.py --sites 50 100 300 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import transfers  # noqa: E402
+from forecasting import BLOOD_GROUPS  # noqa: E402
+
+def network(sites, seed):
+    rng = np.random.default_rng(seed)
+    position = rng.uniform(0, 600, (sites, 2))
+    distance = np.hypot(*(position[:, None, :] - position[None, :, :]).transpose(2, 0, 1))
+    # An hour of loading and handover plus driving at 70 km/h
+    costs = np.round(60 + distance / 70 * 60)
+    daily = rng.lognormal(np.log(400), 0.8, (sites, len(BLOOD_GROUPS)))
+    stock = daily * rng.uniform(2, 14, (sites, len(BLOOD_GROUPS)))
+    return [f'site{i}' for i in range(sites)], stock, daily, costs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sites', type=int, nargs='+', default=[50, 100, 300, 500])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cover-days', type=float, default=7)
+    parser.add_argument('--unit-ml', type=int, default=450)
+    args = parser.parse_args(argv)
+
+    print(f"Python {sys.version.split()[0]}, NumPy {np.__version__}, {len(BLOOD_GROUPS)} blood groups, "
+          f"cover {args.cover_days:g} days, median of {args.repeat} runs\n")
+    print("| Sites | Units moved | Transfers | Plan time (s) | Travel, least-cost start (unit-min) "
+          "| Travel, optimal (unit-min) | Saved |")
+    print("|---:|---:|---:|---:|---:|---:|---:|")
+    solve = transfers.solve_transportation
+    for sites in args.sites:
+        names, stock, daily, costs = network(sites, seed=sites)
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            plan = transfers.plan_transfers(names, stock, daily, costs, args.cover_days, args.unit_ml)
+            samples.append(time.perf_counter() - started)
+        # The same problems stopped before the first pivot
+        transfers.solve_transportation = lambda *a: solve(*a, max_iterations=0)
+        try:
+            start = transfers.plan_transfers(names, stock, daily, costs, args.cover_days, args.unit_ml)
+        finally:
+            transfers.solve_transportation = solve
+        print(f"| {sites} | {sum(t.units for t in plan.transfers):,} | {len(plan.transfers):,} "
+              f"| {statistics.median(samples):.2f} | {start.total_minutes:,.0f} | {plan.total_minutes:,.0f} "
+              f"| {1 - plan.total_minutes / start.total_minutes:.0%} |")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,10 +5,27 @@ Contains database configuration and application settings
 
 import os
 from datetime import timedelta
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _find_env_file(start=BASE_DIR):
+    """Nearest .env in start or a parent directory, like dotenv's own search"""
+    path = start
+    while True:
+        candidate = os.path.join(path, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+# Load environment variables from .env file; python-dotenv is only imported
+# when there is one, which on serverless deploys there usually is not
+_env_file = _find_env_file()
+if _env_file:
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 class Config:
     """Base configuration class"""
@@ -21,6 +38,129 @@ class Config:
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or 'blood_bank_db'
     MYSQL_PORT = int(os.environ.get('MYSQL_PORT') or 3306)
     
+    # Database backend: 'mysql' or 'sqlite' (in-process, no server needed)
+    DB_BACKEND = (os.environ.get('DB_BACKEND') or 'mysql').lower()
+    SQLITE_PATH = os.environ.get('SQLITE_PATH') or os.path.join(BASE_DIR, 'instance', 'blood_bank.db')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS') or 5000)
+    
+    # Connections kept open between requests (db.ConnectionPool); idle ones
+    # are pinged before reuse after DB_POOL_PING_AFTER seconds, 0 disables
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 4)
+    DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER') or 30)
+    
+    # Read replicas as comma-separated host[:port] (same credentials as primary)
+    MYSQL_REPLICA_HOSTS = [host.strip() for host in (os.environ.get('MYSQL_REPLICA_HOSTS') or '').split(',') if host.strip()]
+    
+    # Read/write splitting (replicas.py): read-only routes use a replica
+    # ('round_robin' or 'least_latency') lagging at most DB_REPLICA_MAX_LAG
+    # seconds, else the primary; a session that wrote reads from the primary
+    # for DB_READ_YOUR_WRITES_SECONDS, which should exceed the lag allowed
+    # plus the check interval. SQLITE_REPLICA_PATHS are stand-in replicas
+    SQLITE_REPLICA_PATHS = [path.strip() for path in (os.environ.get('SQLITE_REPLICA_PATHS') or '').split(',') if path.strip()]
+    DB_REPLICA_BALANCE = (os.environ.get('DB_REPLICA_BALANCE') or 'round_robin').lower()
+    DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG') or 5)
+    DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL') or 5)
+    DB_READ_YOUR_WRITES_SECONDS = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS') or 15)
+    
+    # Multi-site mode (sharding.py): SITES gives each regional blood bank its
+    # own database as site=host[:port]/database,... (file paths on SQLite);
+    # unset, one site uses the database above. Cross-site views give every
+    # site SHARD_QUERY_TIMEOUT seconds, querying SHARD_FANOUT_WORKERS at once
+    SITES = os.environ.get('SITES') or ''
+    SHARD_QUERY_TIMEOUT = float(os.environ.get('SHARD_QUERY_TIMEOUT') or 5)
+    SHARD_FANOUT_WORKERS = int(os.environ.get('SHARD_FANOUT_WORKERS') or 8)
+    
+    # Transfers between sites (transfers.py): every site keeps
+    # TRANSFER_COVER_DAYS of forecast demand and moves whole units of
+    # TRANSFER_UNIT_ML; travel minutes between sites come from a CSV of
+    # from_site,to_site,minutes
+    TRANSFER_COVER_DAYS = float(os.environ.get('TRANSFER_COVER_DAYS') or 7)
+    TRANSFER_UNIT_ML = int(os.environ.get('TRANSFER_UNIT_ML') or 450)
+    TRANSFER_COSTS_FILE = os.environ.get('TRANSFER_COSTS_FILE') or os.path.join(BASE_DIR, 'instance', 'site_distances.csv')
+    
+    # Online schema changes (online_schema.py / migrations.py --online)
+    ONLINE_SCHEMA_CHUNK_SIZE = int(os.environ.get('ONLINE_SCHEMA_CHUNK_SIZE') or 1000)
+    ONLINE_SCHEMA_CHUNK_TIME = float(os.environ.get('ONLINE_SCHEMA_CHUNK_TIME') or 0.5)
+    ONLINE_SCHEMA_MAX_LAG = int(os.environ.get('ONLINE_SCHEMA_MAX_LAG') or 5)
+    ONLINE_SCHEMA_MAX_THREADS_RUNNING = int(os.environ.get('ONLINE_SCHEMA_MAX_THREADS_RUNNING') or 25)
+    
+    # Archival of closed donations/requests (archive.py)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS') or 365)
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE') or 1000)
+    
+    # Inventory history rollups (inventory_history.py); hours and days are kept
+    INVENTORY_MINUTE_RETENTION_DAYS = int(os.environ.get('INVENTORY_MINUTE_RETENTION_DAYS') or 14)
+    
+    # Demand forecasting (forecasting.py)
+    FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS') or 365)
+    
+    # Stock status from days of supply (shortage.py); alerts fire when the
+    # projected stockout is within SHORTAGE_ALERT_HORIZON_DAYS
+    SHORTAGE_WINDOW_DAYS = int(os.environ.get('SHORTAGE_WINDOW_DAYS') or 28)
+    SHORTAGE_CRITICAL_DAYS = float(os.environ.get('SHORTAGE_CRITICAL_DAYS') or 2)
+    SHORTAGE_LOW_DAYS = float(os.environ.get('SHORTAGE_LOW_DAYS') or 5)
+    SHORTAGE_MODERATE_DAYS = float(os.environ.get('SHORTAGE_MODERATE_DAYS') or 10)
+    SHORTAGE_ALERT_HORIZON_DAYS = float(os.environ.get('SHORTAGE_ALERT_HORIZON_DAYS') or 7)
+    
+    # Donor recall campaigns (recall.py); donors are eligible again
+    # DONATION_INTERVAL_DAYS after their last donation
+    DONATION_INTERVAL_DAYS = int(os.environ.get('DONATION_INTERVAL_DAYS') or 56)
+    RECALL_CAMPAIGN_SIZE = int(os.environ.get('RECALL_CAMPAIGN_SIZE') or 2000)
+    
+    # Nearest-donor search (geo.py): grid cells of GEO_CELL_DEGREES; new
+    # donors join the grid every GEO_INDEX_REFRESH_SECONDS and it is rebuilt
+    # every GEO_INDEX_REBUILD_SECONDS. Searches list at most GEO_MAX_DONORS
+    GEO_CELL_DEGREES = float(os.environ.get('GEO_CELL_DEGREES') or 0.05)
+    GEO_INDEX_REFRESH_SECONDS = float(os.environ.get('GEO_INDEX_REFRESH_SECONDS') or 10)
+    GEO_INDEX_REBUILD_SECONDS = float(os.environ.get('GEO_INDEX_REBUILD_SECONDS') or 3600)
+    GEO_MAX_DONORS = int(os.environ.get('GEO_MAX_DONORS') or 100)
+    
+    # Donor search (search.py): searches list at most DONOR_SEARCH_LIMIT donors;
+    # new donors join the contact autocomplete every CONTACT_INDEX_REFRESH_SECONDS
+    DONOR_SEARCH_LIMIT = int(os.environ.get('DONOR_SEARCH_LIMIT') or 50)
+    CONTACT_INDEX_REFRESH_SECONDS = float(os.environ.get('CONTACT_INDEX_REFRESH_SECONDS') or 5)
+    
+    # Versioned JSON API (api.py): pages hold API_PAGE_SIZE rows unless ?limit=
+    # asks for up to API_MAX_PAGE_SIZE; a batch reads at most API_BATCH_MAX_REQUESTS
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE') or 100)
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE') or 500)
+    API_BATCH_MAX_REQUESTS = int(os.environ.get('API_BATCH_MAX_REQUESTS') or 20)
+    
+    # Notification outbox (notifications.py); NOTIFICATION_SENDER is 'stdout',
+    # 'file' (JSON lines in NOTIFICATION_FILE) or 'module:ClassName'
+    NOTIFICATION_SENDER = os.environ.get('NOTIFICATION_SENDER') or 'stdout'
+    NOTIFICATION_FILE = os.environ.get('NOTIFICATION_FILE') or os.path.join(BASE_DIR, 'instance', 'notifications.jsonl')
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE') or 50)
+    NOTIFICATION_RATE_PER_SECOND = float(os.environ.get('NOTIFICATION_RATE_PER_SECOND') or 20)
+    NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_MAX_ATTEMPTS') or 8)
+    NOTIFICATION_RETRY_SECONDS = int(os.environ.get('NOTIFICATION_RETRY_SECONDS') or 30)
+    NOTIFICATION_LEASE_SECONDS = int(os.environ.get('NOTIFICATION_LEASE_SECONDS') or 300)
+    
+    # Idempotency keys (idempotency.py); responses are replayed for
+    # IDEMPOTENCY_TTL_HOURS, the most recent ones from memory
+    IDEMPOTENCY_TTL_HOURS = int(os.environ.get('IDEMPOTENCY_TTL_HOURS') or 24)
+    IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE') or 10000)
+    
+    # Request rate limits per user (ratelimit.py) as endpoint=count/period,
+    # 'role:endpoint' for one role, '*' for all; backend 'memory' or redis:// URL
+    RATE_LIMITS = os.environ.get('RATE_LIMITS') or 'login=10/minute,register_donor=5/minute,hospital:dashboard_hospital=30/minute,donor:dashboard_donor=30/minute'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'
+    
+    # Admission control: concurrent requests allowed to use the database
+    # (0 disables); ADMISSION_RESERVED_SLOTS are kept for critical endpoints
+    DB_MAX_CONCURRENCY = int(os.environ.get('DB_MAX_CONCURRENCY') or 32)
+    ADMISSION_RESERVED_SLOTS = int(os.environ.get('ADMISSION_RESERVED_SLOTS') or 4)
+    ADMISSION_CRITICAL_ENDPOINTS = [name.strip() for name in (os.environ.get('ADMISSION_CRITICAL_ENDPOINTS') or 'approve_request,approve_donation').split(',') if name.strip()]
+    ADMISSION_READ_TIMEOUT = float(os.environ.get('ADMISSION_READ_TIMEOUT') or 1.0)
+    ADMISSION_WRITE_TIMEOUT = float(os.environ.get('ADMISSION_WRITE_TIMEOUT') or 10.0)
+    
+    # Responses smaller than this many bytes are sent uncompressed (assets.py)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE') or 1024)
+    
+    # Rendered template fragments kept in memory (fragment_cache.py); off
+    # under DEBUG, where templates reload when edited
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES') or 8 * 1024 * 1024)
+    
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     
@@ -0,0 +1,18 @@
+-- Composite indexes matching the queries the dashboards actually run
+-- (proposed by index_advisor.py; see benchmarks/README.md for timings)
+
+-- dashboard_donor: donation history WHERE Donor_ID = ? ORDER BY Date DESC
+CREATE INDEX idx_donation_donor_id_date ON Donation (Donor_ID, Date);
+
+-- dashboard_donor totals and donor_list join: Donor_ID + Status, covering Quantity
+CREATE INDEX idx_donation_donor_id_status_quantity ON Donation (Donor_ID, Status, Quantity);
+
+-- dashboard_hospital: request history WHERE Hospital_ID = ? ORDER BY Date DESC
+CREATE INDEX idx_request_hospital_id_date ON Request (Hospital_ID, Date);
+
+-- dashboard_admin: 10 most recent requests and donations
+CREATE INDEX idx_request_created_at ON Request (Created_At);
+CREATE INDEX idx_donation_created_at ON Donation (Created_At);
+
+-- donor_list: active donors ordered by name
+CREATE INDEX idx_donor_is_active_name ON Donor (Is_Active, Name);
@@ -0,0 +1,58 @@
+-- Cold storage for closed donations and requests (filled by archive.py)
+-- Rows keep their original IDs; the *_All views span hot and archived rows
+
+CREATE TABLE Donation_Archive (
+    Donation_ID INT PRIMARY KEY,
+    Donor_ID INT NOT NULL,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Quantity DECIMAL(5,2) NOT NULL,
+    Date DATE NOT NULL,
+    Status ENUM('Pending', 'Approved', 'Rejected') NOT NULL,
+    Admin_Notes TEXT,
+    Created_At TIMESTAMP NULL DEFAULT NULL,
+    Archived_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (Donor_ID) REFERENCES Donor(Donor_ID) ON DELETE CASCADE
+);
+
+CREATE TABLE Request_Archive (
+    Request_ID INT PRIMARY KEY,
+    Hospital_ID INT NOT NULL,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Quantity DECIMAL(5,2) NOT NULL,
+    Date DATE NOT NULL,
+    Status ENUM('Pending', 'Approved', 'Rejected', 'Fulfilled') NOT NULL,
+    Admin_Notes TEXT,
+    Created_At TIMESTAMP NULL DEFAULT NULL,
+    Archived_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (Hospital_ID) REFERENCES Hospital(Hospital_ID) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_donation_archive_donor_id_date ON Donation_Archive (Donor_ID, Date);
+CREATE INDEX idx_request_archive_hospital_id_date ON Request_Archive (Hospital_ID, Date);
+
+-- Views for history and reporting queries that must include archived rows
+CREATE VIEW Donation_All AS
+SELECT Donation_ID, Donor_ID, Blood_Group, Quantity, Date, Status, Admin_Notes, Created_At
+FROM Donation
+UNION ALL
+SELECT Donation_ID, Donor_ID, Blood_Group, Quantity, Date, Status, Admin_Notes, Created_At
+FROM Donation_Archive;
+
+CREATE VIEW Request_All AS
+SELECT Request_ID, Hospital_ID, Blood_Group, Quantity, Date, Status, Admin_Notes, Created_At
+FROM Request
+UNION ALL
+SELECT Request_ID, Hospital_ID, Blood_Group, Quantity, Date, Status, Admin_Notes, Created_At
+FROM Request_Archive;
+
+CREATE OR REPLACE VIEW donor_donation_summary AS
+SELECT 
+    d.Donor_ID,
+    d.Name,
+    d.Blood_Group,
+    COUNT(dn.Donation_ID) as Total_Donations,
+    COALESCE(SUM(dn.Quantity), 0) as Total_Blood_Donated,
+    MAX(dn.Date) as Last_Donation_Date
+FROM Donor d
+LEFT JOIN Donation_All dn ON d.Donor_ID = dn.Donor_ID AND dn.Status = 'Approved'
+GROUP BY d.Donor_ID, d.Name, d.Blood_Group;
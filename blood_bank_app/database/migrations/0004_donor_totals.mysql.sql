@@ -0,0 +1,24 @@
+-- Running per-donor totals of approved donations (hot and archived),
+-- maintained by approve_donation/reject_donation and checked by donor_totals.py
+
+-- ADD COLUMN is ALGORITHM=INSTANT on MySQL 8, so Donor is not rebuilt
+ALTER TABLE Donor
+    ADD COLUMN Total_Donations INT NOT NULL DEFAULT 0,
+    ADD COLUMN Total_Blood_Donated DECIMAL(10,2) NOT NULL DEFAULT 0,
+    ADD COLUMN Last_Donation_Date DATE NULL;
+
+-- One aggregate pass instead of three correlated subqueries per donor
+UPDATE Donor d
+JOIN (
+    SELECT Donor_ID, COUNT(*) AS Donations, SUM(Quantity) AS Volume, MAX(Date) AS Last_Date
+    FROM Donation_All
+    WHERE Status = 'Approved'
+    GROUP BY Donor_ID
+) totals ON totals.Donor_ID = d.Donor_ID
+SET d.Total_Donations = totals.Donations,
+    d.Total_Blood_Donated = totals.Volume,
+    d.Last_Donation_Date = totals.Last_Date;
+
+CREATE OR REPLACE VIEW donor_donation_summary AS
+SELECT Donor_ID, Name, Blood_Group, Total_Donations, Total_Blood_Donated, Last_Donation_Date
+FROM Donor;
@@ -0,0 +1,19 @@
+-- Running per-donor totals of approved donations (hot and archived),
+-- maintained by approve_donation/reject_donation and checked by donor_totals.py
+
+ALTER TABLE Donor
+    ADD COLUMN Total_Donations INT NOT NULL DEFAULT 0,
+    ADD COLUMN Total_Blood_Donated DECIMAL(10,2) NOT NULL DEFAULT 0,
+    ADD COLUMN Last_Donation_Date DATE NULL;
+
+UPDATE Donor SET
+    Total_Donations = (SELECT COUNT(*) FROM Donation_All a
+                       WHERE a.Donor_ID = Donor.Donor_ID AND a.Status = 'Approved'),
+    Total_Blood_Donated = (SELECT COALESCE(SUM(a.Quantity), 0) FROM Donation_All a
+                           WHERE a.Donor_ID = Donor.Donor_ID AND a.Status = 'Approved'),
+    Last_Donation_Date = (SELECT MAX(a.Date) FROM Donation_All a
+                          WHERE a.Donor_ID = Donor.Donor_ID AND a.Status = 'Approved');
+
+CREATE OR REPLACE VIEW donor_donation_summary AS
+SELECT Donor_ID, Name, Blood_Group, Total_Donations, Total_Blood_Donated, Last_Donation_Date
+FROM Donor;
@@ -0,0 +1,45 @@
+-- Inventory history: an append-only ledger written with every stock change
+-- and minute/hour/day rollups of it (maintained by inventory_history.py)
+
+CREATE TABLE Inventory_Ledger (
+    Ledger_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Change_Quantity DECIMAL(10,2) NOT NULL,
+    Balance DECIMAL(10,2) NOT NULL,
+    Reason ENUM('opening', 'donation', 'request', 'reversal', 'adjustment') NOT NULL,
+    Reference_ID INT NULL,
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_inventory_ledger_created_at ON Inventory_Ledger (Created_At);
+CREATE INDEX idx_inventory_ledger_blood_group_created_at ON Inventory_Ledger (Blood_Group, Created_At);
+
+-- One row per blood group and bucket; Seconds_Critical/Seconds_Low are the
+-- time stock was at zero / below 50 (low includes critical)
+CREATE TABLE Inventory_Rollup (
+    Resolution ENUM('minute', 'hour', 'day') NOT NULL,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Bucket_Start DATETIME NOT NULL,
+    Open_Quantity DECIMAL(10,2) NOT NULL,
+    Min_Quantity DECIMAL(10,2) NOT NULL,
+    Max_Quantity DECIMAL(10,2) NOT NULL,
+    Close_Quantity DECIMAL(10,2) NOT NULL,
+    Net_Change DECIMAL(10,2) NOT NULL,
+    Changes INT NOT NULL,
+    Seconds_Critical INT NOT NULL,
+    Seconds_Low INT NOT NULL,
+    PRIMARY KEY (Resolution, Blood_Group, Bucket_Start)
+);
+
+CREATE INDEX idx_inventory_rollup_resolution_bucket_start ON Inventory_Rollup (Resolution, Bucket_Start);
+
+-- Buckets before Rolled_Up_To are complete and will not be rewritten
+CREATE TABLE Inventory_Rollup_State (
+    Resolution ENUM('minute', 'hour', 'day') PRIMARY KEY,
+    Rolled_Up_To DATETIME NOT NULL
+);
+
+-- Opening balances so history starts from the current stock
+INSERT INTO Inventory_Ledger (Blood_Group, Change_Quantity, Balance, Reason)
+SELECT Blood_Group, Available_Quantity, Available_Quantity, 'opening'
+FROM Blood_Inventory;
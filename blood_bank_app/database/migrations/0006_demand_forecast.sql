@@ -0,0 +1,25 @@
+-- Demand forecasts per hospital and blood group, refreshed by forecasting.py
+-- Hospital_ID 0 holds the forecast for all hospitals combined
+
+CREATE TABLE Demand_Forecast (
+    Hospital_ID INT NOT NULL,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Daily_Level DECIMAL(12,2) NOT NULL,
+    Daily_Std DECIMAL(12,2) NOT NULL,
+    Next_7_Days DECIMAL(12,2) NOT NULL,
+    Next_30_Days DECIMAL(12,2) NOT NULL,
+    Alpha DECIMAL(4,3) NOT NULL,
+    Generated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (Hospital_ID, Blood_Group)
+);
+
+-- Day-by-day forecast for all hospitals combined (dashboard charts)
+CREATE TABLE Demand_Forecast_Daily (
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Forecast_Date DATE NOT NULL,
+    Quantity DECIMAL(12,2) NOT NULL,
+    PRIMARY KEY (Blood_Group, Forecast_Date)
+);
+
+-- Forecasts read a year of history from Request_All
+CREATE INDEX idx_request_archive_date ON Request_Archive (Date);
@@ -0,0 +1,62 @@
+-- Consumption-based stock status per blood group (maintained by shortage.py
+-- from update_blood_inventory) replacing the fixed 0/50/100 ml thresholds
+
+-- Approved request volume per group and day; the rolling window sums these
+CREATE TABLE Daily_Consumption (
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Day DATE NOT NULL,
+    Quantity DECIMAL(12,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Blood_Group, Day)
+);
+
+CREATE TABLE Shortage_Alert (
+    Alert_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Status ENUM('Critical', 'Low', 'Moderate', 'Good') NOT NULL,
+    Available_Quantity DECIMAL(10,2) NOT NULL,
+    Days_Of_Supply DECIMAL(10,2) NULL,
+    Projected_Stockout DATE NULL,
+    Raised_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Resolved_At TIMESTAMP NULL DEFAULT NULL
+);
+
+CREATE INDEX idx_shortage_alert_blood_group_raised_at ON Shortage_Alert (Blood_Group, Raised_At);
+
+-- Current window total and classification; Days_Of_Supply is NULL when
+-- nothing was consumed in the window
+CREATE TABLE Blood_Group_Status (
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') PRIMARY KEY,
+    Window_End DATE NOT NULL,
+    Consumed_In_Window DECIMAL(12,2) NOT NULL,
+    Available_Quantity DECIMAL(10,2) NOT NULL,
+    Daily_Rate DECIMAL(12,2) NOT NULL,
+    Days_Of_Supply DECIMAL(10,2) NULL,
+    Status ENUM('Critical', 'Low', 'Moderate', 'Good') NOT NULL,
+    Open_Alert_ID INT NULL,
+    Updated_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Consumption recorded in the ledger so far
+INSERT INTO Daily_Consumption (Blood_Group, Day, Quantity)
+SELECT Blood_Group, DATE(Created_At), -SUM(Change_Quantity)
+FROM Inventory_Ledger
+WHERE Reason = 'request'
+GROUP BY Blood_Group, DATE(Created_At);
+
+-- Groups not evaluated yet fall back to the old fixed levels
+CREATE OR REPLACE VIEW blood_availability AS
+SELECT 
+    i.Blood_Group,
+    i.Available_Quantity,
+    COALESCE(s.Status,
+        CASE 
+            WHEN i.Available_Quantity = 0 THEN 'Critical'
+            WHEN i.Available_Quantity < 50 THEN 'Low'
+            WHEN i.Available_Quantity < 100 THEN 'Moderate'
+            ELSE 'Good'
+        END) as Status,
+    s.Days_Of_Supply,
+    s.Daily_Rate
+FROM Blood_Inventory i
+LEFT JOIN Blood_Group_Status s ON s.Blood_Group = i.Blood_Group
+ORDER BY i.Blood_Group;
@@ -0,0 +1,25 @@
+-- Donor recall campaigns built by recall.py when a blood group runs short:
+-- the ranked call list of eligible donors from compatible groups
+
+CREATE TABLE Recall_Campaign (
+    Campaign_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Blood_Group ENUM('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-') NOT NULL,
+    Alert_ID INT NULL,
+    Location VARCHAR(200) NULL,
+    Donor_Groups VARCHAR(40) NOT NULL,
+    Eligible_Donors INT NOT NULL DEFAULT 0,
+    Listed_Donors INT NOT NULL DEFAULT 0,
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (Alert_ID) REFERENCES Shortage_Alert(Alert_ID) ON DELETE SET NULL
+);
+
+-- Call_Rank 1 is called first
+CREATE TABLE Recall_Campaign_Donor (
+    Campaign_ID INT NOT NULL,
+    Call_Rank INT NOT NULL,
+    Donor_ID INT NOT NULL,
+    Score DECIMAL(6,4) NOT NULL,
+    PRIMARY KEY (Campaign_ID, Call_Rank),
+    FOREIGN KEY (Campaign_ID) REFERENCES Recall_Campaign(Campaign_ID) ON DELETE CASCADE,
+    FOREIGN KEY (Donor_ID) REFERENCES Donor(Donor_ID) ON DELETE CASCADE
+);
@@ -0,0 +1,23 @@
+-- Outbound notifications, written in the same transaction as the change
+-- they announce and delivered by notifications.py workers
+
+CREATE TABLE Notification_Outbox (
+    Notification_ID INT AUTO_INCREMENT PRIMARY KEY,
+    Channel VARCHAR(20) NOT NULL,
+    Recipient VARCHAR(200) NOT NULL,
+    Subject VARCHAR(200) NOT NULL,
+    Body TEXT NOT NULL,
+    Event VARCHAR(50) NOT NULL,
+    Reference_ID INT NULL,
+    Status ENUM('Pending', 'Sending', 'Sent', 'Failed') DEFAULT 'Pending',
+    Attempts INT NOT NULL DEFAULT 0,
+    Next_Attempt_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Claimed_By VARCHAR(64) NULL,
+    Claimed_Until TIMESTAMP NULL DEFAULT NULL,
+    Last_Error VARCHAR(500) NULL,
+    Created_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Sent_At TIMESTAMP NULL DEFAULT NULL
+);
+
+-- Workers claim due messages oldest first and requeue expired claims
+CREATE INDEX idx_notification_outbox_status_next_attempt_at ON Notification_Outbox (Status, Next_Attempt_At);
@@ -0,0 +1,32 @@
+-- Append-only audit trail of every change made through the application:
+-- who (Actor), what (Action on Entity/Entity_ID), when, and the changed
+-- fields before and after as JSON
+
+CREATE TABLE Audit_Log (
+    Audit_ID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    Occurred_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    Actor_Type ENUM('admin', 'donor', 'hospital', 'anonymous', 'system') NOT NULL,
+    Actor_ID INT NULL,
+    Action VARCHAR(30) NOT NULL,
+    Entity VARCHAR(30) NOT NULL,
+    Entity_ID VARCHAR(20) NOT NULL,
+    Before_Values TEXT NULL,
+    After_Values TEXT NULL,
+    Remote_Addr VARCHAR(45) NULL
+);
+
+-- History of one record, and everything in a time range
+CREATE INDEX idx_audit_log_entity_entity_id ON Audit_Log (Entity, Entity_ID, Audit_ID);
+CREATE INDEX idx_audit_log_occurred_at ON Audit_Log (Occurred_At);
+
+DELIMITER //
+CREATE TRIGGER audit_log_no_update BEFORE UPDATE ON Audit_Log
+BEGIN
+    SELECT RAISE(ABORT, 'Audit_Log is append-only');
+END//
+
+CREATE TRIGGER audit_log_no_delete BEFORE DELETE ON Audit_Log
+BEGIN
+    SELECT RAISE(ABORT, 'Audit_Log is append-only');
+END//
+DELIMITER ;
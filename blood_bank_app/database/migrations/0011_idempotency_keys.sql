@@ -0,0 +1,16 @@
+-- Idempotency keys for retried POSTs (idempotency.py). A key is claimed in
+-- the transaction of the insert it protects and holds the response to replay.
+-- Expires_At is epoch seconds.
+
+CREATE TABLE Idempotency_Key (
+    Scope VARCHAR(100) NOT NULL,
+    Idem_Key VARCHAR(100) NOT NULL,
+    Fingerprint CHAR(64) NOT NULL,
+    Status_Code SMALLINT NULL,
+    Response_Body TEXT NULL,
+    Expires_At BIGINT NOT NULL,
+    PRIMARY KEY (Scope, Idem_Key)
+);
+
+-- idempotency.py --purge deletes expired keys
+CREATE INDEX idx_idempotency_key_expires_at ON Idempotency_Key (Expires_At);
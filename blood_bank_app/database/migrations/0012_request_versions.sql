@@ -0,0 +1,26 @@
+-- Per-hospital version of its requests, bumped by every insert, update and
+-- delete, so the hospital pages can answer conditional GETs (ETag) without
+-- reading the request history
+
+ALTER TABLE Hospital ADD COLUMN Requests_Version INT NOT NULL DEFAULT 0;
+
+DELIMITER //
+CREATE TRIGGER request_version_insert AFTER INSERT ON Request
+FOR EACH ROW
+BEGIN
+    UPDATE Hospital SET Requests_Version = Requests_Version + 1 WHERE Hospital_ID = NEW.Hospital_ID;
+END//
+
+CREATE TRIGGER request_version_update AFTER UPDATE ON Request
+FOR EACH ROW
+BEGIN
+    UPDATE Hospital SET Requests_Version = Requests_Version + 1
+    WHERE Hospital_ID IN (OLD.Hospital_ID, NEW.Hospital_ID);
+END//
+
+CREATE TRIGGER request_version_delete AFTER DELETE ON Request
+FOR EACH ROW
+BEGIN
+    UPDATE Hospital SET Requests_Version = Requests_Version + 1 WHERE Hospital_ID = OLD.Hospital_ID;
+END//
+DELIMITER ;
@@ -0,0 +1,18 @@
+-- Coordinates for proximity search (geo.py). Geo_Place is the local lookup
+-- table addresses are geocoded against: place names or postcodes as they
+-- are written in addresses, loaded with `python geo.py --load-places`
+
+CREATE TABLE Geo_Place (
+    Place_Key VARCHAR(200) PRIMARY KEY,
+    Place_Name VARCHAR(200) NOT NULL,
+    Latitude DOUBLE NOT NULL,
+    Longitude DOUBLE NOT NULL
+);
+
+ALTER TABLE Donor
+    ADD COLUMN Latitude DOUBLE NULL,
+    ADD COLUMN Longitude DOUBLE NULL;
+
+ALTER TABLE Hospital
+    ADD COLUMN Latitude DOUBLE NULL,
+    ADD COLUMN Longitude DOUBLE NULL;
@@ -0,0 +1,8 @@
+-- Donor search by name and address (search.py). Every word of a search is
+-- matched as a prefix in BOOLEAN MODE. Contact numbers are completed in
+-- memory (search.ContactIndex)
+
+-- Left to MySQL rather than online_schema: InnoDB adds a FULLTEXT index in
+-- place, though writes to Donor wait until it is built
+
+CREATE FULLTEXT INDEX ft_donor_name_address ON Donor (Name, Address);
@@ -0,0 +1,33 @@
+-- Donor search by name and address (search.py). SQLite has no FULLTEXT
+-- index, so an FTS5 table over Donor stands in for it, kept in step by
+-- triggers. Prefixes of up to eight letters are read from their own
+-- prefix index, in Donor_ID order, so a search stops after the first
+-- matches instead of merging the donor lists of every word the prefix
+-- starts. Contact numbers are completed in memory (search.ContactIndex)
+
+CREATE VIRTUAL TABLE Donor_Search USING fts5(
+    Name, Address,
+    content = 'Donor', content_rowid = 'Donor_ID', prefix = '1 2 3 4 5 6 7 8'
+);
+
+INSERT INTO Donor_Search (Donor_Search) VALUES ('rebuild');
+
+DELIMITER //
+CREATE TRIGGER donor_search_insert AFTER INSERT ON Donor
+BEGIN
+    INSERT INTO Donor_Search (rowid, Name, Address) VALUES (NEW.Donor_ID, NEW.Name, NEW.Address);
+END//
+
+CREATE TRIGGER donor_search_delete AFTER DELETE ON Donor
+BEGIN
+    INSERT INTO Donor_Search (Donor_Search, rowid, Name, Address)
+    VALUES ('delete', OLD.Donor_ID, OLD.Name, OLD.Address);
+END//
+
+CREATE TRIGGER donor_search_update AFTER UPDATE OF Name, Address ON Donor
+BEGIN
+    INSERT INTO Donor_Search (Donor_Search, rowid, Name, Address)
+    VALUES ('delete', OLD.Donor_ID, OLD.Name, OLD.Address);
+    INSERT INTO Donor_Search (rowid, Name, Address) VALUES (NEW.Donor_ID, NEW.Name, NEW.Address);
+END//
+DELIMITER ;
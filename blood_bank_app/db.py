@@ -0,0 +1,521 @@
+"""
+Database access layer for Blood Bank Management System
+Wraps MySQL and SQLite behind one DB-API style interface so the rest of the
+application can keep writing MySQL-flavoured SQL with %s placeholders
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+class Error(Exception):
+    """Base class for database errors raised by any backend"""
+
+class IntegrityError(Error):
+    """Raised on duplicate keys and other constraint violations"""
+
+# Per-connection SQLite tuning. WAL lets readers run alongside the single
+# writer, NORMAL sync only fsyncs at checkpoints, and the busy timeout makes
+# concurrent writers wait for the lock instead of failing immediately.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA foreign_keys=ON',
+    'PRAGMA busy_timeout={busy_timeout}',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=134217728',
+)
+
+def _setting(settings, name, default=None):
+    """Read a setting from a Flask config mapping or a config class"""
+    if hasattr(settings, 'get'):
+        return settings.get(name, default)
+    return getattr(settings, name, default)
+
+def backend_name(settings):
+    """Return the configured backend name ('mysql' or 'sqlite')"""
+    return (_setting(settings, 'DB_BACKEND') or 'mysql').lower()
+
+# Statements recorded by capture_statements(); None when capture is off
+_captured = None
+
+def start_capture():
+    """Record every statement executed from now on and return the list"""
+    global _captured
+    _captured = []
+    return _captured
+
+def stop_capture():
+    """Stop recording and return the statements captured so far"""
+    global _captured
+    captured, _captured = _captured, None
+    return captured or []
+
+class Cursor:
+    """Cursor wrapper that translates SQL and normalises backend errors"""
+
+    def __init__(self, connection, raw):
+        self.connection = connection
+        self._raw = raw
+
+    def execute(self, query, params=None):
+        """Execute a single statement with %s placeholders"""
+        conn = self.connection
+        if _captured is not None:
+            _captured.append((query, params))
+        try:
+            if conn.translate is None:
+                self._raw.execute(query, params or ())
+            else:
+                for statement in conn.translate(query):
+                    self._raw.execute(statement, params or ())
+        except conn.integrity_error as e:
+            raise IntegrityError(str(e)) from e
+        except conn.base_error as e:
+            raise Error(str(e)) from e
+        return self
+
+    def executemany(self, query, seq_of_params):
+        """Execute a statement once per parameter tuple"""
+        conn = self.connection
+        try:
+            if conn.translate is None:
+                self._raw.executemany(query, seq_of_params)
+            else:
+                statement, = conn.translate(query)
+                self._raw.executemany(statement, seq_of_params)
+        except conn.integrity_error as e:
+            raise IntegrityError(str(e)) from e
+        except conn.base_error as e:
+            raise Error(str(e)) from e
+        return self
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._raw.fetchmany()
+        return self._raw.fetchmany(size)
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    def close(self):
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def description(self):
+        return self._raw.description
+
+class Connection:
+    """Connection wrapper shared by all backends"""
+
+    def __init__(self, raw, backend, translate, base_error, integrity_error):
+        self.raw = raw
+        self.backend = backend
+        self.translate = translate
+        self.base_error = base_error
+        self.integrity_error = integrity_error
+        # Set by ConnectionPool; close() then hands the connection back
+        self.pool = None
+        self.in_pool = False
+        self.last_used = time.monotonic()
+
+    def cursor(self, dictionary=False):
+        """Return a cursor; dictionary=True yields rows as dicts"""
+        try:
+            if self.backend == 'mysql':
+                return Cursor(self, self.raw.cursor(dictionary=dictionary))
+            raw = self.raw.cursor()
+            if dictionary:
+                raw.row_factory = _dict_row
+            return Cursor(self, raw)
+        except self.base_error as e:
+            raise Error(str(e)) from e
+
+    def begin(self):
+        """Start a transaction explicitly
+
+        On SQLite this takes the write lock up front (BEGIN IMMEDIATE), so
+        reads inside the transaction see the rows it is about to update.
+        """
+        try:
+            if self.backend == 'sqlite':
+                self.raw.execute('BEGIN IMMEDIATE')
+            else:
+                self.raw.start_transaction()
+        except self.base_error as e:
+            raise Error(str(e)) from e
+
+    def commit(self):
+        try:
+            self.raw.commit()
+        except self.base_error as e:
+            raise Error(str(e)) from e
+
+    def rollback(self):
+        try:
+            self.raw.rollback()
+        except self.base_error as e:
+            raise Error(str(e)) from e
+
+    def close(self):
+        if self.in_pool:
+            return
+        if self.pool is None or not self.pool.release(self):
+            self.discard()
+
+    def discard(self):
+        """Close the underlying connection for good, even if it came from a pool"""
+        self.pool = None
+        try:
+            self.raw.close()
+        except self.base_error:
+            pass
+
+    def is_alive(self):
+        """Cheap round trip to check the server has not dropped the connection"""
+        try:
+            if self.backend == 'mysql':
+                self.raw.ping(reconnect=False)
+            else:
+                self.raw.execute('SELECT 1').fetchone()
+            return True
+        except self.base_error:
+            return False
+
+    def executescript(self, statements):
+        """Run a list of statements in a single round trip
+        
+        SQLite runs the whole script inside one transaction. MySQL commits
+        implicitly after every DDL statement, so only DML is rolled back there.
+        """
+        try:
+            if self.backend == 'sqlite':
+                parts = ['BEGIN IMMEDIATE']
+                for statement in statements:
+                    parts.extend(translate_sqlite(statement))
+                parts.append('COMMIT')
+                self.raw.executescript(';\n'.join(parts) + ';')
+            else:
+                cursor = self.raw.cursor()
+                for result in cursor.execute(';\n'.join(statements), multi=True):
+                    if result.with_rows:
+                        result.fetchall()
+                cursor.close()
+                self.raw.commit()
+        except self.integrity_error as e:
+            self._rollback_quietly()
+            raise IntegrityError(str(e)) from e
+        except self.base_error as e:
+            self._rollback_quietly()
+            raise Error(str(e)) from e
+
+    def _rollback_quietly(self):
+        try:
+            self.raw.rollback()
+        except self.base_error:
+            pass
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+def connect(settings, use_database=True):
+    """Open a connection to the configured backend"""
+    if backend_name(settings) == 'sqlite':
+        return _connect_sqlite(settings)
+    return _connect_mysql(settings, use_database)
+
+class ConnectionPool:
+    """Idle connections kept for reuse by later requests in the same process
+
+    Serverless platforms keep a warm process around between invocations, so
+    the connection opened by one request serves the next instead of paying
+    the TCP and authentication round trips again. Connections idle longer
+    than DB_POOL_PING_AFTER seconds are pinged before reuse, dead ones
+    dropped; at most DB_POOL_SIZE are kept (0 disables pooling). A process
+    that forks with idle connections does not reuse them in the child.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.size = int(_setting(settings, 'DB_POOL_SIZE', 4))
+        self.ping_after = float(_setting(settings, 'DB_POOL_PING_AFTER', 30))
+        self.idle = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.opened = self.reused = self.dropped = 0
+
+    def get(self):
+        """Return a live connection, reusing an idle one when possible"""
+        while True:
+            with self.lock:
+                self._check_fork()
+                if not self.idle:
+                    break
+                conn = self.idle.pop()
+            conn.in_pool = False
+            if time.monotonic() - conn.last_used < self.ping_after or conn.is_alive():
+                self.reused += 1
+                return conn
+            self.dropped += 1
+            conn.discard()
+        conn = connect(self.settings)
+        conn.pool = self
+        self.opened += 1
+        return conn
+
+    def release(self, conn):
+        """Take a connection back; False if the caller should close it instead"""
+        if self.size <= 0 or os.getpid() != self.pid:
+            return False
+        try:
+            # Ends whatever the request left open, so the next one starts clean
+            conn.rollback()
+        except Error:
+            return False
+        with self.lock:
+            if len(self.idle) >= self.size:
+                return False
+            conn.last_used = time.monotonic()
+            conn.in_pool = True
+            self.idle.append(conn)
+        return True
+
+    def clear(self):
+        """Close every idle connection"""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.in_pool = False
+            conn.discard()
+
+    def stats(self):
+        with self.lock:
+            return {'idle': len(self.idle), 'size': self.size, 'opened': self.opened,
+                    'reused': self.reused, 'dropped': self.dropped}
+
+    def _check_fork(self):
+        # Connections inherited from the parent share its sockets; forget them
+        # without closing, which would tear the parent's sessions down too
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.idle = []
+
+def _connect_mysql(settings, use_database):
+    import mysql.connector
+
+    options = {
+        'host': _setting(settings, 'MYSQL_HOST'),
+        'user': _setting(settings, 'MYSQL_USER'),
+        'password': _setting(settings, 'MYSQL_PASSWORD'),
+        'port': _setting(settings, 'MYSQL_PORT'),
+        'autocommit': False,
+        'connect_timeout': 10,
+    }
+    if use_database:
+        options['database'] = _setting(settings, 'MYSQL_DATABASE')
+    try:
+        raw = mysql.connector.connect(**options)
+    except mysql.connector.Error as e:
+        raise Error(str(e)) from e
+    return Connection(raw, 'mysql', None, mysql.connector.Error, mysql.connector.IntegrityError)
+
+def _connect_sqlite(settings):
+    path = _setting(settings, 'SQLITE_PATH')
+    busy_timeout = int(_setting(settings, 'SQLITE_BUSY_TIMEOUT_MS', 5000))
+    uri = path.startswith('file:')
+    if not uri and path != ':memory:':
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+    try:
+        raw = sqlite3.connect(path,
+                              timeout=busy_timeout / 1000.0,
+                              detect_types=sqlite3.PARSE_DECLTYPES,
+                              check_same_thread=False,
+                              uri=uri)
+        for pragma in SQLITE_PRAGMAS:
+            raw.execute(pragma.format(busy_timeout=busy_timeout))
+    except sqlite3.Error as e:
+        raise Error(str(e)) from e
+    return Connection(raw, 'sqlite', translate_sqlite, sqlite3.Error, sqlite3.IntegrityError)
+
+# SQLite type adapters/converters so rows come back with the same Python
+# types mysql.connector returns (Decimal, date, datetime)
+def _convert_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+def _convert_timestamp(value):
+    return datetime.fromisoformat(value.decode())
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' ', timespec='seconds'))
+sqlite3.register_converter('DECIMAL', lambda value: Decimal(value.decode()))
+sqlite3.register_converter('DATE', _convert_date)
+sqlite3.register_converter('DATETIME', _convert_timestamp)
+sqlite3.register_converter('TIMESTAMP', _convert_timestamp)
+sqlite3.register_converter('BOOLEAN', lambda value: bool(int(value)))
+
+# MySQL -> SQLite dialect translation
+_LEADING_COMMENTS = re.compile(r'^(\s*(--[^\n]*\n|/\*.*?\*/))*\s*', re.S)
+_ON_DUPLICATE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.I)
+_VALUES_FUNC = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.I)
+_FUNCTION_RENAMES = (
+    (re.compile(r'\bGREATEST\s*\(', re.I), 'MAX('),
+    (re.compile(r'\bLEAST\s*\(', re.I), 'MIN('),
+    (re.compile(r'\bNOW\s*\(\s*\)', re.I), 'CURRENT_TIMESTAMP'),
+    (re.compile(r'\bCURDATE\s*\(\s*\)', re.I), "DATE('now')"),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'\s+FOR\s+UPDATE(\s+SKIP\s+LOCKED)?\b', re.I), ''),
+)
+_CREATE_TABLE = re.compile(r'^CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)', re.I)
+_AUTO_INCREMENT_PK = re.compile(r'\b(?:BIG|SMALL|TINY)?INT\b(\s+UNSIGNED)?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY', re.I)
+_ENUM_COLUMN = re.compile(r'\b(\w+)\s+ENUM\s*\(([^)]*)\)', re.I)
+_ON_UPDATE_COLUMN = re.compile(r'\b(\w+)\s+(?:TIMESTAMP|DATETIME)\b[^,\n]*?\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP', re.I)
+_ON_UPDATE = re.compile(r'\s+ON\s+UPDATE\s+CURRENT_TIMESTAMP', re.I)
+_FOREIGN_KEY = re.compile(r'\bFOREIGN\s+KEY\s*\(\s*(\w+)\s*\)', re.I)
+_UNIQUE_KEY = re.compile(r'\bUNIQUE\s+(?:KEY|INDEX)\s+(\w+)\s*\(', re.I)
+_TABLE_OPTIONS = re.compile(r'\)\s*(ENGINE|DEFAULT\s+CHARSET|CHARSET|COLLATE)\b[^;]*$', re.I)
+_DROP_INDEX_ON = re.compile(r'^DROP\s+INDEX\s+(\w+)\s+ON\s+\w+$', re.I)
+_CREATE_OR_REPLACE_VIEW = re.compile(r'^CREATE\s+OR\s+REPLACE\s+VIEW\s+(\w+)', re.I)
+_ALTER_ADD_COLUMNS = re.compile(r'^ALTER\s+TABLE\s+(\w+)\s+(ADD\s+COLUMN\b.*)$', re.I | re.S)
+
+@lru_cache(maxsize=1024)
+def translate_sqlite(query):
+    """Translate one MySQL statement into a tuple of SQLite statements"""
+    body = _LEADING_COMMENTS.sub('', query, count=1).strip().rstrip(';').strip()
+    keyword = body[:16].upper()
+    if keyword.startswith('CREATE DATABASE') or keyword.startswith('USE '):
+        return ()
+
+    body = _placeholders(body)
+    match = _ON_DUPLICATE.search(body)
+    if match:
+        tail = _VALUES_FUNC.sub(r'excluded.\1', body[match.end():])
+        body = body[:match.start()] + 'ON CONFLICT DO UPDATE SET' + tail
+    for pattern, replacement in _FUNCTION_RENAMES:
+        body = pattern.sub(replacement, body)
+
+    if keyword.startswith('CREATE TABLE'):
+        return _translate_create_table(body)
+    match = _DROP_INDEX_ON.match(body)
+    if match:
+        return (f'DROP INDEX IF EXISTS {match.group(1)}',)
+    match = _CREATE_OR_REPLACE_VIEW.match(body)
+    if match:
+        return (f'DROP VIEW IF EXISTS {match.group(1)}',
+                _CREATE_OR_REPLACE_VIEW.sub(f'CREATE VIEW {match.group(1)}', body))
+    match = _ALTER_ADD_COLUMNS.match(body)
+    if match:
+        # SQLite only accepts one ADD COLUMN per ALTER TABLE
+        table = match.group(1)
+        clauses = re.split(r',\s*(?=ADD\s+COLUMN\b)', match.group(2), flags=re.I)
+        return tuple(f'ALTER TABLE {table} {_enum_to_check(clause)}' for clause in clauses)
+    return (body,)
+
+def _translate_create_table(body):
+    table = _CREATE_TABLE.match(body).group(2)
+    triggers = []
+    for column in _ON_UPDATE_COLUMN.findall(body):
+        # Emulate ON UPDATE CURRENT_TIMESTAMP; the WHEN clause keeps explicit
+        # assignments and stops the trigger from re-firing on its own update
+        triggers.append(
+            f'CREATE TRIGGER IF NOT EXISTS trg_{table}_{column}_on_update '
+            f'AFTER UPDATE ON {table} FOR EACH ROW '
+            f'WHEN NEW.{column} IS OLD.{column} BEGIN '
+            f'UPDATE {table} SET {column} = CURRENT_TIMESTAMP WHERE rowid = NEW.rowid; END')
+    # InnoDB indexes foreign key columns automatically; SQLite does not, and
+    # without them every join from the parent table becomes a full scan
+    indexes = tuple(
+        f'CREATE INDEX IF NOT EXISTS fk_{table.lower()}_{column.lower()} ON {table} ({column})'
+        for column in _FOREIGN_KEY.findall(body))
+    body = _ON_UPDATE.sub('', body)
+    body = _AUTO_INCREMENT_PK.sub('INTEGER PRIMARY KEY AUTOINCREMENT', body)
+    body = _enum_to_check(body)
+    body = _UNIQUE_KEY.sub(r'CONSTRAINT \1 UNIQUE (', body)
+    body = _TABLE_OPTIONS.sub(')', body)
+    return (body,) + indexes + tuple(triggers)
+
+def _enum_to_check(body):
+    return _ENUM_COLUMN.sub(r'\1 TEXT CHECK (\1 IN (\2))', body)
+
+def _placeholders(query):
+    """Rewrite %s placeholders as ? outside of string literals"""
+    if '%' not in query:
+        return query
+    out = []
+    quote = None
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if quote:
+            if char == quote:
+                quote = None
+            out.append(char)
+        elif char in ("'", '"', '`'):
+            quote = char
+            out.append(char)
+        elif char == '%' and query[i + 1:i + 2] == 's':
+            out.append('?')
+            i += 1
+        elif char == '%' and query[i + 1:i + 2] == '%':
+            out.append('%')
+            i += 1
+        else:
+            out.append(char)
+        i += 1
+    return ''.join(out)
+
+def list_tables(connection):
+    """Return the names of all tables in the current database"""
+    cursor = connection.cursor()
+    if connection.backend == 'sqlite':
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY name
+        """)
+    else:
+        cursor.execute("SHOW TABLES")
+    tables = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return tables
+
+def server_version(connection):
+    """Return the database server version string"""
+    if connection.backend == 'sqlite':
+        return f"SQLite {sqlite3.sqlite_version}"
+    cursor = connection.cursor()
+    cursor.execute("SELECT VERSION()")
+    version = cursor.fetchone()[0]
+    cursor.close()
+    return f"MySQL {version}"
+
+def current_database(connection, settings):
+    """Return the database name (MySQL) or file path (SQLite) in use"""
+    if connection.backend == 'sqlite':
+        return _setting(settings, 'SQLITE_PATH')
+    cursor = connection.cursor()
+    cursor.execute("SELECT DATABASE()")
+    name = cursor.fetchone()[0]
+    cursor.close()
+    return name
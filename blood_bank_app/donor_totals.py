@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Per-donor donation totals for Blood Bank Management System
+Donor.Total_Donations, Total_Blood_Donated and Last_Donation_Date are kept
+up to date by the approval and rejection routes; this module holds those
+incremental updates and a checker that recomputes them from Donation_All
+
+Usage:
+    python donor_totals.py              # report donors whose totals are wrong
+    python donor_totals.py --fix        # report and repair them
+"""
+
+import argparse
+import sys
+import time
+from decimal import Decimal
+
+import db
+import sharding
+from db import Error
+from config import Config
+
+CHUNK_SIZE = 1000
+CENTS = Decimal('0.01')
+
+def add_donation(cursor, donor_id, quantity, donation_date):
+    """Count a newly approved donation (caller commits)"""
+    cursor.execute("""
+        UPDATE Donor SET
+            Total_Donations = Total_Donations + 1,
+            Total_Blood_Donated = Total_Blood_Donated + %s,
+            Last_Donation_Date = GREATEST(COALESCE(Last_Donation_Date, %s), %s)
+        WHERE Donor_ID = %s
+    """, (quantity, donation_date, donation_date, donor_id))
+
+def remove_donation(cursor, donor_id, quantity):
+    """Uncount a donation whose approval was reversed (caller commits)
+
+    Run after the donation's status has changed: the latest date cannot be
+    decremented, so it is looked up again from the remaining donations.
+    """
+    cursor.execute("""
+        UPDATE Donor SET
+            Total_Donations = GREATEST(Total_Donations - 1, 0),
+            Total_Blood_Donated = GREATEST(Total_Blood_Donated - %s, 0),
+            Last_Donation_Date = (SELECT MAX(Date) FROM Donation_All
+                                  WHERE Donor_ID = %s AND Status = 'Approved')
+        WHERE Donor_ID = %s
+    """, (quantity, donor_id, donor_id))
+
+def _normalize(total_donations, total_blood, last_date):
+    # SQLite returns computed aggregates untyped; compare as text/Decimal
+    return (int(total_donations or 0), Decimal(str(total_blood or 0)).quantize(CENTS),
+            str(last_date) if last_date is not None else None)
+
+def check_chunk(connection, after_id, chunk_size=CHUNK_SIZE, fix=False):
+    """Check donors with Donor_ID > after_id; return (last_id, mismatches)
+
+    Stored and recomputed totals are read in one transaction with the
+    donor rows locked, so approvals running concurrently are never
+    reported as drift and a repair cannot overwrite them.
+    """
+    cursor = connection.cursor()
+    connection.begin()
+    try:
+        cursor.execute("""
+            SELECT Donor_ID, Total_Donations, Total_Blood_Donated, Last_Donation_Date
+            FROM Donor WHERE Donor_ID > %s
+            ORDER BY Donor_ID
+            LIMIT %s
+            FOR UPDATE
+        """, (after_id, chunk_size))
+        stored = {row[0]: _normalize(*row[1:]) for row in cursor.fetchall()}
+        if not stored:
+            connection.commit()
+            return None, []
+        first_id, last_id = min(stored), max(stored)
+
+        cursor.execute("""
+            SELECT Donor_ID, COUNT(*), SUM(Quantity), MAX(Date)
+            FROM Donation_All
+            WHERE Donor_ID BETWEEN %s AND %s AND Status = 'Approved'
+            GROUP BY Donor_ID
+        """, (first_id, last_id))
+        actual = {row[0]: _normalize(*row[1:]) for row in cursor.fetchall()}
+
+        empty = _normalize(0, 0, None)
+        mismatches = [(donor_id, values, actual.get(donor_id, empty))
+                      for donor_id, values in stored.items()
+                      if values != actual.get(donor_id, empty)]
+        if fix and mismatches:
+            cursor.executemany("""
+                UPDATE Donor SET Total_Donations = %s, Total_Blood_Donated = %s,
+                                 Last_Donation_Date = %s
+                WHERE Donor_ID = %s
+            """, [expected + (donor_id,) for donor_id, _, expected in mismatches])
+        connection.commit()
+        return last_id, mismatches
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def verify(connection, chunk_size=CHUNK_SIZE, fix=False, start_after=0, verbose=True):
+    """Check every donor's totals in Donor_ID chunks; return the mismatches"""
+    mismatches = []
+    checked_to = start_after
+    while True:
+        checked_to, found = check_chunk(connection, checked_to, chunk_size, fix)
+        if checked_to is None:
+            break
+        mismatches.extend(found)
+        if verbose:
+            for donor_id, stored, expected in found:
+                print(f"   Donor {donor_id}: stored {stored}, expected {expected}")
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check per-donor donation totals against Donation_All')
+    parser.add_argument('--fix', action='store_true', help='repair donors whose totals differ')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='donors checked per transaction')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    mismatched = []
+    def verify_site(connection, settings):
+        started = time.perf_counter()
+        mismatches = verify(connection, args.chunk_size, args.fix)
+        mismatched.extend(mismatches)
+        action = 'repaired' if args.fix else 'found'
+        print(f"{len(mismatches)} mismatched donor(s) {action} in {time.perf_counter() - started:.1f}s")
+
+    status = sharding.run_on_sites(sites, verify_site, 'Verification failed')
+    return status or (0 if args.fix or not mismatched else 2)
+
+if __name__ == "__main__":
+    sys.exit(main())
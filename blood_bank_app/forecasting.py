@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Demand forecasting for Blood Bank Management System
+Fits a day-of-week seasonal exponential smoothing model to the daily
+quantity requested by every hospital for every blood group - and to the
+totals per blood group - in one NumPy batch, and stores the 7/30-day
+forecasts in Demand_Forecast for the dashboard and API
+
+Usage:
+    python forecasting.py            # refresh forecasts (run nightly from cron)
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+import sharding
+from db import Error
+from config import Config
+
+BLOOD_GROUPS = ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-']
+ALL_HOSPITALS = 0
+
+# Smoothing constants tried for every series; the best one-step-ahead fit wins
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5])
+# Days used to initialise the level before errors are scored
+WARMUP_DAYS = 14
+# Weekday factors are shrunk toward 1 as if this many average weeks were seen
+SEASONAL_PRIOR_WEEKS = 4
+HORIZON_DAYS = 30
+
+def _as_date(value):
+    # Columns read through the Request_All view come back from SQLite as text
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def load_history(cursor, start, end):
+    """Return (keys, demand) with demand[i, t] the quantity requested for
+    series keys[i] = (hospital_id, blood_group) on day start + t"""
+    days = (end - start).days
+    cursor.execute("""
+        SELECT Hospital_ID, Blood_Group, Date, SUM(Quantity)
+        FROM Request_All
+        WHERE Date >= %s AND Date < %s
+        GROUP BY Hospital_ID, Blood_Group, Date
+    """, (start, end))
+    rows = cursor.fetchall()
+    if not rows:
+        return [], np.zeros((0, days))
+
+    group_index = {group: index for index, group in enumerate(BLOOD_GROUPS)}
+    codes = np.array([row[0] * len(BLOOD_GROUPS) + group_index[row[1]] for row in rows])
+    offsets = np.array([(_as_date(row[2]) - start).days for row in rows])
+    quantities = np.array([float(row[3]) for row in rows])
+
+    unique_codes, series = np.unique(codes, return_inverse=True)
+    demand = np.zeros((len(unique_codes), days))
+    np.add.at(demand, (series, offsets), quantities)
+    keys = [(int(code) // len(BLOOD_GROUPS), BLOOD_GROUPS[int(code) % len(BLOOD_GROUPS)])
+            for code in unique_codes]
+    return keys, demand
+
+def group_totals(keys, demand):
+    """Sum hospital series into one series per blood group (all eight)"""
+    totals = np.zeros((len(BLOOD_GROUPS), demand.shape[1]))
+    if keys:
+        rows = np.array([BLOOD_GROUPS.index(group) for _, group in keys])
+        np.add.at(totals, rows, demand)
+    return [(ALL_HOSPITALS, group) for group in BLOOD_GROUPS], totals
+
+def fit(demand, weekdays):
+    """Fit all series at once; return (level, std, alpha, factors)
+
+    demand is (series x days) and weekdays gives each day's weekday. The
+    loop runs once per day of history, never per series: every step
+    updates all series and all candidate alphas together.
+    """
+    count, days = demand.shape
+    mean = demand.mean(axis=1)
+
+    # Multiplicative day-of-week factors, normalised to average 1
+    onehot = (weekdays[None, :] == np.arange(7)[:, None]).astype(float)
+    sums = demand @ onehot.T
+    seen = onehot.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factors = ((sums + SEASONAL_PRIOR_WEEKS * mean[:, None])
+                   / ((seen + SEASONAL_PRIOR_WEEKS)[None, :] * mean[:, None]))
+    factors = np.where(mean[:, None] > 0, factors, 1.0)
+    factors /= factors.mean(axis=1, keepdims=True)
+    deseasonalized = demand / factors[:, weekdays]
+
+    # Simple exponential smoothing of the deseasonalised level per alpha
+    warmup = min(WARMUP_DAYS, days)
+    initial = deseasonalized[:, :warmup].mean(axis=1) if warmup else np.zeros(count)
+    level = np.repeat(initial[:, None], len(ALPHAS), axis=1)
+    squared_error = np.zeros_like(level)
+    for day in range(warmup, days):
+        error = deseasonalized[:, day, None] - level
+        squared_error += error * error
+        level += ALPHAS * error
+
+    best = squared_error.argmin(axis=1)
+    rows = np.arange(count)
+    std = np.sqrt(squared_error[rows, best] / max(days - warmup, 1))
+    return level[rows, best], std, ALPHAS[best], factors
+
+def project(level, factors, first_weekday, horizon=HORIZON_DAYS):
+    """Daily forecasts (series x horizon) starting on first_weekday"""
+    weekdays = (first_weekday + np.arange(horizon)) % 7
+    return level[:, None] * factors[:, weekdays]
+
+def refresh(connection, settings=Config, today=None, verbose=False):
+    """Recompute and store all forecasts; return the number of series"""
+    today = today or date.today()
+    start = today - timedelta(days=settings.FORECAST_HISTORY_DAYS)
+    timings = {}
+    cursor = connection.cursor()
+    try:
+        started = time.perf_counter()
+        keys, demand = load_history(cursor, start, today)
+        total_keys, totals = group_totals(keys, demand)
+        keys, demand = keys + total_keys, np.vstack([demand, totals])
+        timings['load'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        weekdays = (start.weekday() + np.arange(demand.shape[1])) % 7
+        level, std, alpha, factors = fit(demand, weekdays)
+        daily = project(level, factors, today.weekday())
+        timings['fit'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cursor.execute("DELETE FROM Demand_Forecast")
+        cursor.executemany("""
+            INSERT INTO Demand_Forecast (Hospital_ID, Blood_Group, Daily_Level, Daily_Std,
+                                         Next_7_Days, Next_30_Days, Alpha)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, [(hospital_id, group, round(float(level[i]), 2), round(float(std[i]), 2),
+               round(float(daily[i, :7].sum()), 2), round(float(daily[i].sum()), 2), float(alpha[i]))
+              for i, (hospital_id, group) in enumerate(keys)])
+        cursor.execute("DELETE FROM Demand_Forecast_Daily")
+        first_total = len(keys) - len(total_keys)
+        cursor.executemany("""
+            INSERT INTO Demand_Forecast_Daily (Blood_Group, Forecast_Date, Quantity)
+            VALUES (%s, %s, %s)
+        """, [(group, today + timedelta(days=offset), round(float(daily[first_total + i, offset]), 2))
+              for i, (_, group) in enumerate(total_keys)
+              for offset in range(daily.shape[1])])
+        connection.commit()
+        timings['store'] = time.perf_counter() - started
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    if verbose:
+        print(f"   {len(keys) - len(total_keys):,} hospital series + {len(total_keys)} totals, "
+              f"{demand.shape[1]} days of history")
+        print("   " + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items()))
+    return len(keys)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh demand forecasts per hospital and blood group')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return sharding.run_on_sites(sites, lambda connection, settings: refresh(connection, settings, verbose=True),
+                                 'Forecast refresh failed')
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Template fragment cache for Blood Bank Management System
+A Jinja extension that renders the body of
+
+    {% cache 'inventory', blood_inventory %} ... {% endcache %}
+
+once per distinct value of the expressions after the name - the data the
+fragment shows, or a version of it - and reuses the HTML across users and
+requests. Entries live in a size-bounded LRU with hit/miss counters.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+class FragmentCache:
+    """Thread-safe LRU of rendered fragments, bounded by total size
+
+    Sizes are string lengths, which is the memory CPython uses for the
+    ASCII markup of the templates, give or take the object overhead.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        with self.lock:
+            fragment = self.entries.get(key)
+            if fragment is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        # Rendered outside the lock; two threads missing together both render
+        fragment = render()
+        if len(fragment) <= self.max_bytes:
+            with self.lock:
+                if key not in self.entries:
+                    self.entries[key] = fragment
+                    self.size += len(fragment)
+                while self.size > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.size -= len(evicted)
+                    self.evictions += 1
+        return fragment
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+def fragment_key(template, name, versions):
+    """Cache key from the fragment's place and the repr of its versions
+
+    Database rows are tuples of str, Decimal, date and datetime, whose
+    reprs are stable, so the rows themselves can serve as the version.
+    """
+    digest = hashlib.sha1(repr(versions).encode('utf-8')).hexdigest()
+    return f"{template}:{name}:{digest}"
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache name[, version, ...] %}...{% endcache %}
+
+    The cache is environment.fragment_cache; replace it to change the bound.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        versions = []
+        while parser.stream.skip_if('comma'):
+            versions.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render', [nodes.Const(parser.name), name, nodes.List(versions)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, template, name, versions, caller):
+        return self.environment.fragment_cache.get_or_render(
+            fragment_key(template, name, versions), caller)
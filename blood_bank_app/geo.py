@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Proximity search for Blood Bank Management System
+Donor addresses and hospital locations are free text. They get coordinates
+from the Geo_Place lookup table (see geocoding.py). Donors are geocoded when
+they register; the --geocode run fills in rows added before.
+
+Each process keeps an in-memory grid of geocoded donors, sorted by cell,
+and answers "k nearest donors" by searching squares of cells, doubling in
+size, around the hospital. New donors are appended every
+GEO_INDEX_REFRESH_SECONDS and the grid is rebuilt every
+GEO_INDEX_REBUILD_SECONDS. Candidates are checked against the database, so
+a donor who has since donated or been deactivated is never listed.
+
+Usage:
+    python geo.py --load-places database/places.csv
+    python geo.py --geocode                 # coordinates for rows that have none
+    python geo.py --nearest 12 O- -k 10     # nearest eligible donors to hospital 12
+"""
+
+import argparse
+import math
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+from db import Error
+from config import Config
+from geocoding import geocode, geocode_missing, load_places
+
+EARTH_RADIUS_KM = 6371.0
+BLOOD_GROUP_CODES = {group: code for code, group in enumerate(Config.BLOOD_GROUP_COMPATIBILITY)}
+# Donors read per query when building the grid
+PAGE_SIZE = 50000
+# Appended donors are scanned one by one until this many are merged into the grid
+MERGE_SIZE = 10000
+# Nearest candidates fetched per eligibility check, as a multiple of k
+OVERSAMPLE = 2
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances in km from one point to arrays of points (degrees)"""
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    phis, lams = np.radians(latitudes), np.radians(longitudes)
+    a = (np.sin((phis - phi) / 2) ** 2
+         + math.cos(phi) * np.cos(phis) * np.sin((lams - lam) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class DonorIndex:
+    """Grid of donor coordinates of one database, for nearest-donor queries"""
+
+    def __init__(self, settings=Config):
+        self.cell = float(db._setting(settings, 'GEO_CELL_DEGREES', 0.05))
+        self.refresh_seconds = float(db._setting(settings, 'GEO_INDEX_REFRESH_SECONDS', 10))
+        self.rebuild_seconds = float(db._setting(settings, 'GEO_INDEX_REBUILD_SECONDS', 3600))
+        self.rows = int(math.ceil(180 / self.cell))
+        self.columns = int(math.ceil(360 / self.cell))
+        self.built_at = self.refreshed_at = float('-inf')
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self._set_grid(*self._empty())
+        self.pending = self._empty()
+
+    @staticmethod
+    def _empty():
+        return (np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int8))
+
+    def _keys(self, latitudes, longitudes):
+        rows = np.clip(((latitudes + 90) // self.cell).astype(np.int64), 0, self.rows - 1)
+        columns = ((longitudes + 180) // self.cell).astype(np.int64) % self.columns
+        return rows * self.columns + columns
+
+    def _set_grid(self, ids, latitudes, longitudes, groups):
+        keys = self._keys(latitudes, longitudes)
+        order = np.argsort(keys, kind='stable')
+        rows, columns = keys // self.columns, keys % self.columns
+        # Occupied rows and columns, so a search stops once it has covered them
+        extent = ((int(rows.min()), int(rows.max()), int(columns.min()), int(columns.max()))
+                  if len(keys) else None)
+        # Swapped in one assignment; queries running meanwhile keep the old grid
+        self.grid = (keys[order], ids[order], latitudes[order], longitudes[order], groups[order], extent)
+
+    def _read(self, cursor, after_id):
+        """Geocoded donors with Donor_ID > after_id, as arrays
+
+        Deactivated donors are left to the eligibility check; filtering them
+        here would walk the Is_Active index instead of the primary key.
+        """
+        parts = []
+        while True:
+            cursor.execute("""
+                SELECT Donor_ID, Latitude, Longitude, Blood_Group FROM Donor
+                WHERE Donor_ID > %s AND Latitude IS NOT NULL
+                ORDER BY Donor_ID
+                LIMIT %s
+            """, (after_id, PAGE_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            parts.append((np.array(columns[0], dtype=np.int64),
+                          np.array(columns[1], dtype=float), np.array(columns[2], dtype=float),
+                          np.array([BLOOD_GROUP_CODES[group] for group in columns[3]], dtype=np.int8)))
+            after_id = rows[-1][0]
+        if not parts:
+            return self._empty()
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def refresh(self, cursor):
+        """Bring the grid up to date if it is due; cheap when it is not"""
+        now = time.monotonic()
+        if now - self.refreshed_at < self.refresh_seconds:
+            return
+        with self.lock:
+            if now - self.refreshed_at < self.refresh_seconds:
+                return
+            if now - self.built_at >= self.rebuild_seconds:
+                # Picks up donors geocoded or moved since the last build
+                donors = self._read(cursor, 0)
+                self._set_grid(*donors)
+                self.pending = self._empty()
+                self.built_at = now
+            else:
+                donors = self._read(cursor, self.last_id)
+                self.pending = tuple(np.concatenate(pair) for pair in zip(self.pending, donors))
+                if len(self.pending[0]) >= MERGE_SIZE:
+                    self._set_grid(*(np.concatenate(pair) for pair in zip(self.grid[1:5], self.pending)))
+                    self.pending = self._empty()
+            if len(donors[0]):
+                self.last_id = max(self.last_id, int(donors[0][-1]))
+            self.refreshed_at = now
+
+    def __len__(self):
+        return len(self.grid[1]) + len(self.pending[0])
+
+    def _positions(self, keys, row, column, inner, outer):
+        """Positions in keys of the cells more than inner and at most outer cells from (row, column)"""
+        side = 2 * outer + 1
+        if side * side > len(keys) or side >= self.columns:
+            # More cells than donors: measure each donor's cell distance instead
+            d_rows = np.abs(keys // self.columns - row)
+            d_columns = np.abs(keys % self.columns - column)
+            distance = np.maximum(d_rows, np.minimum(d_columns, self.columns - d_columns))
+            return np.nonzero((distance > inner) & (distance <= outer))[0]
+        offsets = np.arange(-outer, outer + 1)
+        d_rows, d_columns = np.meshgrid(offsets, offsets, indexing='ij')
+        ring = np.maximum(np.abs(d_rows), np.abs(d_columns)) > inner
+        rows, columns = row + d_rows[ring], column + d_columns[ring]
+        inside = (rows >= 0) & (rows < self.rows)
+        cells = np.sort(rows[inside] * self.columns + columns[inside] % self.columns)
+        starts = np.searchsorted(keys, cells, side='left')
+        lengths = np.searchsorted(keys, cells, side='right') - starts
+        # Every position in those cells, without a loop over cells
+        return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    def nearest(self, latitude, longitude, blood_groups, k, max_km=None, exclude=()):
+        """(donor_ids, distances_km) of the k nearest donors of blood_groups, nearest first
+
+        Squares of cells around the point, doubling in size, are searched
+        until no cell outside them can hold a donor nearer than the k-th
+        found so far.
+        """
+        wanted = np.zeros(len(BLOOD_GROUP_CODES), dtype=bool)
+        wanted[[BLOOD_GROUP_CODES[group] for group in blood_groups]] = True
+        limit = max_km if max_km is not None else math.inf
+        skip = np.array(sorted(exclude), dtype=np.int64)
+
+        def matches(ids, groups):
+            return wanted[groups] & ~np.isin(ids, skip)
+
+        keys, grid_ids, grid_latitudes, grid_longitudes, grid_groups, extent = self.grid
+        # Appended donors are few; look at all of them
+        ids, latitudes, longitudes, groups = self.pending
+        mask = matches(ids, groups)
+        best_ids = ids[mask]
+        best_distances = haversine_km(latitude, longitude, latitudes[mask], longitudes[mask])
+
+        row = min(int((latitude + 90) // self.cell), self.rows - 1)
+        column = int((longitude + 180) // self.cell) % self.columns
+        cos_latitude = math.cos(math.radians(latitude))
+        inner, outer = -1, 0
+        while extent is not None:
+            index = self._positions(keys, row, column, inner, outer)
+            if len(index):
+                index = index[matches(grid_ids[index], grid_groups[index])]
+                best_ids = np.concatenate([best_ids, grid_ids[index]])
+                best_distances = np.concatenate([best_distances, haversine_km(
+                    latitude, longitude, grid_latitudes[index], grid_longitudes[index])])
+                order = np.lexsort((best_ids, best_distances))[:k]
+                best_ids, best_distances = best_ids[order], best_distances[order]
+            # A donor outside the square is at least outer cells away in
+            # latitude or in longitude
+            reach = math.radians(min(outer * self.cell, 90))
+            bound = EARTH_RADIUS_KM * min(reach, math.asin(min(1.0, cos_latitude * math.sin(reach))))
+            min_row, max_row, min_column, max_column = extent
+            covered = (row - outer <= min_row and row + outer >= max_row
+                       and (2 * outer + 1 >= self.columns
+                            or (column - outer <= min_column and column + outer >= max_column)))
+            if covered or bound > limit or (len(best_ids) >= k and bound >= best_distances[k - 1]):
+                break
+            inner, outer = outer, max(1, 2 * outer)
+        order = np.lexsort((best_ids, best_distances))[:k]
+        best_ids, best_distances = best_ids[order], best_distances[order]
+        within = best_distances <= limit
+        return best_ids[within], best_distances[within]
+
+def nearest_eligible_donors(cursor, index, latitude, longitude, blood_group, k,
+                            max_km=None, settings=Config, today=None):
+    """The k nearest active donors who can give to blood_group and may donate today
+
+    Returns a list of (Donor_ID, Name, Blood_Group, Contact, distance_km).
+    """
+    today = today or date.today()
+    deferred_since = today - timedelta(days=int(db._setting(settings, 'DONATION_INTERVAL_DAYS', 56)))
+    # BLOOD_GROUP_COMPATIBILITY maps a recipient to the donor groups it accepts
+    groups = db._setting(settings, 'BLOOD_GROUP_COMPATIBILITY')[blood_group]
+    found, checked = [], set()
+    while len(found) < k:
+        ids, distances = index.nearest(latitude, longitude, groups, (k - len(found)) * OVERSAMPLE,
+                                       max_km, exclude=checked)
+        if not len(ids):
+            break
+        checked.update(int(donor_id) for donor_id in ids)
+        # Looked up by primary key alone and filtered here: with the other
+        # conditions in the WHERE clause SQLite may walk the Is_Active index
+        cursor.execute(f"""
+            SELECT Donor_ID, Name, Blood_Group, Contact, Is_Active, Last_Donation_Date FROM Donor
+            WHERE Donor_ID IN ({', '.join(['%s'] * len(ids))})
+        """, [int(donor_id) for donor_id in ids])
+        eligible = {row[0]: row[:4] for row in cursor.fetchall()
+                    if row[4] and row[2] in groups and (row[5] is None or row[5] <= deferred_since)}
+        for donor_id, distance in zip(ids, distances):
+            if int(donor_id) in eligible and len(found) < k:
+                found.append(eligible[int(donor_id)] + (round(float(distance), 3),))
+    return found
+
+def hospital_point(cursor, hospital_id):
+    """(latitude, longitude) of a hospital, geocoding its location if needed
+
+    Returns None for an unknown hospital and (None, None) when its location
+    matches no place.
+    """
+    cursor.execute("SELECT Latitude, Longitude, Location FROM Hospital WHERE Hospital_ID = %s", (hospital_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if row[0] is not None:
+        return float(row[0]), float(row[1])
+    return geocode(cursor, row[2])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Geocoding and nearest-donor search')
+    parser.add_argument('--load-places', metavar='CSV', help='add places from a name,latitude,longitude file')
+    parser.add_argument('--geocode', action='store_true', help='set coordinates on donors and hospitals that have none')
+    parser.add_argument('--nearest', nargs=2, metavar=('HOSPITAL_ID', 'BLOOD_GROUP'),
+                        help='list the nearest eligible donors for a hospital')
+    parser.add_argument('-k', type=int, default=10, help='donors to list with --nearest')
+    parser.add_argument('--max-km', type=float, help='search radius with --nearest')
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        if args.load_places:
+            print(f"Loaded {load_places(connection, args.load_places):,} places from {args.load_places}")
+        if args.geocode:
+            for table, id_column, text_column in (('Donor', 'Donor_ID', 'Address'),
+                                                  ('Hospital', 'Hospital_ID', 'Location')):
+                started = time.perf_counter()
+                located, missing = geocode_missing(connection, table, id_column, text_column)
+                print(f"   {table}: {located:,} located, {missing:,} with no matching place "
+                      f"({time.perf_counter() - started:.2f}s)")
+        if args.nearest:
+            hospital_id, blood_group = int(args.nearest[0]), args.nearest[1]
+            if blood_group not in BLOOD_GROUP_CODES:
+                print(f"Unknown blood group {blood_group}")
+                return 1
+            cursor = connection.cursor()
+            point = hospital_point(cursor, hospital_id)
+            if point is None or point[0] is None:
+                print(f"Hospital {hospital_id} {'does not exist' if point is None else 'has no coordinates'}")
+                return 1
+            index = DonorIndex(Config)
+            started = time.perf_counter()
+            index.refresh(cursor)
+            built = time.perf_counter() - started
+            started = time.perf_counter()
+            donors = nearest_eligible_donors(cursor, index, point[0], point[1], blood_group, args.k, args.max_km)
+            searched = time.perf_counter() - started
+            cursor.close()
+            for donor_id, name, group, contact, distance in donors:
+                print(f"   {distance:>8.2f} km  {donor_id:>8}  {group:<4} {name:<30} {contact}")
+            print(f"{len(donors)} donor(s); grid of {len(index):,} donors built in {built:.2f}s, "
+                  f"searched in {searched * 1000:.1f} ms")
+    except Error as e:
+        print(f"Database error: {e}")
+        return 1
+    finally:
+        connection.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
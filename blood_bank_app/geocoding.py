@@ -0,0 +1,90 @@
+"""
+Geocoding for Blood Bank Management System
+Donor addresses and hospital locations are free text. They get coordinates
+from the Geo_Place lookup table - place names or postcodes as they appear
+in addresses, loaded from a CSV of name,latitude,longitude - so geocoding
+never leaves the database. Apart from geo.py, and free of numpy, so that
+registering a donor does not load the nearest-donor search; places are
+loaded and old rows geocoded with python geo.py --load-places / --geocode.
+"""
+
+import csv
+import re
+
+_NOT_WORD = re.compile(r'[^a-z0-9]+')
+
+def place_key(text):
+    """Lookup key of a place name: lower case words separated by single spaces"""
+    return _NOT_WORD.sub(' ', (text or '').lower()).strip()
+
+def address_keys(address):
+    """Keys to try for an address, most specific place first
+
+    Addresses are written street first, so comma-separated parts are tried
+    from the end, then the whole address.
+    """
+    keys = [place_key(part) for part in reversed((address or '').split(','))]
+    keys.append(place_key(address))
+    return [key for i, key in enumerate(keys) if key and key not in keys[:i]]
+
+def load_places(connection, path):
+    """Add or update the places in a name,latitude,longitude CSV; return the count"""
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or row[0].startswith('#') or row[0].strip().lower() == 'name':
+                continue
+            rows.append((place_key(row[0]), row[0].strip(), float(row[1]), float(row[2])))
+    cursor = connection.cursor()
+    cursor.executemany("""
+        INSERT INTO Geo_Place (Place_Key, Place_Name, Latitude, Longitude)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE Place_Name = VALUES(Place_Name),
+            Latitude = VALUES(Latitude), Longitude = VALUES(Longitude)
+    """, rows)
+    connection.commit()
+    cursor.close()
+    return len(rows)
+
+def geocode(cursor, address):
+    """(latitude, longitude) of an address, or (None, None) if no place matches"""
+    keys = address_keys(address)
+    if not keys:
+        return None, None
+    cursor.execute(f"""
+        SELECT Place_Key, Latitude, Longitude FROM Geo_Place
+        WHERE Place_Key IN ({', '.join(['%s'] * len(keys))})
+    """, keys)
+    found = {key: (float(latitude), float(longitude)) for key, latitude, longitude in cursor.fetchall()}
+    return next((found[key] for key in keys if key in found), (None, None))
+
+def geocode_missing(connection, table, id_column, text_column, batch_size=5000):
+    """Set coordinates on every row of table that has none; return (located, not found)"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT Place_Key, Latitude, Longitude FROM Geo_Place")
+    places = {key: (float(latitude), float(longitude)) for key, latitude, longitude in cursor.fetchall()}
+    located = missing = 0
+    after_id = 0
+    while True:
+        cursor.execute(f"""
+            SELECT {id_column}, {text_column} FROM {table}
+            WHERE Latitude IS NULL AND {id_column} > %s
+            ORDER BY {id_column}
+            LIMIT %s
+        """, (after_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        updates = []
+        for row_id, text in rows:
+            point = next((places[key] for key in address_keys(text) if key in places), None)
+            if point:
+                updates.append(point + (row_id,))
+        if updates:
+            cursor.executemany(f"UPDATE {table} SET Latitude = %s, Longitude = %s WHERE {id_column} = %s", updates)
+            connection.commit()
+        located += len(updates)
+        missing += len(rows) - len(updates)
+        after_id = rows[-1][0]
+    cursor.close()
+    return located, missing
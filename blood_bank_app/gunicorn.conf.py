@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for Blood Bank Management System
+The master imports and preloads the app once (templates compiled, static
+files hashed and compressed, lazy modules imported) and forks the workers,
+which share that memory copy-on-write. Each worker then creates its own
+connection pool, rate limiter and admission slots.
+
+Usage:
+    gunicorn app:app                       # picks this file up from the cwd
+    WEB_CONCURRENCY=8 gunicorn app:app
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND') or '0.0.0.0:5000'
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 1)
+preload_app = True
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before any worker is forked"""
+    if not server.cfg.preload_app:
+        return
+    import app
+    app.preload(server.app.wsgi())
+
+def post_fork(server, worker):
+    """Replace the per-process resources the worker inherited from the master"""
+    if not server.cfg.preload_app:
+        return
+    import app
+    app.init_process(server.app.wsgi())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Idempotency keys for Blood Bank Management System
+A POST carrying an Idempotency-Key header is executed once per key: the key
+is claimed in the same transaction as the insert it protects, and retries
+get the stored response back. Recent responses are kept in an in-process
+LRU so replays usually skip the database entirely.
+
+Usage:
+    python idempotency.py --purge        # delete expired keys (run from cron)
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import db
+import sharding
+from db import Error, IntegrityError
+from config import Config
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 100
+
+StoredResponse = namedtuple('StoredResponse', ['fingerprint', 'status_code', 'body', 'expires_at'])
+
+class Conflict(Exception):
+    """The key was claimed by another request that committed first"""
+
+def fingerprint(method, path, form):
+    """Hash of the request, so a key reused for a different request is caught"""
+    items = sorted((key, value) for key in form for value in form.getlist(key))
+    payload = json.dumps([method, path, items], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Thread-safe LRU of StoredResponse keyed by (scope, key)"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self.lock:
+            stored = self.entries.get(cache_key)
+            if stored is None:
+                return None
+            if stored.expires_at <= time.time():
+                del self.entries[cache_key]
+                return None
+            self.entries.move_to_end(cache_key)
+            return stored
+
+    def put(self, cache_key, stored):
+        with self.lock:
+            self.entries[cache_key] = stored
+            self.entries.move_to_end(cache_key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+
+class IdempotencyStore:
+    """Idempotency_Key rows fronted by a ResponseCache
+
+    Expiry is stored as epoch seconds so it never depends on the database
+    or session time zone.
+    """
+
+    def __init__(self, settings=Config):
+        self.ttl = settings.IDEMPOTENCY_TTL_HOURS * 3600
+        self.cache = ResponseCache(settings.IDEMPOTENCY_CACHE_SIZE)
+
+    def lookup(self, connection, scope, key):
+        """Return the StoredResponse for a key, or None if it is unused or expired"""
+        stored = self.cache.get((scope, key))
+        if stored is not None:
+            return stored
+        cursor = connection.cursor()
+        try:
+            cursor.execute("""
+                SELECT Fingerprint, Status_Code, Response_Body, Expires_At
+                FROM Idempotency_Key WHERE Scope = %s AND Idem_Key = %s
+            """, (scope, key))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            if row[3] <= time.time():
+                # Free the key so claim() can insert it again
+                cursor.execute("""
+                    DELETE FROM Idempotency_Key
+                    WHERE Scope = %s AND Idem_Key = %s AND Expires_At <= %s
+                """, (scope, key, int(time.time())))
+                connection.commit()
+                return None
+            stored = StoredResponse(row[0], row[1], json.loads(row[2]), row[3])
+            self.cache.put((scope, key), stored)
+            return stored
+        finally:
+            cursor.close()
+
+    def claim(self, cursor, scope, key, request_fingerprint):
+        """Reserve a key as the first write of the caller's transaction
+
+        A concurrent request holding the same key makes this wait for it to
+        finish and then raises Conflict, before anything else was written.
+        Returns the key's expiry, for save().
+        """
+        expires_at = int(time.time()) + self.ttl
+        try:
+            cursor.execute("""
+                INSERT INTO Idempotency_Key (Scope, Idem_Key, Fingerprint, Expires_At)
+                VALUES (%s, %s, %s, %s)
+            """, (scope, key, request_fingerprint, expires_at))
+        except IntegrityError as e:
+            raise Conflict(key) from e
+        return expires_at
+
+    def save(self, cursor, scope, key, request_fingerprint, status_code, body, expires_at):
+        """Store the response for a claimed key (caller commits); returns it for remember()"""
+        cursor.execute("""
+            UPDATE Idempotency_Key SET Status_Code = %s, Response_Body = %s
+            WHERE Scope = %s AND Idem_Key = %s
+        """, (status_code, json.dumps(body, separators=(',', ':')), scope, key))
+        return StoredResponse(request_fingerprint, status_code, body, expires_at)
+
+    def remember(self, scope, key, stored):
+        """Cache a saved response once its transaction has committed"""
+        self.cache.put((scope, key), stored)
+
+def purge(connection):
+    """Delete expired keys; return how many"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM Idempotency_Key WHERE Expires_At <= %s", (int(time.time()),))
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Maintain stored idempotency keys')
+    parser.add_argument('--purge', action='store_true', help='delete expired keys')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    if not args.purge:
+        parser.print_help()
+        return 0
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    return sharding.run_on_sites(
+        sites, lambda connection, settings: print(f"{purge(connection):,} expired key(s) deleted"),
+        'Purge failed')
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Index advisor for Blood Bank Management System
+Drives the application's read routes through the Flask test client, captures
+the SQL they execute, runs EXPLAIN on each statement and proposes composite
+(and where possible covering) indexes that match the real access patterns
+
+Usage:
+    python index_advisor.py                       # report against the configured DB
+    python index_advisor.py --write-migration database/migrations/0002_route_indexes.sql
+"""
+
+import argparse
+import re
+import sys
+from collections import OrderedDict, namedtuple
+
+import db
+from db import Error
+
+# Routes replayed for each role; admins are logged in through the session
+# because the advisor does not know the admin password
+ROUTES = [
+    ('donor', '/dashboard_donor'),
+    ('hospital', '/dashboard_hospital'),
+    ('hospital', '/request_blood'),
+    ('admin', '/dashboard_admin'),
+    ('admin', '/donor_list'),
+]
+
+# Covering columns are only added for aggregates, which read every matching
+# row; row lookups and LIMITed lists touch few rows after the index seek
+UNCOVERABLE_TYPES = ('text', 'blob', 'json')
+_AGGREGATE = re.compile(r'\b(COUNT|SUM|AVG|MIN|MAX)\s*\(|\bGROUP BY\b', re.I)
+# Tables smaller than this are cheaper to scan than to index
+MIN_TABLE_ROWS = 1000
+# A single-column index on a column with this few values is never selective
+MIN_DISTINCT_VALUES = 3
+
+CapturedStatement = namedtuple('CapturedStatement', ['sql', 'params', 'count'])
+Proposal = namedtuple('Proposal', ['table', 'columns', 'reason'])
+
+def normalize(sql):
+    """Collapse whitespace so identical statements compare equal"""
+    return ' '.join(sql.split())
+
+def capture_route_statements(flask_app, connection):
+    """Replay ROUTES plus the login lookups and return the distinct statements"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT Donor_ID, Name, Contact FROM Donor ORDER BY Donor_ID LIMIT 1")
+    donor = cursor.fetchone()
+    cursor.execute("SELECT Hospital_ID, Name, Contact FROM Hospital ORDER BY Hospital_ID LIMIT 1")
+    hospital = cursor.fetchone()
+    cursor.execute("SELECT Admin_ID, Username FROM Admin ORDER BY Admin_ID LIMIT 1")
+    admin = cursor.fetchone()
+    cursor.close()
+    identities = {'donor': donor, 'hospital': hospital, 'admin': admin}
+
+    client = flask_app.test_client()
+    captured = db.start_capture()
+    try:
+        for role, user in identities.items():
+            if user:
+                client.post('/login', data={'username': user[-1], 'password': '', 'user_type': role})
+        for role, path in ROUTES:
+            user = identities[role]
+            if not user:
+                continue
+            with client.session_transaction() as session:
+                session['user_id'] = user[0]
+                session['username'] = user[1]
+                session['role'] = role
+            client.get(path)
+    finally:
+        db.stop_capture()
+
+    statements = OrderedDict()
+    for sql, params in captured:
+        key = normalize(sql)
+        if key in statements:
+            statements[key] = statements[key]._replace(count=statements[key].count + 1)
+        else:
+            statements[key] = CapturedStatement(key, params, 1)
+    return list(statements.values())
+
+def schema_info(connection):
+    """Describe columns, keys, indexes and row counts of every table
+
+    Returns {table: {'columns': {lower: (name, type)}, 'pk': [...],
+    'unique': [[...], ...], 'indexes': {name: [...]}, 'rows': n}}
+    """
+    cursor = connection.cursor()
+    schema = {}
+    if connection.backend == 'sqlite':
+        for table in db.list_tables(connection):
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = cursor.fetchall()
+            info = schema[table] = {
+                'columns': {name.lower(): (name, (kind or '').lower()) for _, name, kind, _, _, _ in columns},
+                'pk': [name for _, name, _, _, _, pk in sorted(columns, key=lambda c: c[5]) if pk],
+                'unique': [],
+                'indexes': {},
+            }
+            cursor.execute(f"PRAGMA index_list({table})")
+            for index in cursor.fetchall():
+                cursor.execute(f"PRAGMA index_info({index[1]})")
+                info['indexes'][index[1]] = [row[2] for row in cursor.fetchall()]
+                if index[2]:
+                    info['unique'].append(info['indexes'][index[1]])
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            info['rows'] = cursor.fetchone()[0]
+    else:
+        cursor.execute("""
+            SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_KEY
+            FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+        """)
+        for table, name, kind, key in cursor.fetchall():
+            info = schema.setdefault(table, {'columns': {}, 'pk': [], 'unique': [], 'indexes': {}, 'rows': 0})
+            info['columns'][name.lower()] = (name, kind.lower())
+            if key == 'PRI':
+                info['pk'].append(name)
+        cursor.execute("""
+            SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY'
+            ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+        """)
+        unique = {}
+        for table, index, column, non_unique in cursor.fetchall():
+            if table in schema:
+                schema[table]['indexes'].setdefault(index, []).append(column)
+                if not non_unique:
+                    unique.setdefault((table, index), schema[table]['indexes'][index])
+        for (table, _), columns in unique.items():
+            schema[table]['unique'].append(columns)
+        # Row estimates are enough to tell small tables from large ones
+        cursor.execute("""
+            SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        for table, rows in cursor.fetchall():
+            if table in schema:
+                schema[table]['rows'] = rows or 0
+    cursor.close()
+    return schema
+
+def explain(connection, sql, params):
+    """Return (plan lines, problems) for a SELECT statement"""
+    cursor = connection.cursor(dictionary=connection.backend == 'mysql')
+    if connection.backend == 'sqlite':
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        lines = [row[3] for row in cursor.fetchall()]
+        problems = [line for line in lines
+                    if (line.startswith('SCAN') and 'COVERING INDEX' not in line)
+                    or 'TEMP B-TREE' in line]
+    else:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        rows = cursor.fetchall()
+        lines = [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} "
+                 f"{row.get('Extra') or ''}".strip() for row in rows]
+        problems = [line for line, row in zip(lines, rows)
+                    if row['type'] == 'ALL' or 'filesort' in (row.get('Extra') or '')
+                    or 'temporary' in (row.get('Extra') or '')]
+    cursor.close()
+    return lines, problems
+
+_CLAUSE = re.compile(r'\b(SELECT|FROM|WHERE|GROUP BY|ORDER BY|LIMIT)\b', re.I)
+_TABLE_REF = re.compile(r'\b(FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|LEFT\b|RIGHT\b|INNER\b|JOIN\b|GROUP\b|ORDER\b|LIMIT\b)(\w+))?', re.I)
+_JOIN_ON = re.compile(r'\bJOIN\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?\s+ON\s+(.+?)(?=\b(?:LEFT|RIGHT|INNER)?\s*JOIN\b|\bWHERE\b|\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', re.I)
+_COLUMN_REF = re.compile(r'\b(?:(\w+)\.)?(\w+)\b')
+_COMPARISON = re.compile(r'^\(?\s*((?:\w+\.)?\w+)\s*(=|<=|>=|<|>|BETWEEN|LIKE|IN)\s*(.+?)\)?$', re.I)
+
+def analyze(sql, schema):
+    """Propose one index per table used by a simple SELECT statement"""
+    if not sql.upper().startswith('SELECT') or sql.upper().count('SELECT') > 1:
+        return []
+    lookup = {table.lower(): table for table in schema}
+    aliases = {}
+    driving = None
+    for keyword, table, alias in _TABLE_REF.findall(sql):
+        table = lookup.get(table.lower())
+        if not table:
+            continue
+        aliases[(alias or table).lower()] = table
+        aliases[table.lower()] = table
+        if keyword.upper() == 'FROM' and driving is None:
+            driving = table
+    if not driving:
+        return []
+
+    def resolve(token):
+        qualifier, name = token.split('.', 1) if '.' in token else (None, token)
+        candidates = [aliases[qualifier.lower()]] if qualifier and qualifier.lower() in aliases \
+            else sorted(set(aliases.values()))
+        for table in candidates:
+            column = schema[table]['columns'].get(name.lower())
+            if column:
+                return table, column[0]
+        return None
+
+    sections = _sections(sql)
+    equality = {table: [] for table in set(aliases.values())}
+    ranges = {table: [] for table in equality}
+    referenced = {table: [] for table in equality}
+
+    for qualifier, name in _COLUMN_REF.findall(sql):
+        resolved = resolve(f"{qualifier}.{name}" if qualifier else name)
+        if resolved and resolved[1] not in referenced[resolved[0]]:
+            referenced[resolved[0]].append(resolved[1])
+
+    predicates = [(None, part) for part in _split_and(sections.get('WHERE', ''))]
+    for table, alias, condition in _JOIN_ON.findall(sql):
+        inner = aliases.get((alias or table).lower())
+        predicates.extend((inner, part) for part in _split_and(condition))
+    for inner, predicate in predicates:
+        match = _COMPARISON.match(predicate.strip())
+        if not match:
+            continue
+        left, operator, right = match.groups()
+        left = resolve(left)
+        right = resolve(right.strip()) if re.fullmatch(r'(\w+\.)?\w+', right.strip()) else None
+        if left and right:
+            # Join condition: only the side being looked up needs an index
+            for table, column in (left, right):
+                if table == inner and column not in equality[table]:
+                    equality[table].append(column)
+        elif left and operator == '=':
+            if left[1] not in equality[left[0]]:
+                equality[left[0]].append(left[1])
+        elif left:
+            ranges[left[0]].append(left[1])
+
+    order = [resolve(token.split()[0]) for token in sections.get('ORDER BY', '').split(',') if token.strip()]
+    aggregate = bool(_AGGREGATE.search(sql))
+
+    proposals = []
+    for table in sorted(equality):
+        columns = list(equality[table])
+        reason = 'lookup'
+        if table == driving and order and all(item and item[0] == table for item in order):
+            columns += [column for _, column in order if column not in columns]
+            reason = 'lookup + sort' if equality[table] else 'sort'
+        elif ranges[table]:
+            columns.append(ranges[table][0])
+        if not columns or _is_point_lookup(schema[table], equality[table]):
+            continue
+        extras = [column for column in referenced[table]
+                  if column not in columns and column not in schema[table]['pk']]
+        coverable = not any(schema[table]['columns'][column.lower()][1].startswith(UNCOVERABLE_TYPES)
+                            for column in extras)
+        if extras and coverable and aggregate:
+            columns += extras
+            reason += ', covering'
+        proposals.append(Proposal(table, tuple(columns), reason))
+    return proposals
+
+def _is_point_lookup(info, columns):
+    """True when the equality columns include the primary key or a unique index"""
+    keys = [info['pk']] + info['unique']
+    return any(key and set(key) <= set(columns) for key in keys)
+
+def _sections(sql):
+    parts = _CLAUSE.split(sql)
+    sections = {}
+    for keyword, body in zip(parts[1::2], parts[2::2]):
+        sections.setdefault(' '.join(keyword.upper().split()), body.strip())
+    return sections
+
+def _split_and(condition):
+    return [part for part in re.split(r'\bAND\b', condition, flags=re.I) if part.strip()]
+
+def filter_proposals(proposals, schema, connection):
+    """Drop proposals already served by an index, by a longer proposal, on
+    tiny tables, or on a single low-cardinality column"""
+    unique = OrderedDict()
+    for proposal in proposals:
+        unique.setdefault((proposal.table, proposal.columns), proposal)
+    kept = []
+    for (table, columns), proposal in unique.items():
+        existing = list(schema[table]['indexes'].values())
+        longer = [other for (other_table, other), _ in unique.items()
+                  if other_table == table and len(other) > len(columns)]
+        if any(tuple(index[:len(columns)]) == columns for index in existing):
+            continue
+        if any(other[:len(columns)] == columns for other in longer):
+            continue
+        if schema[table]['rows'] < MIN_TABLE_ROWS:
+            continue
+        if len(columns) == 1 and _distinct_values(connection, table, columns[0]) < MIN_DISTINCT_VALUES:
+            continue
+        kept.append(proposal)
+    return kept
+
+def _distinct_values(connection, table, column):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(DISTINCT {column}) FROM {table}")
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count
+
+def index_name(proposal):
+    name = f"idx_{proposal.table}_{'_'.join(proposal.columns)}".lower()
+    return name[:64]
+
+def index_ddl(proposal):
+    return f"CREATE INDEX {index_name(proposal)} ON {proposal.table} ({', '.join(proposal.columns)})"
+
+def advise(flask_app, connection):
+    """Return (statement reports, merged proposals)"""
+    schema = schema_info(connection)
+    statements = capture_route_statements(flask_app, connection)
+    reports = []
+    proposals = []
+    for statement in statements:
+        if not statement.sql.upper().startswith('SELECT'):
+            continue
+        plan, problems = explain(connection, statement.sql, statement.params)
+        suggested = analyze(statement.sql, schema)
+        proposals.extend(suggested)
+        reports.append((statement, plan, problems, suggested))
+    return reports, filter_proposals(proposals, schema, connection)
+
+def print_report(reports, proposals):
+    for statement, plan, problems, suggested in reports:
+        marker = 'NEEDS INDEX' if problems else 'ok'
+        print(f"\n[{marker}] x{statement.count} {statement.sql[:110]}")
+        for line in plan:
+            print(f"      plan: {line}")
+        for proposal in suggested:
+            print(f"      want: {proposal.table}({', '.join(proposal.columns)})  [{proposal.reason}]")
+    print("\nProposed indexes:")
+    for proposal in proposals:
+        print(f"   {index_ddl(proposal)};  -- {proposal.reason}")
+    if not proposals:
+        print("   (none - existing indexes cover the captured queries)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Propose indexes for the queries the app runs')
+    parser.add_argument('--write-migration', metavar='PATH', help='write proposals as a migration file')
+    args = parser.parse_args(argv)
+
+    from app import app, get_db_connection
+
+    connection = get_db_connection()
+    if not connection:
+        return 1
+    try:
+        reports, proposals = advise(app, connection)
+    except Error as e:
+        print(f"Index advisor failed: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    print_report(reports, proposals)
+    if args.write_migration and proposals:
+        with open(args.write_migration, 'w', encoding='utf-8') as file:
+            file.write("-- Composite indexes proposed by index_advisor.py\n\n")
+            for proposal in proposals:
+                file.write(f"-- {proposal.reason}\n{index_ddl(proposal)};\n\n")
+        print(f"\nWrote {args.write_migration}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,20 @@
 #!/usr/bin/env python3
 """
 Database initialization script for Blood Bank Management System
-This script creates the database and imports the schema
+This script creates the database and applies the schema migrations
 """
 
-import mysql.connector
-from mysql.connector import Error
-import os
-from dotenv import load_dotenv
+import db
+import migrations
+from db import Error
+from config import Config
 
-# Load environment variables
-load_dotenv()
-
-def get_mysql_connection():
-    """Get MySQL connection without database"""
+def get_server_connection():
+    """Get MySQL connection without database, or the SQLite database file"""
     try:
-        connection = mysql.connector.connect(
-            host=os.getenv('MYSQL_HOST', 'localhost'),
-            user=os.getenv('MYSQL_USER', 'root'),
-            password=os.getenv('MYSQL_PASSWORD', ''),
-            port=int(os.getenv('MYSQL_PORT', 3306))
-        )
-        return connection
+        return db.connect(Config, use_database=False)
     except Error as e:
-        print(f"Error connecting to MySQL: {e}")
+        print(f"Error connecting to {Config.DB_BACKEND}: {e}")
         return None
 
 def create_database():
@@ -32,53 +23,30 @@ def create_database():
     print("Blood Bank Management System - Database Setup")
     print("=" * 60)
     
-    connection = get_mysql_connection()
+    connection = get_server_connection()
     if not connection:
-        print("\nFailed to connect to MySQL server")
+        print("\nFailed to connect to the database server")
         print("Please ensure MySQL is running and credentials are correct")
         return False
     
     try:
         cursor = connection.cursor()
-        database_name = os.getenv('MYSQL_DATABASE', 'blood_bank_db')
-        
-        print(f"\nCreating database '{database_name}'...")
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database_name}")
-        print(f"Database '{database_name}' created/verified")
-        
-        # Switch to the database
-        cursor.execute(f"USE {database_name}")
-        
-        # Read and execute schema
-        print("\nImporting database schema...")
-        with open('database/schema.sql', 'r', encoding='utf-8') as file:
-            schema = file.read()
-        
-        # Split by semicolon and execute each statement
-        statements = [stmt.strip() for stmt in schema.split(';') if stmt.strip()]
         
-        executed = 0
-        for statement in statements:
-            try:
-                # Skip empty statements
-                if not statement.strip():
-                    continue
-                
-                # Skip CREATE DATABASE and USE statements
-                if statement.upper().startswith('CREATE DATABASE'):
-                    continue
-                if statement.upper().startswith('USE'):
-                    continue
-                
-                # Execute the statement
-                cursor.execute(statement)
-                executed += 1
-            except Error as e:
-                print(f"Warning: {str(e)[:100]}")
-                continue
+        if connection.backend == 'sqlite':
+            print(f"\nUsing SQLite database '{Config.SQLITE_PATH}'")
+        else:
+            database_name = Config.MYSQL_DATABASE
+            print(f"\nCreating database '{database_name}'...")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database_name}")
+            print(f"Database '{database_name}' created/verified")
+            
+            # Switch to the database
+            cursor.execute(f"USE {database_name}")
         
-        connection.commit()
-        print(f"Imported {executed} schema statements")
+        # Apply schema.sql and any pending versioned migrations
+        print("\nApplying schema migrations...")
+        applied = migrations.migrate(connection)
+        print(f"Applied {applied} migration(s); schema is up to date")
         
         cursor.close()
         connection.close()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Inventory history rollups for Blood Bank Management System
+Downsamples Inventory_Ledger into minute, hour and day buckets per blood
+group (open/min/max/close, and how long stock was critical or low) so
+trend queries read a few hundred rollup rows instead of the ledger
+
+Usage:
+    python inventory_history.py          # roll up completed buckets (run from cron)
+"""
+
+import argparse
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import db
+import sharding
+from db import Error
+from config import Config
+
+# Fixed volume levels tracked in the rollups (the original blood_availability
+# thresholds; the consumption-based status lives in shortage.py)
+CRITICAL_LEVEL = 0
+LOW_LEVEL = 50
+
+RESOLUTIONS = ['minute', 'hour', 'day']
+STEPS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+# A ledger row is stamped when written but visible only after its
+# transaction commits, so the newest minute is left open this long
+SETTLE_TIME = timedelta(minutes=1)
+# Most buckets per blood group a trend query may return
+MAX_POINTS = 2000
+# Largest span of buckets rolled up per transaction
+WINDOWS = {
+    'minute': timedelta(hours=6),
+    'hour': timedelta(days=7),
+    'day': timedelta(days=366),
+}
+
+Bucket = namedtuple('Bucket', ['blood_group', 'start', 'open', 'low', 'high', 'close',
+                               'net_change', 'changes', 'seconds_critical', 'seconds_low'])
+
+def floor_time(value, resolution):
+    """Truncate a datetime to the start of its bucket"""
+    if resolution == 'minute':
+        return value.replace(second=0, microsecond=0)
+    if resolution == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _as_datetime(value):
+    # Expressions such as NOW() come back from SQLite as text
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def database_now(cursor):
+    """Ledger timestamps use the database clock, so rollups do too"""
+    cursor.execute("SELECT NOW()")
+    return _as_datetime(cursor.fetchone()[0])
+
+def get_watermark(cursor, resolution):
+    """Return the end of the last rolled-up bucket, or where to start"""
+    cursor.execute("SELECT Rolled_Up_To FROM Inventory_Rollup_State WHERE Resolution = %s",
+                   (resolution,))
+    row = cursor.fetchone()
+    if row:
+        return _as_datetime(row[0])
+    cursor.execute("SELECT MIN(Created_At) FROM Inventory_Ledger")
+    first = cursor.fetchone()[0]
+    return floor_time(_as_datetime(first), resolution) if first is not None else None
+
+def _set_watermark(cursor, resolution, value):
+    cursor.execute("""
+        INSERT INTO Inventory_Rollup_State (Resolution, Rolled_Up_To) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE Rolled_Up_To = VALUES(Rolled_Up_To)
+    """, (resolution, value))
+
+def _seconds_at(level, seconds):
+    """Split a stretch of time at one stock level into (critical, low) seconds"""
+    if level is None:
+        return 0, 0
+    if level <= CRITICAL_LEVEL:
+        return seconds, seconds
+    if level < LOW_LEVEL:
+        return 0, seconds
+    return 0, 0
+
+def minute_buckets(cursor, start, end):
+    """Build minute buckets for [start, end) from the ledger"""
+    cursor.execute("SELECT Blood_Group FROM Blood_Inventory")
+    balances = {}
+    for (group,) in cursor.fetchall():
+        cursor.execute("""
+            SELECT Balance FROM Inventory_Ledger
+            WHERE Blood_Group = %s AND Created_At < %s
+            ORDER BY Created_At DESC, Ledger_ID DESC
+            LIMIT 1
+        """, (group, start))
+        row = cursor.fetchone()
+        if row:
+            balances[group] = Decimal(row[0])
+
+    cursor.execute("""
+        SELECT Blood_Group, Created_At, Change_Quantity, Balance FROM Inventory_Ledger
+        WHERE Created_At >= %s AND Created_At < %s
+        ORDER BY Ledger_ID
+    """, (start, end))
+    events = {}
+    for group, created_at, change, balance in cursor.fetchall():
+        events.setdefault(group, []).append((_as_datetime(created_at), Decimal(change), Decimal(balance)))
+
+    buckets = []
+    step = STEPS['minute']
+    for group in sorted(set(balances) | set(events)):
+        balance = balances.get(group)
+        pending = events.get(group, [])
+        index = 0
+        bucket_start = start
+        while bucket_start < end:
+            bucket_end = bucket_start + step
+            opening = balance
+            if opening is None and index < len(pending) and pending[index][0] < bucket_end:
+                opening = pending[index][2] - pending[index][1]
+            if opening is None:
+                bucket_start = bucket_end
+                continue
+            low = high = balance = opening
+            net_change = Decimal(0)
+            changes = critical = below = 0
+            since = bucket_start
+            while index < len(pending) and pending[index][0] < bucket_end:
+                at, change, new_balance = pending[index]
+                spent = _seconds_at(balance, int((at - since).total_seconds()))
+                critical, below = critical + spent[0], below + spent[1]
+                balance = new_balance
+                low, high = min(low, balance), max(high, balance)
+                net_change += change
+                changes += 1
+                since = at
+                index += 1
+            spent = _seconds_at(balance, int((bucket_end - since).total_seconds()))
+            critical, below = critical + spent[0], below + spent[1]
+            buckets.append(Bucket(group, bucket_start, opening, low, high, balance,
+                                  net_change, changes, critical, below))
+            bucket_start = bucket_end
+    return buckets
+
+def downsample(cursor, finer, resolution, start, end):
+    """Merge finer buckets in [start, end) into buckets of resolution"""
+    cursor.execute("""
+        SELECT Blood_Group, Bucket_Start, Open_Quantity, Min_Quantity, Max_Quantity,
+               Close_Quantity, Net_Change, Changes, Seconds_Critical, Seconds_Low
+        FROM Inventory_Rollup
+        WHERE Resolution = %s AND Bucket_Start >= %s AND Bucket_Start < %s
+        ORDER BY Blood_Group, Bucket_Start
+    """, (finer, start, end))
+    merged = {}
+    for row in cursor.fetchall():
+        part = Bucket(row[0], _as_datetime(row[1]), *row[2:])
+        key = (part.blood_group, floor_time(part.start, resolution))
+        current = merged.get(key)
+        if current is None:
+            merged[key] = part._replace(start=key[1])
+        else:
+            merged[key] = current._replace(
+                low=min(current.low, part.low), high=max(current.high, part.high),
+                close=part.close, net_change=current.net_change + part.net_change,
+                changes=current.changes + part.changes,
+                seconds_critical=current.seconds_critical + part.seconds_critical,
+                seconds_low=current.seconds_low + part.seconds_low)
+    return list(merged.values())
+
+def _store(cursor, resolution, buckets):
+    cursor.executemany("""
+        INSERT INTO Inventory_Rollup (Resolution, Blood_Group, Bucket_Start, Open_Quantity,
+                                      Min_Quantity, Max_Quantity, Close_Quantity, Net_Change,
+                                      Changes, Seconds_Critical, Seconds_Low)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, [(resolution,) + tuple(bucket) for bucket in buckets])
+
+def roll_up(connection, settings=Config, now=None, verbose=False):
+    """Roll up every bucket that has fully elapsed; return rows written per resolution
+
+    Minutes come from the ledger, hours from minutes and days from hours.
+    Each window is written together with its watermark, so an interrupted
+    run resumes where it stopped without duplicating buckets.
+    """
+    cursor = connection.cursor()
+    written = {}
+    try:
+        now = now or database_now(cursor)
+        for position, resolution in enumerate(RESOLUTIONS):
+            written[resolution] = 0
+            if position == 0:
+                limit = floor_time(now - SETTLE_TIME, resolution)
+            else:
+                # A coarser bucket is complete once all of its finer buckets are
+                finer_done = get_watermark(cursor, RESOLUTIONS[position - 1])
+                if finer_done is None:
+                    break
+                limit = floor_time(finer_done, resolution)
+            start = get_watermark(cursor, resolution)
+            if start is None:
+                break
+            while start < limit:
+                end = min(floor_time(start + WINDOWS[resolution], resolution), limit)
+                if end <= start:
+                    break
+                if position == 0:
+                    buckets = minute_buckets(cursor, start, end)
+                else:
+                    buckets = downsample(cursor, RESOLUTIONS[position - 1], resolution, start, end)
+                _store(cursor, resolution, buckets)
+                _set_watermark(cursor, resolution, end)
+                connection.commit()
+                written[resolution] += len(buckets)
+                start = end
+            if verbose:
+                print(f"   {resolution}: {written[resolution]:,} buckets, rolled up to {start}")
+
+        cutoff = min(floor_time(now, 'day') - timedelta(days=settings.INVENTORY_MINUTE_RETENTION_DAYS),
+                     get_watermark(cursor, 'hour') or now)
+        cursor.execute("DELETE FROM Inventory_Rollup WHERE Resolution = 'minute' AND Bucket_Start < %s",
+                       (cutoff,))
+        connection.commit()
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return written
+
+def pick_resolution(start, end):
+    """Choose the coarsest resolution that still gives a useful chart"""
+    span = end - start
+    if span <= timedelta(hours=6):
+        return 'minute'
+    if span <= timedelta(days=14):
+        return 'hour'
+    return 'day'
+
+def trend(cursor, start, end, resolution=None, blood_groups=None):
+    """Return {blood_group: [bucket dicts]} for buckets starting in [start, end)"""
+    resolution = resolution or pick_resolution(start, end)
+    query = """
+        SELECT Blood_Group, Bucket_Start, Open_Quantity, Min_Quantity, Max_Quantity,
+               Close_Quantity, Net_Change, Changes, Seconds_Critical, Seconds_Low
+        FROM Inventory_Rollup
+        WHERE Resolution = %s AND Bucket_Start >= %s AND Bucket_Start < %s
+    """
+    params = [resolution, start, end]
+    if blood_groups:
+        query += f" AND Blood_Group IN ({', '.join(['%s'] * len(blood_groups))})"
+        params.extend(blood_groups)
+    cursor.execute(query + " ORDER BY Blood_Group, Bucket_Start", params)
+    series = {}
+    for row in cursor.fetchall():
+        bucket = Bucket(row[0], _as_datetime(row[1]), *row[2:])
+        series.setdefault(bucket.blood_group, []).append({
+            'start': bucket.start.isoformat(),
+            'open': float(bucket.open),
+            'min': float(bucket.low),
+            'max': float(bucket.high),
+            'close': float(bucket.close),
+            'net_change': float(bucket.net_change),
+            'changes': bucket.changes,
+            'seconds_critical': bucket.seconds_critical,
+            'seconds_low': bucket.seconds_low,
+        })
+    return resolution, series
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Roll up the inventory ledger into minute/hour/day buckets')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    status = sharding.run_on_sites(sites, lambda connection, settings: roll_up(connection, settings, verbose=True),
+                                   'Rollup failed')
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
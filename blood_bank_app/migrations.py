@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Schema migration runner for Blood Bank Management System
+Applies database/schema.sql and the versioned scripts in database/migrations
+exactly once each, recording applied versions in the Schema_Migrations table
+
+Usage:
+    python migrations.py            # apply all pending migrations
+    python migrations.py status     # show applied and pending migrations
+    python migrations.py up --to 3  # apply pending migrations up to version 3
+    python migrations.py --online   # apply table changes without long locks
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+
+import db
+from db import Error
+from config import Config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BASE_DIR, 'database', 'schema.sql')
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'database', 'migrations')
+
+# schema.sql is the baseline; files in database/migrations start at 0002.
+# A file named NNNN_name.<backend>.sql replaces NNNN_name.sql on that backend.
+BASELINE_VERSION = 1
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+?)(?:\.(mysql|sqlite))?\.sql$')
+
+Migration = namedtuple('Migration', ['version', 'name', 'path'])
+
+class MigrationError(Error):
+    """Raised when a migration cannot be applied"""
+
+def split_statements(sql):
+    """Split a SQL script into individual statements
+
+    Semicolons inside quoted strings, backtick identifiers and comments do
+    not end a statement, and the mysql client's DELIMITER directive is
+    honoured so trigger bodies can be written the same way as in the CLI.
+    Comments are dropped except MySQL /*! ... */ and /*+ ... */ hints.
+    """
+    statements = []
+    current = []
+    delimiter = ';'
+    special = _special_chars(delimiter)
+    length = len(sql)
+    i = 0
+    while i < length:
+        if (i == 0 or sql[i - 1] == '\n') and not ''.join(current).strip():
+            match = _DELIMITER_LINE.match(sql, i)
+            if match:
+                delimiter = match.group(1)
+                special = _special_chars(delimiter)
+                current = []
+                i = match.end()
+                continue
+        # Copy plain text up to the next character that may need attention
+        match = special.search(sql, i)
+        if not match:
+            current.append(sql[i:])
+            break
+        if match.start() > i:
+            current.append(sql[i:match.start()])
+            i = match.start()
+        char = sql[i]
+        if char in ("'", '"', '`'):
+            end = _quoted_end(sql, i)
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith('--', i) and (i + 2 == length or sql[i + 2].isspace()) or char == '#':
+            end = sql.find('\n', i)
+            i = length if end == -1 else end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            if sql.startswith('/*!', i) or sql.startswith('/*+', i):
+                current.append(sql[i:end])
+            i = end
+        elif sql.startswith(delimiter, i):
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += len(delimiter)
+        else:
+            current.append(char)
+            i += 1
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+_DELIMITER_LINE = re.compile(r'[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)', re.I)
+
+def _special_chars(delimiter):
+    """Regex matching quotes, comment starts, newlines and the delimiter"""
+    return re.compile('[\'"`#/\\n-]|' + re.escape(delimiter[0]))
+
+def _quoted_end(sql, start):
+    """Return the index just past the quoted token starting at start"""
+    quote = sql[start]
+    i = start + 1
+    while i < len(sql):
+        char = sql[i]
+        if char == '\\' and quote != '`':
+            i += 2
+            continue
+        if char == quote:
+            if sql[i + 1:i + 2] == quote:
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return len(sql)
+
+def _is_session_statement(statement):
+    """CREATE DATABASE / USE are handled by init_db, not by migrations"""
+    keyword = statement[:16].upper()
+    return keyword.startswith('CREATE DATABASE') or keyword.startswith('USE ')
+
+def discover_migrations(backend):
+    """Return the baseline plus all versioned migrations for a backend"""
+    generic, specific = {}, {}
+    if os.path.isdir(MIGRATIONS_DIR):
+        for filename in os.listdir(MIGRATIONS_DIR):
+            match = MIGRATION_FILE.match(filename)
+            if not match:
+                continue
+            version, name, variant = int(match.group(1)), match.group(2), match.group(3)
+            migration = Migration(version, name, os.path.join(MIGRATIONS_DIR, filename))
+            if variant is None:
+                generic[version] = migration
+            elif variant == backend:
+                specific[version] = migration
+    migrations = dict(generic)
+    migrations.update(specific)
+    if BASELINE_VERSION in migrations:
+        raise MigrationError(f"Version {BASELINE_VERSION} is reserved for schema.sql")
+    migrations[BASELINE_VERSION] = Migration(BASELINE_VERSION, 'baseline', SCHEMA_PATH)
+    return [migrations[version] for version in sorted(migrations)]
+
+def read_migration(migration):
+    """Return (statements, checksum) for a migration file"""
+    with open(migration.path, 'r', encoding='utf-8') as file:
+        sql = file.read()
+    checksum = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+    statements = [stmt for stmt in split_statements(sql) if not _is_session_statement(stmt)]
+    return statements, checksum
+
+def ensure_migrations_table(connection):
+    """Create Schema_Migrations if needed and adopt pre-existing databases"""
+    existing = db.list_tables(connection)
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Schema_Migrations (
+            Version INT PRIMARY KEY,
+            Name VARCHAR(100) NOT NULL,
+            Checksum CHAR(64) NOT NULL,
+            Applied_At TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if 'Schema_Migrations' not in existing and 'Donor' in existing:
+        # Database was built by the old split-on-semicolon loader; record the
+        # baseline as applied instead of failing on existing tables
+        _, checksum = read_migration(discover_migrations(connection.backend)[0])
+        cursor.execute("""
+            INSERT INTO Schema_Migrations (Version, Name, Checksum)
+            VALUES (%s, %s, %s)
+        """, (BASELINE_VERSION, 'baseline', checksum))
+    connection.commit()
+    cursor.close()
+
+def applied_migrations(connection):
+    """Return {version: checksum} for all applied migrations"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT Version, Checksum FROM Schema_Migrations")
+    applied = dict(cursor.fetchall())
+    cursor.close()
+    return applied
+
+def migrate(connection, target=None, verbose=True, online=False):
+    """Apply pending migrations in version order; return how many ran
+
+    Each migration is sent to the server as one script together with its
+    Schema_Migrations row, so a failed migration is never recorded and is
+    retried on the next run. Re-running is a no-op once everything applied.
+    On SQLite the script is one transaction, so a failure leaves nothing
+    behind. MySQL commits each DDL statement on its own: what a failed
+    migration had already created stays, and has to be dropped by hand
+    before the retry, which would otherwise fail on it.
+    With online=True, ALTER TABLE and CREATE/DROP INDEX statements go through
+    online_schema instead so large tables stay writable during the change;
+    tables it cannot swap (foreign key parents) get a plain ALTER TABLE.
+    """
+    lock = _acquire_lock(connection)
+    try:
+        ensure_migrations_table(connection)
+        applied = applied_migrations(connection)
+        count = 0
+        for migration in discover_migrations(connection.backend):
+            if target is not None and migration.version > target:
+                break
+            statements, checksum = read_migration(migration)
+            if migration.version in applied:
+                if verbose and applied[migration.version] != checksum:
+                    print(f"Warning: migration {migration.version:04d}_{migration.name} "
+                          f"changed after it was applied")
+                continue
+            started = time.perf_counter()
+            record = ("INSERT INTO Schema_Migrations (Version, Name, Checksum) "
+                      f"VALUES ({migration.version}, '{migration.name}', '{checksum}')")
+            try:
+                if online:
+                    _apply_online(connection, statements + [record])
+                else:
+                    connection.executescript(statements + [record])
+            except Error as e:
+                raise MigrationError(
+                    f"Migration {migration.version:04d}_{migration.name} failed: {e}") from e
+            count += 1
+            if verbose:
+                elapsed = (time.perf_counter() - started) * 1000
+                print(f"Applied {migration.version:04d}_{migration.name} "
+                      f"({len(statements)} statements, {elapsed:.0f} ms)")
+        return count
+    finally:
+        _release_lock(connection, lock)
+
+def _apply_online(connection, statements):
+    """Run table changes through online_schema and everything else as scripts"""
+    import online_schema
+
+    batch = []
+    for statement in statements:
+        if online_schema.parse_change(statement) is None:
+            batch.append(statement)
+            continue
+        if batch:
+            connection.executescript(batch)
+            batch = []
+        online_schema.apply_online(connection, [statement], fallback=True)
+    if batch:
+        connection.executescript(batch)
+
+def _acquire_lock(connection):
+    """Serialise concurrent runners on MySQL; SQLite uses BEGIN IMMEDIATE"""
+    if connection.backend != 'mysql':
+        return False
+    cursor = connection.cursor()
+    cursor.execute("SELECT GET_LOCK('blood_bank_migrations', 60)")
+    locked = cursor.fetchone()[0] == 1
+    cursor.close()
+    if not locked:
+        raise MigrationError("Another migration run holds the lock")
+    return True
+
+def _release_lock(connection, lock):
+    if lock:
+        cursor = connection.cursor()
+        cursor.execute("SELECT RELEASE_LOCK('blood_bank_migrations')")
+        cursor.fetchall()
+        cursor.close()
+
+def print_status(connection):
+    """Print applied and pending migrations"""
+    ensure_migrations_table(connection)
+    applied = applied_migrations(connection)
+    for migration in discover_migrations(connection.backend):
+        _, checksum = read_migration(migration)
+        if migration.version not in applied:
+            state = 'pending'
+        elif applied[migration.version] != checksum:
+            state = 'applied (modified since)'
+        else:
+            state = 'applied'
+        print(f"   {migration.version:04d}_{migration.name:<30} {state}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply database schema migrations')
+    parser.add_argument('command', nargs='?', default='up', choices=['up', 'status'])
+    parser.add_argument('--to', type=int, dest='target', help='highest version to apply')
+    parser.add_argument('--online', action='store_true',
+                        help='apply table changes with online_schema (large MySQL tables)')
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        if args.command == 'status':
+            print_status(connection)
+        else:
+            count = migrate(connection, target=args.target, online=args.online)
+            print(f"{count} migration(s) applied")
+        return 0
+    except Error as e:
+        print(f"Migration failed: {e}")
+        return 1
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
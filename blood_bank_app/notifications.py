@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Notifications for Blood Bank Management System
+Routes queue messages in Notification_Outbox inside the transaction that
+makes the change, so nothing is announced that did not commit and no
+request waits on delivery. Worker threads claim due messages in batches per
+channel, pace them with a token bucket, hand them to the configured sender
+and retry failures with exponential backoff.
+
+Usage:
+    python notifications.py                  # run 4 workers until interrupted
+    python notifications.py --once           # deliver what is due, then exit
+    python notifications.py --status         # outbox counts by status
+    python notifications.py --site north     # one site's outbox in multi-site mode
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import db
+import sharding
+from db import Error
+from config import Config
+from inventory_history import database_now
+from ratelimit import TokenBucket
+
+SMS = 'sms'
+# Longest wait between retries of one message
+MAX_RETRY_DELAY = timedelta(hours=6)
+# Seconds an idle worker waits before looking for due messages again
+POLL_INTERVAL = 2.0
+
+Message = namedtuple('Message', ['notification_id', 'channel', 'recipient', 'subject',
+                                 'body', 'event', 'reference_id', 'attempts'])
+
+def enqueue(cursor, channel, recipient, subject, body, event, reference_id=None):
+    """Queue one message (caller commits)"""
+    cursor.execute("""
+        INSERT INTO Notification_Outbox (Channel, Recipient, Subject, Body, Event, Reference_ID)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (channel, recipient, subject, body, event, reference_id))
+
+def notify_hospital(cursor, hospital_id, subject, body, event, reference_id=None):
+    """Queue a text to a hospital's contact number (caller commits)"""
+    cursor.execute("""
+        INSERT INTO Notification_Outbox (Channel, Recipient, Subject, Body, Event, Reference_ID)
+        SELECT %s, Contact, %s, %s, %s, %s FROM Hospital WHERE Hospital_ID = %s
+    """, (SMS, subject, body, event, reference_id, hospital_id))
+
+def notify_campaign(cursor, campaign_id, subject, body):
+    """Queue a text to every donor on a recall campaign's call list (caller commits)"""
+    cursor.execute("""
+        INSERT INTO Notification_Outbox (Channel, Recipient, Subject, Body, Event, Reference_ID)
+        SELECT %s, d.Contact, %s, %s, 'recall', c.Campaign_ID
+        FROM Recall_Campaign_Donor c
+        JOIN Donor d ON d.Donor_ID = c.Donor_ID
+        WHERE c.Campaign_ID = %s
+        ORDER BY c.Call_Rank
+    """, (SMS, subject, body, campaign_id))
+    return cursor.rowcount
+
+# Senders
+
+class Sender:
+    """Delivers batches of messages for one channel
+
+    send_batch returns {notification_id: error message} for the messages
+    that failed; raising fails the whole batch. Implementations must be
+    safe to call from several worker threads.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def send_batch(self, channel, messages):
+        raise NotImplementedError
+
+class StdoutSender(Sender):
+    """Print messages instead of sending them (development)"""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.lock = threading.Lock()
+
+    def send_batch(self, channel, messages):
+        with self.lock:
+            for message in messages:
+                print(f"[{channel}] to {message.recipient}: {message.subject} - {message.body}")
+            sys.stdout.flush()
+        return {}
+
+class FileSender(Sender):
+    """Append messages to NOTIFICATION_FILE as JSON lines (tests, staging)"""
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.path = settings.NOTIFICATION_FILE
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+    def send_batch(self, channel, messages):
+        lines = ''.join(json.dumps({**message._asdict(), 'sent_at': datetime.now().isoformat()}) + '\n'
+                        for message in messages)
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write(lines)
+        return {}
+
+SENDERS = {
+    'stdout': StdoutSender,
+    'file': FileSender,
+}
+
+def load_sender(settings=Config):
+    """Instantiate NOTIFICATION_SENDER: a name in SENDERS or 'module:ClassName'"""
+    name = settings.NOTIFICATION_SENDER
+    if name in SENDERS:
+        return SENDERS[name](settings)
+    module_name, _, class_name = name.partition(':')
+    if not class_name:
+        raise ValueError(f"Unknown notification sender: {name}")
+    return getattr(importlib.import_module(module_name), class_name)(settings)
+
+# Delivery
+
+def retry_delay(attempts, settings=Config):
+    """Exponential backoff with +-20% jitter, capped at MAX_RETRY_DELAY"""
+    delay = timedelta(seconds=settings.NOTIFICATION_RETRY_SECONDS * 2 ** (attempts - 1))
+    return min(delay, MAX_RETRY_DELAY) * random.uniform(0.8, 1.2)
+
+def requeue_expired(connection):
+    """Release claims whose worker died before recording the outcome"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            UPDATE Notification_Outbox SET Status = 'Pending', Claimed_By = NULL
+            WHERE Status = 'Sending' AND Claimed_Until < NOW()
+        """)
+        connection.commit()
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def claim_batch(connection, worker_id, settings=Config):
+    """Claim up to NOTIFICATION_BATCH_SIZE due messages of one channel
+
+    The channel is the one of the oldest due message. Rows locked by
+    another worker are skipped (MySQL) or the claim waits for it (SQLite).
+    """
+    cursor = connection.cursor()
+    connection.begin()
+    try:
+        cursor.execute("""
+            SELECT Channel FROM Notification_Outbox
+            WHERE Status = 'Pending' AND Next_Attempt_At <= NOW()
+            ORDER BY Next_Attempt_At
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        if row is None:
+            connection.commit()
+            return []
+        cursor.execute("""
+            SELECT Notification_ID, Channel, Recipient, Subject, Body, Event, Reference_ID, Attempts
+            FROM Notification_Outbox
+            WHERE Status = 'Pending' AND Next_Attempt_At <= NOW() AND Channel = %s
+            ORDER BY Next_Attempt_At
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (row[0], settings.NOTIFICATION_BATCH_SIZE))
+        messages = [Message(*row[:7], row[7] + 1) for row in cursor.fetchall()]
+        if messages:
+            lease = database_now(cursor) + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS)
+            cursor.executemany("""
+                UPDATE Notification_Outbox
+                SET Status = 'Sending', Attempts = Attempts + 1, Claimed_By = %s, Claimed_Until = %s
+                WHERE Notification_ID = %s
+            """, [(worker_id, lease, message.notification_id) for message in messages])
+        connection.commit()
+        return messages
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def record_results(connection, worker_id, messages, failures, settings=Config):
+    """Mark sent messages and reschedule or give up on failed ones
+
+    Only rows still claimed by this worker are touched, so a message whose
+    lease expired and was claimed again is not overwritten.
+    """
+    cursor = connection.cursor()
+    try:
+        now = database_now(cursor)
+        sent = [(now, message.notification_id, worker_id)
+                for message in messages if message.notification_id not in failures]
+        retry = [('Failed' if message.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS else 'Pending',
+                  now + retry_delay(message.attempts, settings),
+                  str(failures[message.notification_id])[:500],
+                  message.notification_id, worker_id)
+                 for message in messages if message.notification_id in failures]
+        if sent:
+            cursor.executemany("""
+                UPDATE Notification_Outbox
+                SET Status = 'Sent', Sent_At = %s, Claimed_By = NULL, Last_Error = NULL
+                WHERE Notification_ID = %s AND Claimed_By = %s
+            """, sent)
+        if retry:
+            cursor.executemany("""
+                UPDATE Notification_Outbox
+                SET Status = %s, Next_Attempt_At = %s, Last_Error = %s, Claimed_By = NULL
+                WHERE Notification_ID = %s AND Claimed_By = %s
+            """, retry)
+        connection.commit()
+        return len(sent), len(retry)
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def deliver_batch(connection, sender, buckets, worker_id, settings=Config):
+    """Claim, pace, send and record one batch; return (sent, failed) or None if idle"""
+    messages = claim_batch(connection, worker_id, settings)
+    if not messages:
+        return None
+    channel = messages[0].channel
+    # Blocks while the channel is over its rate: the backlog waits in the
+    # outbox instead of in memory
+    buckets[channel].take(len(messages))
+    try:
+        failures = sender.send_batch(channel, messages) or {}
+    except Exception as e:
+        failures = {message.notification_id: e for message in messages}
+    return record_results(connection, worker_id, messages, failures, settings)
+
+class Buckets(dict):
+    """One token bucket per channel, created on first use"""
+
+    def __init__(self, settings=Config):
+        super().__init__()
+        self.settings = settings
+        self.lock = threading.Lock()
+
+    def __missing__(self, channel):
+        with self.lock:
+            if channel not in self:
+                rate = self.settings.NOTIFICATION_RATE_PER_SECOND
+                self[channel] = TokenBucket(rate, max(rate, self.settings.NOTIFICATION_BATCH_SIZE))
+            return dict.__getitem__(self, channel)
+
+def work(settings, sender, buckets, worker_id, stop, totals, once=False):
+    """Worker thread loop: deliver batches until stop is set (or idle, with once)"""
+    connection = db.connect(settings)
+    try:
+        while not stop.is_set():
+            try:
+                result = deliver_batch(connection, sender, buckets, worker_id, settings)
+                if result is None and requeue_expired(connection):
+                    continue
+            except Error as e:
+                print(f"   {worker_id}: {e}")
+                result = None
+            if result is None:
+                if once:
+                    return
+                stop.wait(POLL_INTERVAL)
+            else:
+                totals['sent'] += result[0]
+                totals['failed'] += result[1]
+    finally:
+        connection.close()
+
+def run(workers=4, settings=Config, once=False, stop=None):
+    """Run a pool of worker threads; return {'sent': n, 'failed': n}
+
+    Setting stop (a threading.Event) from another thread ends the run.
+    """
+    sender = load_sender(settings)
+    buckets = Buckets(settings)
+    stop = stop or threading.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    totals = [{'sent': 0, 'failed': 0} for _ in range(workers)]
+    threads = [threading.Thread(target=work, name=f"notifier-{number}", daemon=True,
+                                args=(settings, sender, buckets, f"{prefix}:{number}", stop,
+                                      totals[number], once))
+               for number in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1.0)
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {key: sum(worker[key] for worker in totals) for key in ('sent', 'failed')}
+
+def outbox_status(connection):
+    """Return [(channel, status, count, oldest created_at)]"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT Channel, Status, COUNT(*), MIN(Created_At) FROM Notification_Outbox
+            GROUP BY Channel, Status ORDER BY Channel, Status
+        """)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Deliver queued notifications')
+    parser.add_argument('--workers', type=int, default=4, help='worker threads')
+    parser.add_argument('--once', action='store_true', help='exit when nothing is due')
+    parser.add_argument('--status', action='store_true', help='print outbox counts and exit')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.status:
+        def print_status(connection, settings):
+            for channel, status, count, oldest in outbox_status(connection):
+                print(f"   {channel:<8} {status:<8} {count:>8,}  oldest {oldest}")
+        return sharding.run_on_sites(sites, print_status, 'Status failed')
+
+    started = time.perf_counter()
+    if len(sites) == 1:
+        totals = {sites[0][0]: run(args.workers, sites[0][1], args.once)}
+    else:
+        # Every site's outbox at once, each with its own workers and connections
+        stop = threading.Event()
+        totals = {}
+        threads = [threading.Thread(target=lambda site_id=site_id, settings=settings: totals.__setitem__(
+                                        site_id, run(args.workers, settings, args.once, stop)),
+                                    name=f"site-{site_id}", daemon=True)
+                   for site_id, settings in sites]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+    elapsed = time.perf_counter() - started
+    for site_id, counts in totals.items():
+        where = f"{site_id}: " if site_id is not None else ''
+        print(f"{where}{counts['sent']:,} sent, {counts['failed']:,} failed in {elapsed:.1f}s")
+    return 0 if len(totals) == len(sites) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Online schema changes for large tables in Blood Bank Management System
+Copies the table into a shadow table that already has the new definition,
+keeps it in sync with triggers while backfilling in small throttled chunks,
+then swaps the two with one atomic RENAME TABLE, moving the table's own
+triggers to the new table at the same time
+
+Usage:
+    python online_schema.py "CREATE INDEX idx_donation_donor_date ON Donation (Donor_ID, Date)"
+    python online_schema.py --dry-run "ALTER TABLE Request ADD COLUMN Priority INT DEFAULT 0"
+"""
+
+import argparse
+import re
+import sys
+import time
+
+import db
+import replicas
+from db import Error
+from config import Config
+
+_ALTER_TABLE = re.compile(r'^ALTER\s+TABLE\s+`?(\w+)`?\s+(.+)$', re.I | re.S)
+_CREATE_INDEX = re.compile(r'^CREATE\s+(UNIQUE\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?\s*(\(.+\))$', re.I | re.S)
+_DROP_INDEX = re.compile(r'^DROP\s+INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?$', re.I)
+
+class OnlineSchemaError(Error):
+    """Raised when an online schema change cannot proceed"""
+
+def parse_change(statement):
+    """Return (table, alter_clause) for statements that can run online
+
+    Returns None for statements that do not change a single existing table
+    (CREATE TABLE, views, data changes), which are applied normally.
+    """
+    statement = statement.strip().rstrip(';')
+    match = _ALTER_TABLE.match(statement)
+    if match:
+        return match.group(1), match.group(2).strip()
+    match = _CREATE_INDEX.match(statement)
+    if match:
+        unique = 'UNIQUE ' if match.group(1) else ''
+        return match.group(3), f"ADD {unique}INDEX {match.group(2)} {match.group(4)}"
+    match = _DROP_INDEX.match(statement)
+    if match:
+        return match.group(2), f"DROP INDEX {match.group(1)}"
+    return None
+
+class Throttle:
+    """Pause the copy while replicas lag or the primary is busy"""
+
+    def __init__(self, connection, settings, max_lag=None, max_threads_running=None):
+        self.connection = connection
+        self.max_lag = max_lag if max_lag is not None else settings.ONLINE_SCHEMA_MAX_LAG
+        self.max_threads_running = (max_threads_running if max_threads_running is not None
+                                    else settings.ONLINE_SCHEMA_MAX_THREADS_RUNNING)
+        self.replicas = [db.connect(replicas.replica_settings(settings, host))
+                         for host in settings.MYSQL_REPLICA_HOSTS]
+        self.paused_seconds = 0.0
+
+    def replica_lag(self):
+        """Return the worst replica lag in seconds (None if a replica is stopped)"""
+        worst = 0
+        for replica in self.replicas:
+            lag = replicas.replica_lag(replica)
+            if lag is None:
+                return None
+            worst = max(worst, lag)
+        return worst
+
+    def threads_running(self):
+        cursor = self.connection.cursor()
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row[1]) if row else 0
+
+    def wait(self):
+        """Block until lag and load are below their limits"""
+        while True:
+            lag = self.replica_lag()
+            running = self.threads_running()
+            if lag is not None and lag <= self.max_lag and running <= self.max_threads_running:
+                return
+            reason = 'replica stopped' if lag is None else f'lag {lag}s'
+            print(f"   Throttling: {reason}, {running} threads running")
+            time.sleep(1.0)
+            self.paused_seconds += 1.0
+
+    def close(self):
+        for replica in self.replicas:
+            replica.close()
+
+class OnlineSchemaChange:
+    """Apply ALTER clauses to one MySQL table without long table locks"""
+
+    def __init__(self, connection, table, clauses, settings=Config, chunk_size=None,
+                 chunk_time=None, throttle=None, keep_old=False, dry_run=False):
+        self.connection = connection
+        self.table = table
+        self.clauses = clauses
+        self.shadow = f"_{table}_new"
+        self.old = f"_{table}_old"
+        self.chunk_size = chunk_size or settings.ONLINE_SCHEMA_CHUNK_SIZE
+        self.chunk_time = chunk_time or settings.ONLINE_SCHEMA_CHUNK_TIME
+        self.throttle = throttle
+        self.keep_old = keep_old
+        self.dry_run = dry_run
+        self.triggers = [f"_{table}_osc_{suffix}" for suffix in ('ins', 'upd', 'del')]
+
+    def _execute(self, sql, params=None, fetch=False):
+        if self.dry_run and not fetch:
+            print(f"   {' '.join(sql.split())};")
+            return None
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        rows = cursor.fetchall() if fetch else None
+        cursor.close()
+        return rows
+
+    def _primary_key(self):
+        rows = self._execute("""
+            SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = 'PRIMARY'
+        """, (self.table,), fetch=True)
+        if len(rows) != 1:
+            raise OnlineSchemaError(f"{self.table} needs a single-column primary key")
+        return rows[0][0]
+
+    def _columns(self, table):
+        rows = self._execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+        """, (table,), fetch=True)
+        return [row[0] for row in rows]
+
+    def blocker(self):
+        """Why the table cannot be swapped, or None if it can"""
+        rows = self._execute("""
+            SELECT TABLE_NAME FROM information_schema.REFERENTIAL_CONSTRAINTS
+            WHERE CONSTRAINT_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME = %s
+        """, (self.table,), fetch=True)
+        if rows:
+            children = ', '.join(sorted({row[0] for row in rows}))
+            return (f"{self.table} is referenced by foreign keys from {children}; "
+                    f"the rename would leave them pointing at the old table")
+        return None
+
+    def _own_triggers(self):
+        """Return (name, timing, event, body) of the table's own triggers"""
+        rows = self._execute("""
+            SELECT TRIGGER_NAME, ACTION_TIMING, EVENT_MANIPULATION, ACTION_STATEMENT
+            FROM information_schema.TRIGGERS
+            WHERE TRIGGER_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = %s
+            ORDER BY EVENT_MANIPULATION, ACTION_TIMING, ACTION_ORDER
+        """, (self.table,), fetch=True)
+        return [tuple(row) for row in rows if row[0] not in self.triggers]
+
+    def _check_trigger_swap(self, triggers):
+        """Moving triggers at the swap needs RENAME TABLE under LOCK TABLES"""
+        if not triggers:
+            return
+        match = re.match(r'MySQL (\d+)\.(\d+)\.(\d+)', db.server_version(self.connection))
+        if match and tuple(int(part) for part in match.groups()) < (8, 0, 13):
+            names = ', '.join(trigger[0] for trigger in triggers)
+            raise OnlineSchemaError(f"{self.table} has triggers {names}, which can only be "
+                                    f"moved to the new table on MySQL 8.0.13 or later")
+
+    @staticmethod
+    def _trigger_sql(trigger, table):
+        name, timing, event, body = trigger
+        return f"CREATE TRIGGER {name} {timing} {event} ON {table} FOR EACH ROW {body}"
+
+    def _foreign_keys(self):
+        """Return ADD CONSTRAINT clauses recreating the table's own foreign keys"""
+        rows = self._execute("""
+            SELECT k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+                   k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE
+            FROM information_schema.KEY_COLUMN_USAGE k
+            JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+              ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME
+            WHERE k.TABLE_SCHEMA = DATABASE() AND k.TABLE_NAME = %s
+            ORDER BY k.CONSTRAINT_NAME, k.ORDINAL_POSITION
+        """, (self.table,), fetch=True)
+        clauses = []
+        for name, column, ref_table, ref_column, on_update, on_delete in rows:
+            # Constraint names are schema-wide, so toggle a leading underscore
+            new_name = name[1:] if name.startswith('_') else f"_{name}"
+            clauses.append(f"ADD CONSTRAINT {new_name} FOREIGN KEY ({column}) "
+                           f"REFERENCES {ref_table} ({ref_column}) "
+                           f"ON UPDATE {on_update} ON DELETE {on_delete}")
+        return clauses
+
+    def _create_shadow(self):
+        self._execute(f"DROP TABLE IF EXISTS {self.shadow}")
+        self._execute(f"CREATE TABLE {self.shadow} LIKE {self.table}")
+        clauses = self._foreign_keys() + list(self.clauses)
+        self._execute(f"ALTER TABLE {self.shadow} {', '.join(clauses)}")
+
+    def _create_triggers(self, pk, columns):
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f"NEW.{column}" for column in columns)
+        insert, update, delete = self.triggers
+        self._execute(f"""
+            CREATE TRIGGER {insert} AFTER INSERT ON {self.table} FOR EACH ROW
+            REPLACE INTO {self.shadow} ({column_list}) VALUES ({new_values})
+        """)
+        self._execute(f"""
+            CREATE TRIGGER {update} AFTER UPDATE ON {self.table} FOR EACH ROW
+            BEGIN
+                DELETE IGNORE FROM {self.shadow} WHERE {pk} = OLD.{pk} AND OLD.{pk} <> NEW.{pk};
+                REPLACE INTO {self.shadow} ({column_list}) VALUES ({new_values});
+            END
+        """)
+        self._execute(f"""
+            CREATE TRIGGER {delete} AFTER DELETE ON {self.table} FOR EACH ROW
+            DELETE IGNORE FROM {self.shadow} WHERE {pk} = OLD.{pk}
+        """)
+
+    def _drop_triggers(self):
+        for trigger in self.triggers:
+            self._execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    def _copy_rows(self, pk, columns):
+        """Backfill the shadow table in primary-key chunks, adapting chunk size"""
+        bounds = self._execute(f"SELECT MIN({pk}), MAX({pk}) FROM {self.table}", fetch=True)
+        low, high = bounds[0]
+        if low is None:
+            return 0
+        column_list = ', '.join(columns)
+        progress = Progress(self.table, low, high)
+        chunk_size = self.chunk_size
+        start = low
+        while start <= high:
+            if self.throttle:
+                self.throttle.wait()
+            rows = self._execute(f"""
+                SELECT {pk} FROM {self.table} WHERE {pk} >= %s
+                ORDER BY {pk} LIMIT 1 OFFSET %s
+            """, (start, chunk_size - 1), fetch=True)
+            end = min(rows[0][0], high) if rows else high
+
+            started = time.perf_counter()
+            # LOCK IN SHARE MODE stops a concurrent update from slipping
+            # between this read and the trigger writing the newer version
+            cursor = self.connection.cursor()
+            cursor.execute(f"""
+                INSERT LOW_PRIORITY IGNORE INTO {self.shadow} ({column_list})
+                SELECT {column_list} FROM {self.table}
+                WHERE {pk} BETWEEN %s AND %s LOCK IN SHARE MODE
+            """, (start, end))
+            copied = cursor.rowcount
+            cursor.close()
+            self.connection.commit()
+            elapsed = time.perf_counter() - started
+
+            progress.update(end, max(copied, 0))
+            # Size the next chunk so each one holds its locks for ~chunk_time
+            if elapsed > 0:
+                scale = min(2.0, max(0.5, self.chunk_time / elapsed))
+                chunk_size = int(min(50000, max(100, chunk_size * scale)))
+            start = end + 1
+        progress.finish()
+        return progress.copied
+
+    def _swap(self, triggers=()):
+        rename = f"RENAME TABLE {self.table} TO {self.old}, {self.shadow} TO {self.table}"
+        if not triggers:
+            # Both renames happen atomically; queries block only for the swap
+            self._execute(rename)
+            self._drop_triggers()
+        else:
+            # The table's own triggers are created on the shadow table only now,
+            # so they did not fire a second time for every copied row. Trigger
+            # names are schema-wide: the originals are dropped first, with both
+            # tables write-locked so that no write runs without them.
+            self._execute(f"LOCK TABLES {self.table} WRITE, {self.shadow} WRITE")
+            try:
+                self._drop_triggers()
+                try:
+                    for trigger in triggers:
+                        self._execute(f"DROP TRIGGER {trigger[0]}")
+                        self._execute(self._trigger_sql(trigger, self.shadow))
+                    self._execute(rename)
+                except BaseException:
+                    for trigger in triggers:
+                        self._execute(f"DROP TRIGGER IF EXISTS {trigger[0]}")
+                        self._execute(self._trigger_sql(trigger, self.table))
+                    raise
+            finally:
+                self._execute("UNLOCK TABLES")
+        if not self.keep_old:
+            self._execute(f"DROP TABLE IF EXISTS {self.old}")
+
+    def run(self):
+        """Run the whole change; cleans up the shadow table on failure"""
+        if self.dry_run:
+            print(f"Plan for {self.table}:")
+            self._create_shadow()
+            self._create_triggers('<pk>', ['<columns>'])
+            print(f"   -- copy rows in chunks of ~{self.chunk_size}, throttled")
+            self._swap(self._own_triggers())
+            return 0
+
+        reason = self.blocker()
+        if reason:
+            raise OnlineSchemaError(reason)
+        triggers = self._own_triggers()
+        self._check_trigger_swap(triggers)
+        pk = self._primary_key()
+        started = time.perf_counter()
+        try:
+            self._create_shadow()
+            shadow_columns = set(self._columns(self.shadow))
+            columns = [column for column in self._columns(self.table) if column in shadow_columns]
+            self._create_triggers(pk, columns)
+            copied = self._copy_rows(pk, columns)
+            self._swap(triggers)
+        except BaseException:
+            self._drop_triggers()
+            self._execute(f"DROP TABLE IF EXISTS {self.shadow}")
+            raise
+        elapsed = time.perf_counter() - started
+        print(f"Online change of {self.table} finished: {copied:,} rows copied in {_duration(elapsed)}")
+        return copied
+
+class Progress:
+    """Track copy progress by primary key range and print rate and ETA"""
+
+    def __init__(self, table, low, high, interval=5.0):
+        self.table = table
+        self.low = low
+        self.span = max(high - low, 1)
+        self.copied = 0
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_report = 0.0
+
+    def update(self, position, copied):
+        self.copied += copied
+        now = time.perf_counter()
+        if now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        fraction = min(1.0, (position - self.low + 1) / self.span)
+        rate = self.copied / elapsed if elapsed else 0
+        eta = elapsed / fraction * (1 - fraction) if fraction else 0
+        print(f"   Copying {self.table}: {fraction:6.1%} ({self.copied:,} rows, "
+              f"{rate:,.0f} rows/s, ETA {_duration(eta)})")
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"   Copying {self.table}: 100.0% ({self.copied:,} rows in {_duration(elapsed)})")
+
+def _duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+def apply_online(connection, statements, settings=Config, dry_run=False, fallback=False, **options):
+    """Apply ALTER TABLE / CREATE INDEX statements online, grouped per table
+
+    On SQLite the statements are applied directly: in WAL mode readers keep
+    using the previous snapshot while the change is written, so there is no
+    long lock to avoid. Tables referenced by foreign keys cannot be swapped
+    (see OnlineSchemaChange.blocker): they raise OnlineSchemaError, or with
+    fallback get a plain ALTER TABLE instead.
+    """
+    changes = {}
+    for statement in statements:
+        parsed = parse_change(statement)
+        if parsed is None:
+            raise OnlineSchemaError(f"Cannot run online: {statement[:60]}")
+        table, clause = parsed
+        changes.setdefault(table, []).append(clause)
+
+    if connection.backend == 'sqlite':
+        if dry_run:
+            for statement in statements:
+                print(f"   {statement};")
+        else:
+            connection.executescript(statements)
+        return
+
+    max_lag = options.pop('max_lag', None)
+    max_threads_running = options.pop('max_threads_running', None)
+    throttle = None if dry_run else Throttle(connection, settings, max_lag, max_threads_running)
+    try:
+        for table, clauses in changes.items():
+            change = OnlineSchemaChange(connection, table, clauses, settings, throttle=throttle,
+                                        dry_run=dry_run, **options)
+            reason = change.blocker() if fallback else None
+            if reason:
+                print(f"   {reason}: applying a plain ALTER TABLE")
+                change._execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+            else:
+                change.run()
+    finally:
+        if throttle:
+            throttle.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply schema changes without locking large tables')
+    parser.add_argument('statements', nargs='+', help='ALTER TABLE / CREATE INDEX / DROP INDEX statements')
+    parser.add_argument('--chunk-size', type=int, help='initial rows per chunk')
+    parser.add_argument('--chunk-time', type=float, help='target seconds per chunk')
+    parser.add_argument('--max-lag', type=int, help='pause while any replica lags more (seconds)')
+    parser.add_argument('--max-threads-running', type=int, help='pause while the primary is busier')
+    parser.add_argument('--keep-old', action='store_true', help='keep the original table as _<table>_old')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without changing anything')
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        apply_online(connection, args.statements, dry_run=args.dry_run,
+                     chunk_size=args.chunk_size, chunk_time=args.chunk_time,
+                     max_lag=args.max_lag, max_threads_running=args.max_threads_running,
+                     keep_old=args.keep_old)
+        return 0
+    except Error as e:
+        print(f"Online schema change failed: {e}")
+        return 1
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Rate limiting for Blood Bank Management System
+Thread-safe token buckets shared by the notification workers, per-user
+request limits and admission control for the web app
+"""
+
+import math
+import threading
+import time
+
+class TokenBucket:
+    """Allow rate tokens per second with bursts of up to capacity"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, tokens=1, block=True):
+        """Take tokens; return False if they are not available and block is False
+
+        A blocking take that exceeds the balance leaves the bucket in debt and
+        sleeps until the debt is repaid, so concurrent callers queue up in
+        order instead of all waking at once.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            if not block:
+                return False
+            wait = (tokens - self.tokens) / self.rate
+            self.tokens -= tokens
+        time.sleep(wait)
+        return True
+
+    def try_take(self, tokens=1):
+        """Take tokens if available; return 0.0, or the seconds until they will be"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def idle(self, now):
+        """True once the bucket has refilled, i.e. dropping it loses nothing"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+# Per-user request limits
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+def parse_limit(text):
+    """Parse '10/minute' or '10/30' (seconds) into (rate per second, burst)"""
+    count, _, period = text.strip().partition('/')
+    seconds = PERIODS[period] if period in PERIODS else float(period or 1)
+    return int(count) / seconds, int(count)
+
+def parse_limits(text):
+    """Parse 'endpoint=10/minute,role:endpoint=...' into {key: (rate, burst)}
+
+    A key is an endpoint name, 'role:endpoint' for one role only, or '*' for
+    every endpoint without its own limit.
+    """
+    limits = {}
+    for item in (text or '').split(','):
+        if item.strip():
+            key, _, limit = item.partition('=')
+            limits[key.strip()] = parse_limit(limit)
+    return limits
+
+class MemoryBackend:
+    """Token buckets in this process
+
+    Lookups take no global lock: buckets are created with dict.setdefault
+    and each has its own lock. Refilled buckets are dropped once there are
+    more than max_keys of them.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.buckets = {}
+        self.max_keys = max_keys
+        self.sweep_lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets.setdefault(key, TokenBucket(rate, burst))
+            if len(self.buckets) > self.max_keys:
+                self._sweep()
+        return bucket.try_take()
+
+    def _sweep(self):
+        if not self.sweep_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            for key, bucket in list(self.buckets.items()):
+                if bucket.idle(now):
+                    self.buckets.pop(key, None)
+        finally:
+            self.sweep_lock.release()
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker process
+
+    One Lua script refills and takes atomically on the server's clock.
+    Requires the redis package.
+    """
+
+    SCRIPT = """
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return tostring(wait)
+    """
+
+    def __init__(self, url, prefix='blood_bank:ratelimit:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key, rate, burst):
+        return float(self.script(keys=[self.prefix + key], args=[rate, burst]))
+
+def load_backend(url):
+    """'memory' (default) or a redis:// URL"""
+    if not url or url == 'memory':
+        return MemoryBackend()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBackend(url)
+    raise ValueError(f"Unknown rate limit backend: {url}")
+
+class RateLimiter:
+    """Per-identity token buckets with limits chosen by role and endpoint"""
+
+    def __init__(self, limits, backend=None):
+        self.limits = limits
+        self.backend = backend or MemoryBackend()
+
+    def limit_for(self, endpoint, role):
+        return (self.limits.get(f"{role}:{endpoint}") or self.limits.get(endpoint)
+                or self.limits.get('*'))
+
+    def check(self, endpoint, role, identity):
+        """Count one request; return 0.0 if allowed, else seconds until it would be"""
+        limit = self.limit_for(endpoint, role)
+        if limit is None:
+            return 0.0
+        rate, burst = limit
+        return self.backend.take(f"{endpoint}:{identity}", rate, burst)
+
+# Admission control
+
+READ, WRITE, CRITICAL = 'read', 'write', 'critical'
+
+class AdmissionController:
+    """Cap concurrent requests at the database's capacity
+
+    Reads and writes share capacity - reserved slots; the reserved ones are
+    only used by critical requests, so approvals still get a connection
+    while dashboards are saturating the database. Waiters that time out are
+    shed.
+    """
+
+    def __init__(self, capacity, reserved=0):
+        self.capacity = capacity
+        self.limits = {READ: capacity - reserved, WRITE: capacity - reserved, CRITICAL: capacity}
+        self.active = 0
+        self.shed = 0
+        self.condition = threading.Condition()
+
+    def admit(self, priority, timeout):
+        """Take a slot, waiting up to timeout seconds; return False if shed"""
+        limit = self.limits[priority]
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while self.active >= limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.shed += 1
+                    return False
+                self.condition.wait(remaining)
+            self.active += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            # Waiters have different limits, so wake them all
+            self.condition.notify_all()
+
+def retry_after(seconds):
+    """Retry-After header value: whole seconds, at least 1"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Donor recall campaigns for Blood Bank Management System
+Builds a ranked call list of eligible donors whose blood can stand in for a
+group that is running short, scoring donors chunk by chunk with NumPy so a
+registry of millions of donors is never held in Python objects at once
+
+Usage:
+    python recall.py                     # one campaign per open shortage alert
+    python recall.py O- --location Riverside --csv calls.csv
+    python recall.py O- --notify         # also queue a text to every listed donor
+"""
+
+import argparse
+import csv
+import io
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+import notifications
+from db import Error
+from config import Config
+
+CHUNK_SIZE = 50000
+# Call list rows read per query when streaming a campaign
+PAGE_SIZE = 5000
+
+# Score = weighted sum of components in [0, 1]
+WEIGHTS = {'recency': 0.35, 'history': 0.25, 'location': 0.25, 'group': 0.15}
+# Recency decays with the days a donor has been eligible: lapsed donors are
+# harder to bring back than ones who just came off the deferral period
+RECENCY_SCALE_DAYS = 365
+NEVER_DONATED_RECENCY = 0.2
+# Donation count at which the history component reaches 1
+HISTORY_CAP = 10
+# Group component for a substitute group (the short group itself scores 1)
+SUBSTITUTE_GROUP = 0.5
+
+RECALL_SUBJECT = 'Blood donors needed'
+RECALL_MESSAGE = ('{blood_group} blood is running short. You are eligible to donate again - '
+                  'please book a donation at the blood bank as soon as you can.')
+
+CSV_COLUMNS = ['Rank', 'Donor_ID', 'Name', 'Blood_Group', 'Contact', 'Address',
+               'Total_Donations', 'Last_Donation_Date', 'Score']
+
+def donor_groups(blood_group, compatibility=Config.BLOOD_GROUP_COMPATIBILITY):
+    """Groups whose donations can replace blood_group's, short group first
+
+    BLOOD_GROUP_COMPATIBILITY maps recipients to the donor groups they
+    accept; reversed, it gives the recipients each donor group can serve.
+    A group can stand in when it serves every recipient blood_group serves.
+    """
+    serves = {}
+    for recipient, donors in compatibility.items():
+        for donor in donors:
+            serves.setdefault(donor, set()).add(recipient)
+    needed = serves.get(blood_group, set())
+    substitutes = sorted(group for group, recipients in serves.items()
+                         if group != blood_group and recipients >= needed)
+    return [blood_group] + substitutes
+
+def score(group_weight, totals, last_days, local, today, interval):
+    """Score one chunk of candidates from one blood group; returns a float array
+
+    last_days holds date ordinals of the last donation (0 when never).
+    """
+    never = last_days == 0
+    eligible_for = np.where(never, 0, today.toordinal() - last_days - interval)
+    recency = np.where(never, NEVER_DONATED_RECENCY,
+                       np.exp(-np.maximum(eligible_for, 0) / RECENCY_SCALE_DAYS))
+    history = np.minimum(np.log1p(totals) / np.log1p(HISTORY_CAP), 1.0)
+    return (WEIGHTS['recency'] * recency + WEIGHTS['history'] * history
+            + WEIGHTS['location'] * local + WEIGHTS['group'] * group_weight)
+
+def _top(ids, scores, limit):
+    """Keep the limit best candidates (ties go to the lower Donor_ID)"""
+    order = np.lexsort((ids, -scores))[:limit]
+    return ids[order], scores[order]
+
+def rank_donors(cursor, blood_group, location=None, limit=Config.RECALL_CAMPAIGN_SIZE,
+                settings=Config, today=None, chunk_size=CHUNK_SIZE):
+    """Return (donor_ids, scores, eligible) for the best limit donors
+
+    Each donor group is walked in Donor_ID order along idx_donor_blood_group
+    with eligibility filtered in SQL; only the running top list survives
+    between chunks.
+    """
+    today = today or date.today()
+    deferred_since = today - timedelta(days=settings.DONATION_INTERVAL_DAYS)
+    pattern = f"%{location}%" if location else None
+    best_ids, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0)
+    eligible = 0
+    for group in donor_groups(blood_group, settings.BLOOD_GROUP_COMPATIBILITY):
+        group_weight = 1.0 if group == blood_group else SUBSTITUTE_GROUP
+        after_id = 0
+        while True:
+            cursor.execute("""
+                SELECT Donor_ID, Total_Donations, Last_Donation_Date,
+                       CASE WHEN Address LIKE %s THEN 1 ELSE 0 END
+                FROM Donor
+                WHERE Blood_Group = %s AND Donor_ID > %s AND Is_Active = TRUE
+                  AND (Last_Donation_Date IS NULL OR Last_Donation_Date <= %s)
+                ORDER BY Donor_ID
+                LIMIT %s
+            """, (pattern, group, after_id, deferred_since, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            columns = list(zip(*rows))
+            ids = np.array(columns[0], dtype=np.int64)
+            chunk_scores = score(
+                group_weight,
+                np.array(columns[1], dtype=float),
+                np.array([value.toordinal() if value else 0 for value in columns[2]]),
+                np.array(columns[3], dtype=float),
+                today, settings.DONATION_INTERVAL_DAYS)
+            best_ids, best_scores = _top(np.concatenate([best_ids, ids]),
+                                         np.concatenate([best_scores, chunk_scores]), limit)
+            eligible += len(rows)
+            after_id = int(ids[-1])
+    return best_ids, best_scores, eligible
+
+def build_campaign(connection, blood_group, location=None, alert_id=None,
+                   limit=Config.RECALL_CAMPAIGN_SIZE, settings=Config, notify=False, verbose=False):
+    """Rank donors and store the campaign; return its Campaign_ID
+
+    With notify, a text to every listed donor is queued in the same
+    transaction.
+    """
+    cursor = connection.cursor()
+    try:
+        started = time.perf_counter()
+        donor_ids, scores, eligible = rank_donors(cursor, blood_group, location, limit, settings)
+        ranked = time.perf_counter() - started
+
+        cursor.execute("""
+            INSERT INTO Recall_Campaign (Blood_Group, Alert_ID, Location, Donor_Groups,
+                                         Eligible_Donors, Listed_Donors)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (blood_group, alert_id, location,
+              ','.join(donor_groups(blood_group, settings.BLOOD_GROUP_COMPATIBILITY)),
+              eligible, len(donor_ids)))
+        campaign_id = cursor.lastrowid
+        cursor.executemany("""
+            INSERT INTO Recall_Campaign_Donor (Campaign_ID, Call_Rank, Donor_ID, Score)
+            VALUES (%s, %s, %s, %s)
+        """, [(campaign_id, rank, int(donor_id), round(float(value), 4))
+              for rank, (donor_id, value) in enumerate(zip(donor_ids, scores), start=1)])
+        if notify:
+            notifications.notify_campaign(cursor, campaign_id, RECALL_SUBJECT,
+                                          RECALL_MESSAGE.format(blood_group=blood_group))
+        connection.commit()
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    if verbose:
+        print(f"   Campaign {campaign_id} for {blood_group}: {len(donor_ids):,} of "
+              f"{eligible:,} eligible donors listed, ranked in {ranked:.2f}s")
+    return campaign_id
+
+def call_list(cursor, campaign_id, page_size=PAGE_SIZE):
+    """Yield the campaign's call list rows in rank order, a page at a time"""
+    after_rank = 0
+    while True:
+        cursor.execute("""
+            SELECT c.Call_Rank, d.Donor_ID, d.Name, d.Blood_Group, d.Contact, d.Address,
+                   d.Total_Donations, d.Last_Donation_Date, c.Score
+            FROM Recall_Campaign_Donor c
+            JOIN Donor d ON d.Donor_ID = c.Donor_ID
+            WHERE c.Campaign_ID = %s AND c.Call_Rank > %s
+            ORDER BY c.Call_Rank
+            LIMIT %s
+        """, (campaign_id, after_rank, page_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield from rows
+        after_rank = rows[-1][0]
+
+def csv_chunks(rows, rows_per_chunk=1000):
+    """Encode rows as CSV text, header first, in chunks for streaming"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build ranked donor call lists for short blood groups')
+    parser.add_argument('blood_group', nargs='?', help='group to recall for (default: every open alert)')
+    parser.add_argument('--location', help='prefer donors whose address mentions this place')
+    parser.add_argument('--limit', type=int, default=Config.RECALL_CAMPAIGN_SIZE, help='donors to list')
+    parser.add_argument('--csv', help='also write the call list to this file')
+    parser.add_argument('--notify', action='store_true', help='queue a text to every listed donor')
+    args = parser.parse_args(argv)
+    if args.csv and not args.blood_group:
+        parser.error('--csv needs a blood group')
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    try:
+        if args.blood_group:
+            targets = [(args.blood_group, None)]
+        else:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT Blood_Group, Alert_ID FROM Shortage_Alert
+                WHERE Resolved_At IS NULL ORDER BY Projected_Stockout
+            """)
+            targets = cursor.fetchall()
+            cursor.close()
+            connection.commit()
+            if not targets:
+                print("No open shortage alerts")
+        for blood_group, alert_id in targets:
+            campaign_id = build_campaign(connection, blood_group, args.location, alert_id,
+                                         args.limit, notify=args.notify, verbose=True)
+            if args.csv:
+                cursor = connection.cursor()
+                with open(args.csv, 'w', newline='') as f:
+                    for chunk in csv_chunks(call_list(cursor, campaign_id)):
+                        f.write(chunk)
+                cursor.close()
+                print(f"   Call list written to {args.csv}")
+    except Error as e:
+        print(f"Campaign failed: {e}")
+        return 1
+    finally:
+        connection.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Read/write splitting for Blood Bank Management System
+Routes marked read-only take their connection from a read replica, picked
+round-robin or by lowest latency among those lagging at most
+DB_REPLICA_MAX_LAG seconds; failed or lagging replicas are skipped and,
+with none left, reads go to the primary. Replicas are checked at most every
+DB_REPLICA_CHECK_INTERVAL seconds by the request that needs one, so there
+is no background thread to survive a fork.
+
+Replicas are MYSQL_REPLICA_HOSTS on MySQL. On SQLite, SQLITE_REPLICA_PATHS
+name database files that stand in for replicas when testing the routing.
+
+Usage:
+    python replicas.py               # lag, latency and state of every replica
+"""
+
+import argparse
+import itertools
+import sys
+import threading
+import time
+
+import db
+from db import Error
+from config import Config
+
+BALANCING = ('round_robin', 'least_latency')
+
+def replica_addresses(settings):
+    """Configured replicas: host[:port] for MySQL, database paths for SQLite"""
+    if db.backend_name(settings) == 'sqlite':
+        return list(db._setting(settings, 'SQLITE_REPLICA_PATHS', []))
+    return list(db._setting(settings, 'MYSQL_REPLICA_HOSTS', []))
+
+def replica_settings(settings, address):
+    """Connection settings for one replica, with the primary's credentials"""
+    common = {
+        'DB_POOL_SIZE': db._setting(settings, 'DB_POOL_SIZE', 4),
+        'DB_POOL_PING_AFTER': db._setting(settings, 'DB_POOL_PING_AFTER', 30),
+    }
+    if db.backend_name(settings) == 'sqlite':
+        return dict(common, DB_BACKEND='sqlite', SQLITE_PATH=address,
+                    SQLITE_BUSY_TIMEOUT_MS=db._setting(settings, 'SQLITE_BUSY_TIMEOUT_MS', 5000))
+    host, _, port = address.partition(':')
+    return dict(common, DB_BACKEND='mysql', MYSQL_HOST=host,
+                MYSQL_PORT=int(port or db._setting(settings, 'MYSQL_PORT', 3306)),
+                MYSQL_USER=db._setting(settings, 'MYSQL_USER'),
+                MYSQL_PASSWORD=db._setting(settings, 'MYSQL_PASSWORD'),
+                MYSQL_DATABASE=db._setting(settings, 'MYSQL_DATABASE'))
+
+def replica_lag(connection):
+    """Seconds a replica is behind its source (None if replication is stopped)"""
+    if connection.backend == 'sqlite':
+        # Stand-in files are not replicated, so they never fall behind
+        return 0
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SHOW REPLICA STATUS")
+    except Error:
+        cursor.execute("SHOW SLAVE STATUS")
+    status = cursor.fetchone() or {}
+    cursor.close()
+    return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+class Replica:
+    """One read replica with its own connection pool and last known state"""
+
+    # Weight of the newest round trip in the latency average
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self, address, settings):
+        self.address = address
+        self.pool = db.ConnectionPool(settings)
+        self.lag = None
+        self.latency = None
+        self.healthy = False
+        self.checked_at = float('-inf')
+        self.lock = threading.Lock()
+
+    def check(self, max_lag):
+        """Measure lag and round-trip time, and decide whether reads may use it"""
+        started = time.perf_counter()
+        try:
+            conn = self.pool.get()
+            try:
+                self.lag = replica_lag(conn)
+            finally:
+                conn.close()
+        except Error as e:
+            print(f"Replica {self.address} unavailable: {e}")
+            self.lag = None
+            self.healthy = False
+            self.checked_at = time.monotonic()
+            return
+        elapsed = time.perf_counter() - started
+        self.latency = (elapsed if self.latency is None
+                        else self.latency + self.LATENCY_SMOOTHING * (elapsed - self.latency))
+        self.healthy = self.lag is not None and self.lag <= max_lag
+        self.checked_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'address': self.address,
+            'healthy': self.healthy,
+            'lag': self.lag,
+            'latency_ms': round(self.latency * 1000, 3) if self.latency is not None else None,
+            'pool': self.pool.stats(),
+        }
+
+class ReadRouter:
+    """Hands out replica connections for reads, or None to use the primary"""
+
+    def __init__(self, settings):
+        self.balance = db._setting(settings, 'DB_REPLICA_BALANCE', 'round_robin')
+        if self.balance not in BALANCING:
+            raise ValueError(f"DB_REPLICA_BALANCE must be one of {', '.join(BALANCING)}")
+        self.max_lag = float(db._setting(settings, 'DB_REPLICA_MAX_LAG', 5))
+        self.check_interval = float(db._setting(settings, 'DB_REPLICA_CHECK_INTERVAL', 5))
+        self.replicas = [Replica(address, replica_settings(settings, address))
+                         for address in replica_addresses(settings)]
+        self.turn = itertools.count()
+        self.fallbacks = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        for replica in self.replicas:
+            # One request re-checks a stale replica; the others use its last state
+            if now - replica.checked_at >= self.check_interval and replica.lock.acquire(blocking=False):
+                try:
+                    replica.check(self.max_lag)
+                finally:
+                    replica.lock.release()
+
+    def connection(self):
+        """A connection to a usable replica, or None to read from the primary"""
+        if not self.replicas:
+            return None
+        self._refresh()
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if self.balance == 'least_latency':
+            candidates.sort(key=lambda replica: replica.latency)
+        elif candidates:
+            start = next(self.turn) % len(candidates)
+            candidates = candidates[start:] + candidates[:start]
+        for replica in candidates:
+            try:
+                return replica.pool.get()
+            except Error as e:
+                # Skipped until its next check
+                print(f"Replica {replica.address} unavailable: {e}")
+                replica.healthy = False
+        self.fallbacks += 1
+        return None
+
+    def clear(self):
+        """Close every replica's idle connections"""
+        for replica in self.replicas:
+            replica.pool.clear()
+
+    def stats(self):
+        return {'balance': self.balance, 'max_lag': self.max_lag, 'fallbacks': self.fallbacks,
+                'replicas': [replica.stats() for replica in self.replicas]}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Read replica status')
+    parser.parse_args(argv)
+
+    router = ReadRouter(Config)
+    if not router.replicas:
+        print("No read replicas configured (MYSQL_REPLICA_HOSTS / SQLITE_REPLICA_PATHS)")
+        return 0
+    for replica in router.replicas:
+        replica.check(router.max_lag)
+        lag = 'stopped' if replica.lag is None else f"{replica.lag}s"
+        latency = f"{replica.latency * 1000:.1f} ms" if replica.latency is not None else '-'
+        state = 'in use' if replica.healthy else 'skipped'
+        print(f"{replica.address:<40} lag {lag:<9} latency {latency:<10} {state}")
+    router.clear()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Donor search for Blood Bank Management System
+Admins find donors by name, address or contact number without the browser
+loading every donor. Every word of a search must match the start of a word
+in the donor's name or address ("pat river" finds Priya Patel of
+Riverside), through a FULLTEXT index on MySQL and an FTS5 table on SQLite.
+
+Searches that look like a phone number are completed from an in-memory
+sorted array of every donor's contact number. Each process keeps one per
+database; new donors join it every CONTACT_INDEX_REFRESH_SECONDS.
+
+Usage:
+    python search.py patel riverside          # donors matching every word
+    python search.py 90000012 --blood-group O-
+"""
+
+import argparse
+import re
+import sys
+import threading
+import time
+
+import numpy as np
+
+import db
+from db import Error
+from config import Config
+
+COLUMNS = ('Donor_ID', 'Name', 'Age', 'Gender', 'Blood_Group', 'Contact', 'Address',
+           'Registration_Date', 'Total_Donations', 'Total_Blood_Donated')
+# Words of a search used, the rest are ignored
+MAX_WORDS = 8
+# Contacts read per query when loading the index
+PAGE_SIZE = 50000
+# Appended contacts are scanned one by one until this many are merged in
+MERGE_SIZE = 10000
+
+_WORD = re.compile(r'\w+')
+_CONTACT = re.compile(r'^\+?\d[\d ()-]*$')
+
+def is_contact(text):
+    """True if text looks like (the start of) a phone number"""
+    return bool(_CONTACT.match(text.strip()))
+
+def match_expression(backend, text):
+    """Full-text query matching every word of text as a prefix, or None
+
+    Operators typed into the search box are dropped, not interpreted.
+    """
+    words = _WORD.findall(text.lower())[:MAX_WORDS]
+    if not words:
+        return None
+    if backend == 'sqlite':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' '.join(f'+{word}*' for word in words)
+
+def _donor(row):
+    return {
+        'donor_id': row[0],
+        'name': row[1],
+        'age': row[2],
+        'gender': row[3],
+        'blood_group': row[4],
+        'contact': row[5],
+        'address': row[6],
+        'registration_date': row[7].isoformat() if row[7] else None,
+        'total_donations': row[8],
+        'total_blood_donated': float(row[9]),
+    }
+
+class ContactIndex:
+    """Sorted contact numbers of one database's donors, for prefix completion
+
+    Contacts are UTF-8 bytes in a NumPy array, so a million take about 15 MB
+    and a prefix is found with two binary searches. Donors are never deleted
+    and their contact never changes, so the array only grows.
+    """
+
+    def __init__(self, settings=Config):
+        self.refresh_seconds = float(db._setting(settings, 'CONTACT_INDEX_REFRESH_SECONDS', 5))
+        self.refreshed_at = float('-inf')
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self.merged = self._empty()
+        self.pending = self._empty()
+
+    @staticmethod
+    def _empty():
+        return (np.zeros(0, dtype='S1'), np.zeros(0, dtype=np.int64))
+
+    @staticmethod
+    def _combine(first, second):
+        """Both (contacts, ids) pairs in one, sorted by contact"""
+        width = max(first[0].itemsize, second[0].itemsize)
+        contacts, ids = first[0].astype(f'S{width}'), first[1]
+        positions = np.searchsorted(contacts, second[0])
+        return np.insert(contacts, positions, second[0]), np.insert(ids, positions, second[1])
+
+    def _read(self, cursor, after_id):
+        """(contacts, ids) of donors with Donor_ID > after_id, sorted by contact"""
+        contacts, ids = [], []
+        while True:
+            cursor.execute("""
+                SELECT Donor_ID, Contact FROM Donor
+                WHERE Donor_ID > %s
+                ORDER BY Donor_ID
+                LIMIT %s
+            """, (after_id, PAGE_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            ids.extend(row[0] for row in rows)
+            contacts.extend(row[1].encode() for row in rows)
+            after_id = rows[-1][0]
+        if not ids:
+            return self._empty()
+        contacts, ids = np.array(contacts), np.array(ids, dtype=np.int64)
+        order = np.argsort(contacts, kind='stable')
+        return contacts[order], ids[order]
+
+    def refresh(self, cursor):
+        """Add donors registered since the last refresh if it is due"""
+        now = time.monotonic()
+        if now - self.refreshed_at < self.refresh_seconds:
+            return
+        with self.lock:
+            if now - self.refreshed_at < self.refresh_seconds:
+                return
+            donors = self._read(cursor, self.last_id)
+            if len(donors[1]):
+                self.last_id = max(self.last_id, int(donors[1].max()))
+                if not len(self.merged[1]):
+                    self.merged = donors
+                else:
+                    pending = self._combine(self.pending, donors)
+                    if len(pending[1]) >= MERGE_SIZE:
+                        # Swapped in one assignment; queries running meanwhile keep the old array
+                        self.merged, pending = self._combine(self.merged, pending), self._empty()
+                    self.pending = pending
+            self.refreshed_at = now
+
+    def __len__(self):
+        return len(self.merged[1]) + len(self.pending[1])
+
+    def complete(self, prefix, count, after=None):
+        """(contacts, donor_ids) of up to count donors whose contact starts with prefix
+
+        In contact order, starting after the contact `after` when given.
+        """
+        prefix = prefix.encode()
+        start, side = (after.encode(), 'right') if after is not None else (prefix, 'left')
+        found = []
+        for contacts, ids in (self.merged, self.pending):
+            low = np.searchsorted(contacts, start, side=side)
+            # No UTF-8 byte is 0xff, so this sorts after every contact with the prefix
+            high = min(np.searchsorted(contacts, prefix + b'\xff'), low + count)
+            found.append((contacts[low:high], ids[low:high]))
+        contacts, ids = (np.concatenate(arrays) for arrays in zip(*found))
+        order = np.argsort(contacts, kind='stable')[:count]
+        return [contact.decode() for contact in contacts[order]], ids[order]
+
+def _fetch(cursor, ids):
+    """Rows of COLUMNS plus Is_Active for ids, by primary key"""
+    cursor.execute(f"""
+        SELECT {', '.join(COLUMNS)}, Is_Active FROM Donor
+        WHERE Donor_ID IN ({', '.join(['%s'] * len(ids))})
+    """, [int(donor_id) for donor_id in ids])
+    return {row[0]: row for row in cursor.fetchall()}
+
+def _accepts(row, blood_group, min_donations, max_donations):
+    return (row[10] and (blood_group is None or row[4] == blood_group)
+            and (min_donations is None or row[8] >= min_donations)
+            and (max_donations is None or row[8] <= max_donations))
+
+def _by_contact(cursor, index, prefix, limit, blood_group=None, min_donations=None, max_donations=None):
+    """Rows of active donors whose contact starts with prefix, in contact order"""
+    found, after, batch = [], None, limit
+    while len(found) < limit:
+        contacts, ids = index.complete(prefix, batch, after)
+        if not contacts:
+            break
+        # Looked up by primary key and filtered here, so no filter sends
+        # the query down another index
+        rows = _fetch(cursor, ids)
+        found.extend(rows[int(donor_id)] for donor_id in ids
+                     if int(donor_id) in rows
+                     and _accepts(rows[int(donor_id)], blood_group, min_donations, max_donations))
+        if len(contacts) < batch:
+            break
+        # Filters that reject most donors read bigger batches
+        after, batch = contacts[-1], min(batch * 2, PAGE_SIZE)
+    return found[:limit]
+
+def search_donors(cursor, index, text, blood_group=None, min_donations=None, max_donations=None, limit=50):
+    """Active donors matching text and the filters, as dicts, at most limit
+
+    Text that looks like a phone number completes contact numbers, in
+    contact order. Otherwise every word must start a word of the name or
+    address, and matches are listed in Donor_ID order: ranking them by
+    relevance means scoring every match, and "jam" matches 40,000 donors in
+    a million. Without text, donors are listed by name.
+    """
+    text = (text or '').strip()
+    if text and is_contact(text):
+        rows = _by_contact(cursor, index, text, limit, blood_group, min_donations, max_donations)
+        return [_donor(row) for row in rows]
+
+    conditions, params = ['d.Is_Active = TRUE'], []
+    for condition, value in (('d.Blood_Group = %s', blood_group),
+                             ('d.Total_Donations >= %s', min_donations),
+                             ('d.Total_Donations <= %s', max_donations)):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    columns = ', '.join(f'd.{column}' for column in COLUMNS)
+    expression = match_expression(cursor.connection.backend, text)
+    if expression is None:
+        cursor.execute(f"""
+            SELECT {columns} FROM Donor d
+            WHERE {' AND '.join(conditions)}
+            ORDER BY d.Name
+            LIMIT %s
+        """, params + [limit])
+    elif cursor.connection.backend == 'sqlite':
+        # CROSS JOIN keeps the FTS table first; otherwise SQLite may start
+        # from the Is_Active index and look up every active donor
+        cursor.execute(f"""
+            SELECT {columns} FROM Donor_Search CROSS JOIN Donor d ON d.Donor_ID = Donor_Search.rowid
+            WHERE Donor_Search MATCH %s AND {' AND '.join(conditions)}
+            ORDER BY Donor_Search.rowid
+            LIMIT %s
+        """, [expression] + params + [limit])
+    else:
+        cursor.execute(f"""
+            SELECT {columns} FROM Donor d
+            WHERE MATCH (d.Name, d.Address) AGAINST (%s IN BOOLEAN MODE) AND {' AND '.join(conditions)}
+            ORDER BY d.Donor_ID
+            LIMIT %s
+        """, [expression] + params + [limit])
+    return [_donor(row) for row in cursor.fetchall()]
+
+def autocomplete(cursor, index, prefix, k=10):
+    """Up to k active donors whose contact starts with prefix, as dicts"""
+    return [{'donor_id': row[0], 'name': row[1], 'blood_group': row[4], 'contact': row[5]}
+            for row in _by_contact(cursor, index, prefix.strip(), k)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search donors by name, address or contact')
+    parser.add_argument('text', nargs='+', help='words to match, or the start of a contact number')
+    parser.add_argument('--blood-group', choices=list(Config.BLOOD_GROUP_COMPATIBILITY))
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Database connection failed: {e}")
+        return 1
+    cursor = connection.cursor()
+    index = ContactIndex(Config)
+    text = ' '.join(args.text)
+    if is_contact(text):
+        index.refresh(cursor)
+    donors = search_donors(cursor, index, text, args.blood_group, limit=args.limit)
+    cursor.close()
+    connection.close()
+
+    for donor in donors:
+        print(f"#{donor['donor_id']:<8} {donor['name']:<25} {donor['blood_group']:<4} "
+              f"{donor['contact']:<15} {donor['address']}")
+    print(f"{len(donors)} donors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for Blood Bank Management System
+Fills the configured database with realistic volumes of donors, hospitals,
+donations and requests for benchmarks, the index advisor and staging
+
+Usage:
+    python seed_data.py --donors 100000 --hospitals 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import db
+import donor_totals
+import shortage
+from db import Error
+from config import Config
+
+BLOOD_GROUPS = ['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-']
+# Approximate population distribution of the groups above
+BLOOD_GROUP_WEIGHTS = [37, 28, 20, 5, 4, 3, 2, 1]
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+               'Aarav', 'Priya', 'Wei', 'Mei', 'Omar', 'Fatima', 'Carlos', 'Sofia']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Patel', 'Sharma', 'Chen', 'Wang', 'Khan', 'Ali']
+CITIES = ['Downtown City', 'Uptown District', 'Suburb Area', 'Riverside', 'Hillcrest',
+          'Lakeside', 'Old Town', 'Harbor View', 'Greenfield', 'Westbrook']
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Park Ave']
+
+BATCH_SIZE = 5000
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _insert(connection, query, rows):
+    cursor = connection.cursor()
+    count = 0
+    for batch in _batches(rows):
+        cursor.executemany(query, batch)
+        connection.commit()
+        count += len(batch)
+    cursor.close()
+    return count
+
+def _max_id(connection, table, column):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    value = cursor.fetchone()[0]
+    cursor.close()
+    return value
+
+def seed(connection, donors=10000, hospitals=100, donations_per_donor=3.0,
+         requests_per_hospital=200, years=3, rng_seed=42):
+    """Insert synthetic rows and return a dict of counts per table"""
+    rng = random.Random(rng_seed)
+    today = date.today()
+    start = today - timedelta(days=365 * years)
+    span = (today - start).days
+
+    def random_day():
+        return start + timedelta(days=rng.randrange(span))
+
+    def created_at(day):
+        return datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+
+    first_donor = _max_id(connection, 'Donor', 'Donor_ID') + 1
+    donor_groups = rng.choices(BLOOD_GROUPS, BLOOD_GROUP_WEIGHTS, k=donors)
+    donor_rows = (
+        (f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+         rng.randint(18, 65),
+         rng.choice(['Male', 'Female', 'Other']),
+         donor_groups[i],
+         f"9{first_donor + i:09d}",
+         f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+         created_at(random_day()))
+        for i in range(donors)
+    )
+    counts = {'Donor': _insert(connection, """
+        INSERT INTO Donor (Name, Age, Gender, Blood_Group, Contact, Address, Registration_Date)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, donor_rows)}
+
+    first_hospital = _max_id(connection, 'Hospital', 'Hospital_ID') + 1
+    hospital_rows = (
+        (f"{rng.choice(CITIES)} Hospital {first_hospital + i}",
+         rng.choice(CITIES),
+         f"8{first_hospital + i:09d}")
+        for i in range(hospitals)
+    )
+    counts['Hospital'] = _insert(connection, """
+        INSERT INTO Hospital (Name, Location, Contact) VALUES (%s, %s, %s)
+    """, hospital_rows)
+
+    def donation_rows():
+        for _ in range(int(donors * donations_per_donor)):
+            index = rng.randrange(donors)
+            day = random_day()
+            status = rng.choices(['Approved', 'Rejected', 'Pending'], [80, 5, 15])[0]
+            yield (first_donor + index, donor_groups[index], rng.choice([350, 450]),
+                   day, status, created_at(day))
+
+    counts['Donation'] = _insert(connection, """
+        INSERT INTO Donation (Donor_ID, Blood_Group, Quantity, Date, Status, Created_At)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, donation_rows())
+
+    def request_rows():
+        for _ in range(hospitals * requests_per_hospital):
+            day = random_day()
+            status = rng.choices(['Approved', 'Fulfilled', 'Rejected', 'Pending'], [50, 30, 5, 15])[0]
+            yield (first_hospital + rng.randrange(hospitals),
+                   rng.choices(BLOOD_GROUPS, BLOOD_GROUP_WEIGHTS)[0],
+                   rng.choice([100, 200, 350, 450, 900]), day, status, created_at(day))
+
+    counts['Request'] = _insert(connection, """
+        INSERT INTO Request (Hospital_ID, Blood_Group, Quantity, Date, Status, Created_At)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, request_rows())
+
+    # Donor totals are normally maintained by approve_donation
+    donor_totals.verify(connection, fix=True, start_after=first_donor - 1, verbose=False)
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT Blood_Group, Available_Quantity FROM Blood_Inventory")
+    current = dict(cursor.fetchall())
+    for group in BLOOD_GROUPS:
+        level = rng.randint(0, 999)
+        cursor.execute("UPDATE Blood_Inventory SET Available_Quantity = %s WHERE Blood_Group = %s",
+                       (level, group))
+        cursor.execute("""
+            INSERT INTO Inventory_Ledger (Blood_Group, Change_Quantity, Balance, Reason)
+            VALUES (%s, %s, %s, 'adjustment')
+        """, (group, level - current.get(group, 0), level))
+    connection.commit()
+    cursor.close()
+    shortage.refresh_all(connection)
+    return counts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fill the database with synthetic data')
+    parser.add_argument('--donors', type=int, default=10000)
+    parser.add_argument('--hospitals', type=int, default=100)
+    parser.add_argument('--donations-per-donor', type=float, default=3.0)
+    parser.add_argument('--requests-per-hospital', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    args = parser.parse_args(argv)
+
+    try:
+        connection = db.connect(Config)
+    except Error as e:
+        print(f"Error connecting to database: {e}")
+        return 1
+
+    started = time.perf_counter()
+    try:
+        counts = seed(connection, args.donors, args.hospitals, args.donations_per_donor,
+                      args.requests_per_hospital, rng_seed=args.seed)
+    except Error as e:
+        print(f"Seeding failed: {e}")
+        return 1
+    finally:
+        connection.close()
+    for table, count in counts.items():
+        print(f"   {table}: {count:,} rows")
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,8 +7,6 @@ This script helps set up the application for first-time use
 import os
 import sys
 import subprocess
-import mysql.connector
-from mysql.connector import Error
 
 def print_header():
     """Print setup header"""
@@ -48,113 +46,70 @@ def test_database_connection():
     database = input("Database name (blood_bank_db): ") or "blood_bank_db"
     port = input("MySQL Port (3306): ") or "3306"
     
+    # Imported here because they need the dependencies installed above
+    import db
+    import migrations
+    from db import Error
+    
+    settings = {
+        'DB_BACKEND': 'mysql',
+        'MYSQL_HOST': host,
+        'MYSQL_USER': user,
+        'MYSQL_PASSWORD': password,
+        'MYSQL_DATABASE': database,
+        'MYSQL_PORT': int(port),
+    }
+    
     try:
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            port=int(port)
-        )
+        connection = db.connect(settings, use_database=False)
+        print("✅ Database connection successful")
         
-        if connection.is_connected():
-            print("✅ Database connection successful")
-            
-            # Create database if it doesn't exist
-            cursor = connection.cursor()
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
-            print(f"✅ Database '{database}' created/verified")
-            
-            # Import schema
-            print("📋 Importing database schema...")
-            with open('database/schema.sql', 'r') as file:
-                sql_script = file.read()
-            
-            # Split script into individual statements
-            statements = [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]
-            
-            for statement in statements:
-                if statement:
-                    cursor.execute(statement)
-            
-            connection.commit()
-            print("✅ Database schema imported successfully")
-            
-            cursor.close()
-            connection.close()
-            
-            # Update config.py with database settings
-            update_config_file(host, user, password, database, port)
-            
-            return True
+        # Create database if it doesn't exist
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+        cursor.execute(f"USE {database}")
+        cursor.close()
+        print(f"✅ Database '{database}' created/verified")
+        
+        # Apply schema.sql and versioned migrations; re-runs skip applied ones
+        print("📋 Applying database migrations...")
+        migrations.migrate(connection)
+        print("✅ Database schema is up to date")
+        
+        connection.close()
+        
+        # Save database settings for config.py
+        update_config_file(host, user, password, database, port)
+        
+        return True
             
     except Error as e:
-        print(f"❌ Database connection failed: {e}")
+        print(f"❌ Database setup failed: {e}")
         return False
 
 def update_config_file(host, user, password, database, port):
-    """Update config.py with database settings"""
+    """Write database settings to .env, which config.py loads on startup"""
     print("\n⚙️ Updating configuration...")
     
-    config_content = f'''"""
-Configuration file for Blood Bank Management System
-Contains database configuration and application settings
-"""
-
-import os
-from datetime import timedelta
-
-class Config:
-    """Base configuration class"""
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
-    
-    # Database configuration
-    MYSQL_HOST = os.environ.get('MYSQL_HOST') or '{host}'
-    MYSQL_USER = os.environ.get('MYSQL_USER') or '{user}'
-    MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or '{password}'
-    MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or '{database}'
-    MYSQL_PORT = int(os.environ.get('MYSQL_PORT') or {port})
-    
-    # Session configuration
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
-    
-    # Application settings
-    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
-    
-    # Blood bank specific settings
-    MAX_DONATION_QUANTITY = 500  # Maximum blood donation in ml
-    MIN_DONOR_AGE = 18
-    MAX_DONOR_AGE = 65
-    
-    # Blood group compatibility for inventory management
-    BLOOD_GROUP_COMPATIBILITY = {{
-        'A+': ['A+', 'A-', 'O+', 'O-'],
-        'A-': ['A-', 'O-'],
-        'B+': ['B+', 'B-', 'O+', 'O-'],
-        'B-': ['B-', 'O-'],
-        'AB+': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'],
-        'AB-': ['A-', 'B-', 'AB-', 'O-'],
-        'O+': ['O+', 'O-'],
-        'O-': ['O-']
-    }}
-
-class DevelopmentConfig(Config):
-    """Development configuration"""
-    DEBUG = True
-
-class ProductionConfig(Config):
-    """Production configuration"""
-    DEBUG = False
-
-# Configuration dictionary
-config = {{
-    'development': DevelopmentConfig,
-    'production': ProductionConfig,
-    'default': DevelopmentConfig
-}}
-'''
-    
-    with open('config.py', 'w') as file:
-        file.write(config_content)
+    settings = {
+        'DB_BACKEND': 'mysql',
+        'MYSQL_HOST': host,
+        'MYSQL_USER': user,
+        'MYSQL_PASSWORD': password,
+        'MYSQL_DATABASE': database,
+        'MYSQL_PORT': port,
+    }
+    
+    # Keep any other settings already present in .env
+    lines = []
+    if os.path.exists('.env'):
+        with open('.env') as file:
+            lines = [line for line in file.read().splitlines()
+                     if line.split('=', 1)[0].strip() not in settings]
+    lines.extend(f"{key}={value}" for key, value in settings.items())
+    
+    with open('.env', 'w') as file:
+        file.write("\n".join(lines) + "\n")
     
     print("✅ Configuration updated successfully")
 
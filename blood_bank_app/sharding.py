@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Multi-site sharding for Blood Bank Management System
+Each regional blood bank (site) keeps its own database with the full
+schema - its own inventory, donors, hospitals and requests - and sites are
+spread over one or more database servers. SITES maps site ids to databases:
+
+    SITES=north=db1:3306/blood_north,south=db1:3306/blood_south,east=db2/blood_east
+
+(database file paths with the SQLite backend). Requests use the site of the
+signed-in user; cross-site views query every site at once, give each
+SHARD_QUERY_TIMEOUT seconds and report the sites that did not answer.
+
+Usage:
+    python sharding.py               # configured sites and whether they answer
+    python sharding.py --migrate     # create and migrate every site's database
+"""
+
+import argparse
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import db
+from db import Error
+from config import Config
+
+_SITE_ID = re.compile(r'^\w+$')
+
+def parse_sites(value):
+    """{site_id: address} from 'site=address,...', in the configured order"""
+    sites = {}
+    for entry in (value or '').split(','):
+        if not entry.strip():
+            continue
+        site_id, _, address = (part.strip() for part in entry.partition('='))
+        if not _SITE_ID.match(site_id) or not address:
+            raise ValueError(f"Invalid SITES entry '{entry.strip()}', expected site=address")
+        sites[site_id] = address
+    return sites
+
+def site_settings(settings, address):
+    """Connection settings for one site's database, with the primary's credentials"""
+    common = {
+        'DB_POOL_SIZE': db._setting(settings, 'DB_POOL_SIZE', 4),
+        'DB_POOL_PING_AFTER': db._setting(settings, 'DB_POOL_PING_AFTER', 30),
+    }
+    if db.backend_name(settings) == 'sqlite':
+        return dict(common, DB_BACKEND='sqlite', SQLITE_PATH=address,
+                    SQLITE_BUSY_TIMEOUT_MS=db._setting(settings, 'SQLITE_BUSY_TIMEOUT_MS', 5000))
+    server, _, database = address.partition('/')
+    host, _, port = server.partition(':')
+    return dict(common, DB_BACKEND='mysql', MYSQL_HOST=host,
+                MYSQL_PORT=int(port or db._setting(settings, 'MYSQL_PORT', 3306)),
+                MYSQL_USER=db._setting(settings, 'MYSQL_USER'),
+                MYSQL_PASSWORD=db._setting(settings, 'MYSQL_PASSWORD'),
+                MYSQL_DATABASE=database or db._setting(settings, 'MYSQL_DATABASE'))
+
+def site_config(settings, site_id):
+    """settings with site_id's database in place of the primary
+
+    A Config class gives a subclass, so modules reading settings.NAME see
+    the site's database and every other setting unchanged. Sites have no
+    read replicas of their own.
+    """
+    sites = parse_sites(db._setting(settings, 'SITES', ''))
+    if site_id not in sites:
+        raise ValueError(f"Unknown site '{site_id}'; SITES has {', '.join(sites) or 'none'}")
+    overrides = dict(site_settings(settings, sites[site_id]), MYSQL_REPLICA_HOSTS=[], SQLITE_REPLICA_PATHS=[])
+    if isinstance(settings, dict):
+        return dict(settings, **overrides)
+    return type(f"{site_id.title()}{settings.__name__}", (settings,), overrides)
+
+def add_site_argument(parser):
+    """--site for command-line tools that work on one database at a time"""
+    parser.add_argument('--site', action='append', dest='sites', metavar='SITE_ID',
+                        help='only this site (repeatable); every site in SITES by default')
+
+def site_configs(settings, site_ids=None):
+    """[(site_id, settings)] for a command to run on
+
+    The sites named in site_ids, or every site in SITES; without SITES,
+    [(None, settings)] for the one database.
+    """
+    sites = parse_sites(db._setting(settings, 'SITES', ''))
+    if not sites:
+        if site_ids:
+            raise ValueError("--site needs SITES to be set")
+        return [(None, settings)]
+    return [(site_id, site_config(settings, site_id)) for site_id in (site_ids or sites)]
+
+def run_on_sites(sites, task, failure):
+    """Run task(connection, settings) on each of sites, one after another
+
+    A site that cannot be reached or whose task fails with a database error
+    does not stop the others. Returns the exit status: 1 if any failed.
+    """
+    failed = 0
+    for site_id, settings in sites:
+        if site_id is not None:
+            print(f"Site {site_id}:")
+        try:
+            connection = db.connect(settings)
+        except Error as e:
+            print(f"Error connecting to database: {e}")
+            failed += 1
+            continue
+        try:
+            task(connection, settings)
+        except Error as e:
+            print(f"{failure}: {e}")
+            failed += 1
+        finally:
+            connection.close()
+    return 1 if failed else 0
+
+class ShardMap:
+    """Connection pools of every site and a thread pool to query them together
+
+    Threads are only started by the first fan_out(), so a map built before
+    a fork has none to lose.
+    """
+
+    def __init__(self, settings):
+        self.sites = parse_sites(db._setting(settings, 'SITES', ''))
+        self.pools = {site_id: db.ConnectionPool(site_settings(settings, address))
+                      for site_id, address in self.sites.items()}
+        self.default = next(iter(self.sites), None)
+        self.timeout = float(db._setting(settings, 'SHARD_QUERY_TIMEOUT', 5))
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, min(len(self.sites), int(db._setting(settings, 'SHARD_FANOUT_WORKERS', 8)))),
+            thread_name_prefix='shard')
+
+    def fan_out(self, query):
+        """Run query(cursor) on every site in parallel
+
+        Returns ({site_id: result}, {site_id: error}). A site that has not
+        answered within the timeout is reported as timed out; its query
+        still runs to completion on its thread and returns the connection.
+        """
+        started = time.monotonic()
+        futures = {site_id: self.executor.submit(self._run, site_id, query) for site_id in self.sites}
+        results, errors = {}, {}
+        for site_id, future in futures.items():
+            try:
+                results[site_id] = future.result(timeout=max(0, started + self.timeout - time.monotonic()))
+            except FutureTimeout:
+                errors[site_id] = f'no answer within {self.timeout:g}s'
+            except Error as e:
+                errors[site_id] = str(e)
+        return results, errors
+
+    def _run(self, site_id, query):
+        conn = self.pools[site_id].get()
+        try:
+            cursor = conn.cursor()
+            try:
+                return query(cursor)
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    def clear(self):
+        """Close every site's idle connections"""
+        for pool in self.pools.values():
+            pool.clear()
+
+def _create_database(settings):
+    if settings['DB_BACKEND'] != 'mysql':
+        return
+    connection = db.connect(settings, use_database=False)
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {settings['MYSQL_DATABASE']}")
+    cursor.close()
+    connection.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Multi-site databases')
+    parser.add_argument('--migrate', action='store_true', help="create and migrate every site's database")
+    args = parser.parse_args(argv)
+
+    import migrations
+
+    shards = ShardMap(Config)
+    if not shards.sites:
+        print("Single-site mode (SITES is not set)")
+        return 0
+    if args.migrate:
+        failed = 0
+        for site_id, address in shards.sites.items():
+            settings = site_settings(Config, address)
+            try:
+                _create_database(settings)
+                connection = db.connect(settings)
+                try:
+                    count = migrations.migrate(connection, verbose=False)
+                finally:
+                    connection.close()
+                print(f"{site_id:<16} {address:<40} {count} migration(s) applied")
+            except Error as e:
+                failed += 1
+                print(f"{site_id:<16} {address:<40} failed: {e}")
+        return 1 if failed else 0
+
+    def count_donors(cursor):
+        cursor.execute("SELECT COUNT(*) FROM Donor WHERE Is_Active = TRUE")
+        return cursor.fetchone()[0]
+
+    results, errors = shards.fan_out(count_donors)
+    for site_id, address in shards.sites.items():
+        state = f"{results[site_id]:,} active donors" if site_id in results else f"unavailable: {errors[site_id]}"
+        print(f"{site_id:<16} {address:<40} {state}")
+    shards.clear()
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Shortage thresholds for Blood Bank Management System
+Classifies each blood group by days of supply - current stock divided by
+the average daily consumption over a rolling SHORTAGE_WINDOW_DAYS window -
+and raises a Shortage_Alert when the projected stockout is near
+
+The window total lives in Blood_Group_Status and is adjusted on every
+inventory change: today's consumption is added and days that slid out of
+the window are subtracted, so no request history is re-read.
+
+Usage:
+    python shortage.py               # advance all windows and print status (run daily)
+"""
+
+import argparse
+import sys
+from collections import namedtuple
+from datetime import date, timedelta
+from decimal import Decimal
+
+import db
+import sharding
+from db import Error
+from config import Config
+
+GroupStatus = namedtuple('GroupStatus', ['blood_group', 'available', 'daily_rate',
+                                         'days_of_supply', 'status', 'alert_id'])
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+def classify(available, days_of_supply, settings=Config):
+    """Map stock and days of supply to Critical/Low/Moderate/Good"""
+    if available <= 0:
+        return 'Critical'
+    if days_of_supply is None:
+        return 'Good'
+    if days_of_supply < settings.SHORTAGE_CRITICAL_DAYS:
+        return 'Critical'
+    if days_of_supply < settings.SHORTAGE_LOW_DAYS:
+        return 'Low'
+    if days_of_supply < settings.SHORTAGE_MODERATE_DAYS:
+        return 'Moderate'
+    return 'Good'
+
+def _window_sum(cursor, blood_group, after, through):
+    """Consumption for days in (after, through]"""
+    cursor.execute("""
+        SELECT COALESCE(SUM(Quantity), 0) FROM Daily_Consumption
+        WHERE Blood_Group = %s AND Day > %s AND Day <= %s
+    """, (blood_group, after, through))
+    return Decimal(str(cursor.fetchone()[0]))
+
+def evaluate(cursor, blood_group, available, consumed=0, settings=Config, today=None):
+    """Update one group's window, status and alert after a stock change
+
+    Runs inside the caller's transaction, which must hold the group's
+    Blood_Inventory row lock (update_blood_inventory does). consumed is the
+    volume issued to hospitals by this change. Costs a constant number of
+    single-row statements; advancing the window reads at most one window of
+    Daily_Consumption rows, and only on the first change of a day.
+    """
+    today = today or date.today()
+    window = settings.SHORTAGE_WINDOW_DAYS
+    available = Decimal(str(available))
+    consumed = Decimal(str(consumed))
+
+    cursor.execute("""
+        SELECT Window_End, Consumed_In_Window, Open_Alert_ID
+        FROM Blood_Group_Status WHERE Blood_Group = %s
+    """, (blood_group,))
+    row = cursor.fetchone()
+    if row is None:
+        in_window = _window_sum(cursor, blood_group, today - timedelta(days=window), today)
+        alert_id = None
+    else:
+        window_end, in_window, alert_id = _as_date(row[0]), Decimal(str(row[1])), row[2]
+        if window_end < today:
+            expired_through = min(today, window_end + timedelta(days=window)) - timedelta(days=window)
+            in_window -= _window_sum(cursor, blood_group, window_end - timedelta(days=window),
+                                     expired_through)
+        elif window_end > today:
+            # Clock moved backwards; start the window again from scratch
+            in_window = _window_sum(cursor, blood_group, today - timedelta(days=window), today)
+
+    if consumed:
+        cursor.execute("""
+            INSERT INTO Daily_Consumption (Blood_Group, Day, Quantity) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE Quantity = Quantity + VALUES(Quantity)
+        """, (blood_group, today, consumed))
+        in_window += consumed
+    in_window = max(in_window, Decimal(0))
+
+    daily_rate = in_window / window
+    days_of_supply = round(available / daily_rate, 2) if daily_rate > 0 else None
+    status = classify(available, days_of_supply, settings)
+
+    shortage = available <= 0 or (days_of_supply is not None
+                                  and days_of_supply <= settings.SHORTAGE_ALERT_HORIZON_DAYS)
+    stockout = today + timedelta(days=int(days_of_supply or 0)) if shortage else None
+    if shortage and alert_id is None:
+        cursor.execute("""
+            INSERT INTO Shortage_Alert (Blood_Group, Status, Available_Quantity,
+                                        Days_Of_Supply, Projected_Stockout)
+            VALUES (%s, %s, %s, %s, %s)
+        """, (blood_group, status, available, days_of_supply, stockout))
+        alert_id = cursor.lastrowid
+    elif shortage:
+        cursor.execute("""
+            UPDATE Shortage_Alert SET Status = %s, Available_Quantity = %s,
+                                      Days_Of_Supply = %s, Projected_Stockout = %s
+            WHERE Alert_ID = %s
+        """, (status, available, days_of_supply, stockout, alert_id))
+    elif alert_id is not None:
+        cursor.execute("UPDATE Shortage_Alert SET Resolved_At = NOW() WHERE Alert_ID = %s", (alert_id,))
+        alert_id = None
+
+    cursor.execute("""
+        INSERT INTO Blood_Group_Status (Blood_Group, Window_End, Consumed_In_Window,
+                                        Available_Quantity, Daily_Rate, Days_Of_Supply,
+                                        Status, Open_Alert_ID)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE Window_End = VALUES(Window_End),
+                                Consumed_In_Window = VALUES(Consumed_In_Window),
+                                Available_Quantity = VALUES(Available_Quantity),
+                                Daily_Rate = VALUES(Daily_Rate),
+                                Days_Of_Supply = VALUES(Days_Of_Supply),
+                                Status = VALUES(Status),
+                                Open_Alert_ID = VALUES(Open_Alert_ID)
+    """, (blood_group, today, in_window, available, round(daily_rate, 2), days_of_supply,
+          status, alert_id))
+    return GroupStatus(blood_group, available, daily_rate, days_of_supply, status, alert_id)
+
+def refresh_all(connection, settings=Config, today=None):
+    """Advance every group's window to today; O(groups)
+
+    Days pass without inventory changes, so this runs daily to let old
+    consumption leave the window and statuses recover on their own.
+    """
+    cursor = connection.cursor()
+    statuses = []
+    try:
+        cursor.execute("SELECT Blood_Group FROM Blood_Inventory ORDER BY Blood_Group")
+        blood_groups = [row[0] for row in cursor.fetchall()]
+        connection.commit()
+        for blood_group in blood_groups:
+            connection.begin()
+            cursor.execute("""
+                SELECT Available_Quantity FROM Blood_Inventory
+                WHERE Blood_Group = %s FOR UPDATE
+            """, (blood_group,))
+            available = cursor.fetchone()[0]
+            statuses.append(evaluate(cursor, blood_group, available, settings=settings, today=today))
+            connection.commit()
+    except Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return statuses
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Recompute days of supply and shortage alerts')
+    sharding.add_site_argument(parser)
+    args = parser.parse_args(argv)
+    try:
+        sites = sharding.site_configs(Config, args.sites)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def refresh_site(connection, settings):
+        for item in refresh_all(connection, settings):
+            supply = f"{item.days_of_supply} days" if item.days_of_supply is not None else 'no recent use'
+            alert = f"  ALERT #{item.alert_id}" if item.alert_id else ''
+            print(f"   {item.blood_group:<4} {item.available:>10} ml  {supply:<16} {item.status}{alert}")
+
+    return sharding.run_on_sites(sites, refresh_site, 'Shortage refresh failed')
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -172,11 +172,26 @@ function initializeRealTimeUpdates() {
  * Check for updates
  */
 function checkForUpdates() {
-    // This would make an AJAX call to check for updates
-    // For now, we'll just update the last seen time
     updateLastSeenTime();
+    
+    // Refresh stock cards; the browser revalidates with If-None-Match and
+    // an unchanged inventory comes back as 304
+    if (!document.querySelector('[data-blood-group]')) return;
+    fetch('/api/inventory', { cache: 'no-cache', headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            const etag = response.headers.get('ETag');
+            if (!response.ok || (etag && etag === lastInventoryETag)) return null;
+            lastInventoryETag = etag;
+            return response.json();
+        })
+        .then(data => {
+            if (data && data.success) updateInventoryDisplay(data.inventory);
+        })
+        .catch(error => console.error('Inventory update failed:', error));
 }
 
+let lastInventoryETag = null;
+
 /**
  * Setup WebSocket connection
  */
@@ -421,14 +436,31 @@ function updateInventoryDisplay(inventory) {
                 quantityElement.textContent = `${item.quantity} ml`;
             }
             
-            // Update status class
-            card.className = `blood-group-card ${getInventoryStatus(item.quantity)}`;
+            // Update status text and colours
+            const status = item.status || getInventoryStatus(item.quantity);
+            const statusElement = card.querySelector('.status');
+            if (statusElement) {
+                statusElement.textContent = status;
+            }
+            const style = statusStyles[status.charAt(0).toUpperCase() + status.slice(1)];
+            if (style) {
+                const icon = card.querySelector('.bi-droplet-fill');
+                Object.values(statusStyles).forEach(old => {
+                    card.classList.remove(`border-${old}`, `bg-${old}`);
+                    if (icon) icon.classList.remove(`text-${old}`);
+                });
+                card.classList.add(`border-${style}`, `bg-${style}`);
+                if (icon) icon.classList.add(`text-${style}`);
+            }
         }
     });
 }
 
+// Bootstrap colour per stock status (matches status_styles in app.py)
+const statusStyles = { Critical: 'danger', Low: 'warning', Moderate: 'info', Good: 'success' };
+
 /**
- * Get inventory status class
+ * Get inventory status class (fallback when the server sends no status)
  */
 function getInventoryStatus(quantity) {
     if (quantity === 0) return 'critical';
@@ -647,6 +679,37 @@ function exportTableData(tableId, filename) {
     downloadCSV(data, filename);
 }
 
+/**
+ * POST form data with an Idempotency-Key header
+ * The key stays on the form until the server answers, so network failures
+ * are retried - and a resubmit after one is replayed - without creating a
+ * second record. Editing the form starts a new key.
+ */
+function postForm(url, form, formData, retries = 2) {
+    if (!form.dataset.idempotencyKey) {
+        form.dataset.idempotencyKey = window.crypto && crypto.randomUUID
+            ? crypto.randomUUID()
+            : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        form.addEventListener('input', () => delete form.dataset.idempotencyKey, { once: true });
+    }
+    const key = form.dataset.idempotencyKey;
+    
+    const attempt = remaining => fetch(url, {
+        method: 'POST',
+        headers: { 'Idempotency-Key': key },
+        body: formData || new FormData(form)
+    }).catch(error => {
+        if (remaining <= 0) throw error;
+        return new Promise(resolve => setTimeout(resolve, 1000 * (retries - remaining + 1)))
+            .then(() => attempt(remaining - 1));
+    });
+    
+    return attempt(retries).then(response => {
+        delete form.dataset.idempotencyKey;
+        return response;
+    });
+}
+
 // Export functions for global use
 window.BloodBankApp = {
     showNotification,
@@ -655,5 +718,6 @@ window.BloodBankApp = {
     exportTableData,
     formatNumber,
     formatDate,
-    formatTime
+    formatTime,
+    postForm
 };
@@ -6,6 +6,7 @@ This script tests the database connection and configuration
 
 from app import get_db_connection
 from config import config
+import db
 
 def test_connection():
     """Test database connection"""
@@ -14,6 +15,9 @@ def test_connection():
     print("=" * 60)
     
     print("\nCurrent Configuration:")
+    print(f"   Backend: {config['development'].DB_BACKEND}")
+    if config['development'].DB_BACKEND == 'sqlite':
+        print(f"   Path: {config['development'].SQLITE_PATH}")
     print(f"   Host: {config['development'].MYSQL_HOST}")
     print(f"   User: {config['development'].MYSQL_USER}")
     print(f"   Password: {'*' * len(config['development'].MYSQL_PASSWORD) if config['development'].MYSQL_PASSWORD else '(empty)'}")
@@ -27,22 +31,17 @@ def test_connection():
         print("Connection successful!")
         
         try:
-            cursor = connection.cursor()
-            cursor.execute("SELECT DATABASE()")
-            current_db = cursor.fetchone()[0]
+            current_db = db.current_database(connection, config['development'])
             print(f"   Current database: {current_db}")
             
-            cursor.execute("SELECT VERSION()")
-            version = cursor.fetchone()[0]
-            print(f"   MySQL version: {version}")
+            version = db.server_version(connection)
+            print(f"   Server version: {version}")
             
-            cursor.execute("SHOW TABLES")
-            tables = cursor.fetchall()
+            tables = db.list_tables(connection)
             print(f"   Tables found: {len(tables)}")
             if tables:
-                print("   Tables:", ", ".join([t[0] for t in tables]))
+                print("   Tables:", ", ".join(tables))
             
-            cursor.close()
             connection.close()
             
             print("\nAll tests passed!")
@@ -56,7 +55,7 @@ def test_connection():
             return False
     else:
         print("\nConnection failed!")
-        print("Please check your MySQL configuration and ensure:")
+        print("Please check your database configuration and ensure:")
         print("   1. MySQL server is running")
         print("   2. Database credentials in .env are correct")
         print("   3. Database 'blood_bank_db' exists")
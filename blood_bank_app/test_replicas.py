@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test read/write splitting script
+Routes the app's reads across two SQLite stand-in replicas (see
+SQLITE_REPLICA_PATHS) next to a primary, in a throwaway directory, and
+checks round-robin balancing, read-your-writes after add_request and the
+fallback to the primary when replicas fail or lag. Each database holds a
+different O- stock, which tells where a read was answered.
+
+Usage:
+    python test_replicas.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import db
+import migrations
+
+# O- stock in each database, as read back through /api/v1/inventory/O-
+PRIMARY, REPLICA_1, REPLICA_2 = 100, 201, 202
+
+def make_site(workdir):
+    """The app on a primary and two stand-in replicas; returns (app module, hospital client)"""
+    import app as site
+    paths = [os.path.join(workdir, f"{name}.db") for name in ('primary', 'replica1', 'replica2')]
+    for path, stock in zip(paths, (PRIMARY, REPLICA_1, REPLICA_2)):
+        connection = db.connect({'DB_BACKEND': 'sqlite', 'SQLITE_PATH': path})
+        migrations.migrate(connection, verbose=False)
+        cursor = connection.cursor()
+        cursor.execute("UPDATE Blood_Inventory SET Available_Quantity = %s WHERE Blood_Group = 'O-'", (stock,))
+        connection.commit()
+        cursor.close()
+        connection.close()
+    # Per-process resources are rebuilt from these settings, whatever the
+    # environment was when the app was first imported
+    site.app.config.update(DB_BACKEND='sqlite', SQLITE_PATH=paths[0], SQLITE_REPLICA_PATHS=paths[1:],
+                           DB_REPLICA_BALANCE='round_robin', DB_REPLICA_CHECK_INTERVAL=0,
+                           DB_READ_YOUR_WRITES_SECONDS=15, SITES={})
+    site.init_process(site.app)
+    site.rate_limiter.limits.clear()
+    client = site.app.test_client()
+    with client.session_transaction() as session:
+        session.update({'user_id': 1, 'username': '555-0101', 'role': 'hospital'})
+    return site, client
+
+def read_stock(client):
+    response = client.get('/api/v1/inventory/O-?fields=quantity')
+    assert response.status_code == 200, response.data
+    return response.json['inventory']['quantity']
+
+def with_site(test):
+    """Run test(site, client, workdir) on a fresh primary and replicas"""
+    workdir = tempfile.mkdtemp(prefix='blood_bank_replicas_')
+    try:
+        site, client = make_site(workdir)
+        try:
+            test(site, client, workdir)
+        finally:
+            site.db_pool.clear()
+            site.read_router.clear()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def test_round_robin():
+    def check(site, client, workdir):
+        reads = [read_stock(client) for _ in range(6)]
+        assert sorted(set(reads)) == [REPLICA_1, REPLICA_2], reads
+        assert all(a != b for a, b in zip(reads, reads[1:])), f"not alternating: {reads}"
+        assert site.read_router.fallbacks == 0
+    with_site(check)
+
+def test_read_your_writes():
+    def check(site, client, workdir):
+        assert read_stock(client) in (REPLICA_1, REPLICA_2)
+        response = client.post('/add_request', data={'blood_group': 'O-', 'quantity': '450',
+                                                      'date': '2026-01-05'})
+        assert response.json['success'], response.json
+        request_id = response.json['request_id']
+        # The request exists on the primary only, and the session keeps reading there
+        assert read_stock(client) == PRIMARY
+        response = client.get('/api/v1/requests?fields=status')
+        assert request_id in [item['id'] for item in response.json['requests']], response.json
+        # Another session is not held to the primary
+        other = site.app.test_client()
+        with other.session_transaction() as session:
+            session.update({'user_id': 1, 'username': '555-0101', 'role': 'hospital'})
+        assert read_stock(other) in (REPLICA_1, REPLICA_2)
+        # Back to the replicas once they may have caught up
+        site.app.config['DB_READ_YOUR_WRITES_SECONDS'] = 0
+        assert read_stock(client) in (REPLICA_1, REPLICA_2)
+    with_site(check)
+
+def test_fallback():
+    def check(site, client, workdir):
+        # A replica that cannot be opened is skipped
+        site.read_router.clear()
+        replica2 = os.path.join(workdir, 'replica2.db')
+        os.rename(replica2, replica2 + '.away')
+        os.mkdir(replica2)
+        assert {read_stock(client) for _ in range(4)} == {REPLICA_1}
+        # With both gone, reads go to the primary
+        site.read_router.clear()
+        replica1 = os.path.join(workdir, 'replica1.db')
+        os.rename(replica1, replica1 + '.away')
+        os.mkdir(replica1)
+        assert read_stock(client) == PRIMARY
+        assert site.read_router.fallbacks >= 1
+        # Replicas come back at their next check
+        for path in (replica1, replica2):
+            os.rmdir(path)
+            os.rename(path + '.away', path)
+        assert {read_stock(client) for _ in range(4)} == {REPLICA_1, REPLICA_2}
+        # Replicas lagging more than DB_REPLICA_MAX_LAG are skipped too
+        site.read_router.max_lag = -1
+        assert read_stock(client) == PRIMARY
+    with_site(check)
+
+def main():
+    print("=" * 60)
+    print("Testing read/write splitting")
+    print("=" * 60)
+    failed = 0
+    for test in (test_round_robin, test_read_your_writes, test_fallback):
+        try:
+            test()
+            print(f"   {test.__name__}: ok")
+        except AssertionError as e:
+            failed += 1
+            print(f"   {test.__name__}: FAILED {e}")
+    print("\nAll tests passed!" if not failed else f"\n{failed} failed")
+    print("=" * 60)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Inter-site transfer planning for Blood Bank Management System
+Every site keeps TRANSFER_COVER_DAYS of its forecast demand for each blood
+group; what it holds beyond that, in whole TRANSFER_UNIT_ML units, can go
+to sites holding less. For each group the cheapest set of transfers is
+found by solving the transportation problem - travel minutes per unit
+between sites as costs - with the transportation simplex (MODI) in NumPy.
+Demand that no surplus can reach is reported as a shortfall.
+
+Travel minutes come from TRANSFER_COSTS_FILE, CSV rows of
+from_site,to_site,minutes (used both ways unless the reverse row is given);
+pairs missing from the file are never used. Without the file every pair of
+sites costs the same.
+
+Usage:
+    python transfers.py                       # plan from every site's current stock
+    python transfers.py --cover-days 10 --csv plan.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+import db
+import sharding
+from config import Config
+from forecasting import BLOOD_GROUPS
+
+Transfer = namedtuple('Transfer', ['blood_group', 'from_site', 'to_site', 'units', 'quantity', 'minutes'])
+Plan = namedtuple('Plan', ['transfers', 'shortfalls', 'total_minutes'])
+
+def site_position(cursor):
+    """{blood_group: (stock, daily demand)} of one site
+
+    Daily demand is the forecast level for all hospitals, or the recent
+    consumption rate where no forecast has been made yet.
+    """
+    cursor.execute("""
+        SELECT i.Blood_Group, i.Available_Quantity, COALESCE(f.Daily_Level, s.Daily_Rate, 0)
+        FROM Blood_Inventory i
+        LEFT JOIN Demand_Forecast f ON f.Blood_Group = i.Blood_Group AND f.Hospital_ID = 0
+        LEFT JOIN Blood_Group_Status s ON s.Blood_Group = i.Blood_Group
+    """)
+    return {blood_group: (float(stock), float(daily)) for blood_group, stock, daily in cursor.fetchall()}
+
+def load_costs(path, sites):
+    """Travel minutes between sites as a matrix; inf where transfers are not possible"""
+    index = {site_id: i for i, site_id in enumerate(sites)}
+    if not path or not os.path.exists(path):
+        costs = np.ones((len(sites), len(sites)))
+    else:
+        costs = np.full((len(sites), len(sites)), np.inf)
+        given = set()
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0].startswith('#') or row[0] == 'from_site':
+                    continue
+                origin, destination = index.get(row[0].strip()), index.get(row[1].strip())
+                if origin is None or destination is None:
+                    continue
+                costs[origin, destination] = float(row[2])
+                given.add((origin, destination))
+                if (destination, origin) not in given:
+                    costs[destination, origin] = float(row[2])
+    np.fill_diagonal(costs, 0)
+    return costs
+
+def balances(stock, daily_demand, cover_days, unit_ml):
+    """Whole units each site can give (positive) or needs (negative)"""
+    cover = daily_demand * cover_days
+    spare = np.floor((stock - cover) / unit_ml)
+    missing = np.ceil((cover - stock) / unit_ml)
+    return np.where(stock >= cover, spare, -missing).astype(np.int64)
+
+def _potentials(basis, cost):
+    """u, v with u[i] + v[j] = cost[i, j] on every basic cell (the basis is a spanning tree)"""
+    m, n = cost.shape
+    row_cells, col_cells = [[] for _ in range(m)], [[] for _ in range(n)]
+    for i, j in zip(*np.nonzero(basis)):
+        row_cells[i].append(j)
+        col_cells[j].append(i)
+    u, v = np.full(m, np.nan), np.full(n, np.nan)
+    u[0] = 0.0
+    rows = [0]
+    while rows:
+        i = rows.pop()
+        for j in row_cells[i]:
+            if np.isnan(v[j]):
+                v[j] = cost[i, j] - u[i]
+                for k in col_cells[j]:
+                    if np.isnan(u[k]):
+                        u[k] = cost[k, j] - v[j]
+                        rows.append(k)
+    return u, v, row_cells, col_cells
+
+def _cycle(row_cells, col_cells, i, j):
+    """Cells of the cycle the entering cell (i, j) closes, entering cell first
+
+    Walks the basis tree from row i to column j; along the cycle the cells
+    alternately gain and lose flow, starting with a gain at (i, j).
+    """
+    parent = {('r', i): None}
+    frontier = [('r', i)]
+    while ('c', j) not in parent:
+        kind, index = frontier.pop()
+        neighbours = (('c', k) for k in row_cells[index]) if kind == 'r' else (('r', k) for k in col_cells[index])
+        for node in neighbours:
+            if node not in parent:
+                parent[node] = (kind, index)
+                frontier.append(node)
+    cells = [(i, j)]
+    node = ('c', j)
+    while parent[node] is not None:
+        previous = parent[node]
+        # The edge between a row node and a column node is the cell (row, column)
+        cells.append((node[1], previous[1]) if node[0] == 'r' else (previous[1], node[1]))
+        node = previous
+    return cells
+
+def solve_transportation(supply, demand, cost, max_iterations=100000):
+    """Minimum-cost flows for a balanced transportation problem
+
+    supply and demand are positive integers with equal sums; cost is finite.
+    Starts from a least-cost basis and pivots on the most negative reduced
+    cost, computed for all cells at once, until none is negative.
+    """
+    supply = np.asarray(supply, dtype=np.int64)
+    demand = np.asarray(demand, dtype=np.int64)
+    m, n = cost.shape
+    flow = np.zeros((m, n), dtype=np.int64)
+    basis = np.zeros((m, n), dtype=bool)
+
+    # Least-cost start; every allocation closes one row or column (the last
+    # both), which leaves m + n - 1 basic cells forming a spanning tree
+    row_left, col_left = supply.copy(), demand.copy()
+    row_open, col_open = np.ones(m, dtype=bool), np.ones(n, dtype=bool)
+    basic = 0
+    for cell in np.argsort(cost, axis=None, kind='stable'):
+        i, j = divmod(int(cell), n)
+        if not (row_open[i] and col_open[j]):
+            continue
+        quantity = min(row_left[i], col_left[j])
+        flow[i, j] = quantity
+        basis[i, j] = True
+        basic += 1
+        row_left[i] -= quantity
+        col_left[j] -= quantity
+        if basic == m + n - 1:
+            break
+        if row_left[i] == 0 and (col_left[j] > 0 or row_open.sum() > 1):
+            row_open[i] = False
+        else:
+            col_open[j] = False
+
+    tolerance = 1e-9 * max(1.0, float(np.abs(cost).max()))
+    for _ in range(max_iterations):
+        u, v, row_cells, col_cells = _potentials(basis, cost)
+        reduced = cost - u[:, None] - v[None, :]
+        reduced[basis] = 0
+        cell = int(np.argmin(reduced))
+        if reduced.flat[cell] >= -tolerance:
+            break
+        i, j = divmod(cell, n)
+        cycle = _cycle(row_cells, col_cells, i, j)
+        losing = cycle[1::2]
+        theta = min(flow[c] for c in losing)
+        leaving = next(c for c in losing if flow[c] == theta)
+        for c in cycle[0::2]:
+            flow[c] += theta
+        for c in losing:
+            flow[c] -= theta
+        basis[leaving] = False
+        basis[i, j] = True
+    return flow
+
+def plan_transfers(sites, stock, daily_demand, costs, cover_days, unit_ml):
+    """Cheapest transfers for every blood group
+
+    stock and daily_demand are (sites, blood groups) arrays in ml. Returns
+    a Plan with the transfers, {(site, group): units still missing} and the
+    total travel in unit-minutes.
+    """
+    finite = costs[np.isfinite(costs)]
+    # Leaving demand unmet costs more than any real route, and an impossible
+    # route more than leaving demand unmet
+    unmet_cost = (finite.max() if finite.size else 0) + 1
+    impossible_cost = 2 * unmet_cost
+    transfers, shortfalls, total = [], {}, 0.0
+    for g, blood_group in enumerate(BLOOD_GROUPS):
+        balance = balances(stock[:, g], daily_demand[:, g], cover_days, unit_ml)
+        givers, takers = np.nonzero(balance > 0)[0], np.nonzero(balance < 0)[0]
+        if not len(takers):
+            continue
+        if not len(givers):
+            shortfalls.update({(sites[t], blood_group): int(-balance[t]) for t in takers})
+            continue
+        supply, demand = balance[givers], -balance[takers]
+        # A dummy giver supplies whatever stays unmet, a dummy taker keeps spare
+        # stock. Every plan sends the same total to the dummy taker, so any
+        # cost there only shifts all plans alike; the highest one makes the
+        # starting solution fill real routes first
+        cost = np.full((len(givers) + 1, len(takers) + 1), impossible_cost + 1)
+        cost[:-1, :-1] = np.where(np.isfinite(costs[np.ix_(givers, takers)]),
+                                  costs[np.ix_(givers, takers)], impossible_cost)
+        cost[-1, :-1] = unmet_cost
+        flow = solve_transportation(np.append(supply, demand.sum()), np.append(demand, supply.sum()), cost)
+        flow = np.where(cost < impossible_cost, flow, 0)[:-1, :-1]
+        for a, b in zip(*np.nonzero(flow)):
+            units = int(flow[a, b])
+            minutes = float(costs[givers[a], takers[b]])
+            transfers.append(Transfer(blood_group, sites[givers[a]], sites[takers[b]], units, units * unit_ml, minutes))
+            total += units * minutes
+        for b, missing in enumerate(demand - flow.sum(axis=0)):
+            if missing > 0:
+                shortfalls[(sites[takers[b]], blood_group)] = int(missing)
+    return Plan(transfers, shortfalls, total)
+
+def network_plan(shard_map, settings, cover_days=None, unit_ml=None, costs_file=None):
+    """Plan transfers from the current stock of every site that answers
+
+    Returns (plan, {site_id: error} for sites left out).
+    """
+    positions, errors = shard_map.fan_out(site_position)
+    sites = [site_id for site_id in shard_map.sites if site_id in positions]
+    # (sites, blood groups, [stock, daily demand])
+    table = np.array([[positions[site_id].get(group, (0, 0)) for group in BLOOD_GROUPS] for site_id in sites],
+                     dtype=float).reshape(len(sites), len(BLOOD_GROUPS), 2)
+    costs = load_costs(costs_file or db._setting(settings, 'TRANSFER_COSTS_FILE'), sites)
+    plan = plan_transfers(sites, table[:, :, 0], table[:, :, 1], costs,
+                          cover_days or float(db._setting(settings, 'TRANSFER_COVER_DAYS', 7)),
+                          unit_ml or int(db._setting(settings, 'TRANSFER_UNIT_ML', 450)))
+    return plan, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan stock transfers between sites')
+    parser.add_argument('--cover-days', type=float, help=f'days of demand every site keeps (default {Config.TRANSFER_COVER_DAYS:g})')
+    parser.add_argument('--unit-ml', type=int, help=f'size of one unit (default {Config.TRANSFER_UNIT_ML})')
+    parser.add_argument('--costs', help='CSV of from_site,to_site,minutes (default TRANSFER_COSTS_FILE)')
+    parser.add_argument('--csv', help='also write the transfers to this file')
+    args = parser.parse_args(argv)
+
+    shard_map = sharding.ShardMap(Config)
+    if not shard_map.sites:
+        print("Transfers need multi-site mode (SITES is not set)")
+        return 1
+    plan, errors = network_plan(shard_map, Config, args.cover_days, args.unit_ml, args.costs)
+    shard_map.clear()
+    for site_id, error in errors.items():
+        print(f"Site {site_id} left out: {error}")
+
+    print(f"{'Group':<6} {'From':<16} {'To':<16} {'Units':>6} {'ml':>8} {'Minutes':>8}")
+    for t in sorted(plan.transfers):
+        print(f"{t.blood_group:<6} {t.from_site:<16} {t.to_site:<16} {t.units:>6} {t.quantity:>8,} {t.minutes:>8g}")
+    print(f"\n{len(plan.transfers)} transfer(s), {plan.total_minutes:,.0f} unit-minutes of travel")
+    if plan.shortfalls:
+        print("\nStill short after transfers:")
+        for (site_id, blood_group), units in sorted(plan.shortfalls.items()):
+            print(f"   {site_id:<16} {blood_group:<4} {units} unit(s)")
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(Transfer._fields)
+            writer.writerows(sorted(plan.transfers))
+        print(f"\nWrote {args.csv}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
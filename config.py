@@ -1,56 +0,0 @@
-"""
-Configuration file for Blood Bank Management System
-Contains database configuration and application settings
-"""
-
-import os
-from datetime import timedelta
-
-class Config:
-    """Base configuration class"""
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production'
-    
-    # Database configuration
-    MYSQL_HOST = os.environ.get('MYSQL_HOST') or 'localhost'
-    MYSQL_USER = os.environ.get('MYSQL_USER') or 'root'
-    MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or 'password'
-    MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or 'blood_bank_db'
-    MYSQL_PORT = int(os.environ.get('MYSQL_PORT') or 3306)
-    
-    # Session configuration
-    PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
-    
-    # Application settings
-    DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
-    
-    # Blood bank specific settings
-    MAX_DONATION_QUANTITY = 500  # Maximum blood donation in ml
-    MIN_DONOR_AGE = 18
-    MAX_DONOR_AGE = 65
-    
-    # Blood group compatibility for inventory management
-    BLOOD_GROUP_COMPATIBILITY = {
-        'A+': ['A+', 'A-', 'O+', 'O-'],
-        'A-': ['A-', 'O-'],
-        'B+': ['B+', 'B-', 'O+', 'O-'],
-        'B-': ['B-', 'O-'],
-        'AB+': ['A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-'],
-        'AB-': ['A-', 'B-', 'AB-', 'O-'],
-        'O+': ['O+', 'O-'],
-        'O-': ['O-']
-    }
-
-class DevelopmentConfig(Config):
-    """Development configuration"""
-    DEBUG = True
-
-class ProductionConfig(Config):
-    """Production configuration"""
-    DEBUG = False
-
-# Configuration dictionary
-config = {
-    'development': DevelopmentConfig,
-    'production': ProductionConfig,
-    'default': DevelopmentConfig
-}